@@ -0,0 +1,631 @@
+#!/usr/bin/env python3
+"""
+Better Jira Generator - ASGI Entry Point
+Async serving mode for the LLM-bound routes.
+
+    uvicorn asgi:app --workers 4
+    gunicorn asgi:app -k uvicorn.workers.UvicornWorker
+
+POST /new_chat and POST /history/update/<id> are handled here with the
+async Groq client, so a waiting generation holds no thread and one worker
+can keep hundreds of them in flight. Database work and file I/O for those
+routes run briefly in a thread. Every other request goes to the Flask app
+through asgiref's WSGI adapter, so behaviour (sessions, flash messages,
+templates) is the same as under `gunicorn web_app:app`.
+
+The /ws/chat WebSocket is the browser version of the CLI chat loop: one
+connection per chat, assistant replies streamed token by token, and the
+NEW, SAVE, HISTORY and OPEN commands handled server-side.
+"""
+
+import asyncio
+import json
+import math
+import os
+import re
+import time
+from http.cookies import SimpleCookie
+from urllib.parse import parse_qs
+
+from asgiref.wsgi import WsgiToAsgi
+from flask import url_for
+from itsdangerous import BadSignature
+from werkzeug.datastructures import Headers
+from werkzeug.http import dump_cookie
+
+import main
+import metrics
+import quotas
+import structured_tickets
+import tracing
+from web_app import (
+    app as flask_app,
+    DUAL_ROLE_USER_TYPE,
+    DUAL_ROLES,
+    Export,
+    append_chat_turns,
+    build_new_chat_messages,
+    build_role_outline_messages,
+    create_chat_export,
+    enforce_llm_quota,
+    finish_chat_export,
+    get_chat_exports,
+    get_current_saved_session,
+    open_chat_export,
+    quota_exceeded_response,
+    save_dual_role_exports,
+    save_new_chat_export,
+    save_updated_export,
+)
+
+wsgi_app = WsgiToAsgi(flask_app)
+
+UPDATE_EXPORT_PATH = re.compile(r'^/history/update/(\d+)$')
+CHAT_SOCKET_PATH = '/ws/chat'
+CHAT_COMMANDS = ('NEW', 'SAVE', 'HISTORY', 'OPEN', 'HELP')
+
+# Close code sent to WebSocket clients without a logged-in session
+WS_UNAUTHORIZED = 4401
+# Close code sent to WebSocket handshakes from a page on another origin
+WS_POLICY_VIOLATION = 1008
+
+# One AsyncGroq client per worker process, so connections are pooled across requests
+_groq_client = None
+
+
+def groq_client():
+    global _groq_client
+    if _groq_client is None:
+        _groq_client = main.get_async_groq_client()
+    return _groq_client
+
+
+def url(endpoint, **values):
+    with flask_app.test_request_context():
+        return url_for(endpoint, **values)
+
+
+def _serializer():
+    return flask_app.session_interface.get_signing_serializer(flask_app)
+
+
+def load_session(scope):
+    """Read the Flask session cookie from an ASGI request."""
+    cookies = SimpleCookie()
+    for name, value in scope.get('headers', []):
+        if name == b'cookie':
+            cookies.load(value.decode('latin-1'))
+
+    morsel = cookies.get(flask_app.config['SESSION_COOKIE_NAME'])
+    if morsel is None:
+        return {}
+    try:
+        max_age = int(flask_app.permanent_session_lifetime.total_seconds())
+        return dict(_serializer().loads(morsel.value, max_age=max_age))
+    except BadSignature:
+        return {}
+
+
+def session_cookie(data):
+    """Set-Cookie header value for a Flask session holding `data`."""
+    return dump_cookie(
+        flask_app.config['SESSION_COOKIE_NAME'],
+        _serializer().dumps(data),
+        path=flask_app.config['SESSION_COOKIE_PATH'] or '/',
+        domain=flask_app.config['SESSION_COOKIE_DOMAIN'],
+        secure=flask_app.config['SESSION_COOKIE_SECURE'],
+        httponly=flask_app.config['SESSION_COOKIE_HTTPONLY'],
+        samesite=flask_app.config['SESSION_COOKIE_SAMESITE'],
+    )
+
+
+async def read_form(receive):
+    """Read and parse an application/x-www-form-urlencoded request body."""
+    body = b''
+    while True:
+        message = await receive()
+        body += message.get('body', b'')
+        if not message.get('more_body'):
+            break
+    return {key: values[0] for key, values in parse_qs(body.decode('utf-8')).items()}
+
+
+async def redirect(send, location, session_data, category=None, message=None):
+    """Send a 302 that, like flask.flash, stores a message in the session."""
+    if message:
+        session_data.setdefault('_flashes', []).append((category, message))
+    await send({
+        'type': 'http.response.start',
+        'status': 302,
+        'headers': [
+            (b'location', location.encode('latin-1')),
+            (b'set-cookie', session_cookie(session_data).encode('latin-1')),
+            (b'content-length', b'0'),
+        ],
+    })
+    await send({'type': 'http.response.body', 'body': b''})
+
+
+async def quota_exceeded(scope, send, error):
+    """Send the 429 page web_app serves for a QuotaExceeded error. Returns the status."""
+    referer = dict(scope.get('headers', [])).get(b'referer')
+    headers = {'Referer': referer.decode('latin-1')} if referer else {}
+    with flask_app.test_request_context(headers=headers):
+        response = quota_exceeded_response(error)
+    await send({
+        'type': 'http.response.start',
+        'status': response.status_code,
+        'headers': [(name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in response.headers.items()],
+    })
+    await send({'type': 'http.response.body', 'body': response.get_data()})
+    return response.status_code
+
+
+async def run_in_app_context(fn, *args):
+    """Run blocking database/file work in a thread inside a Flask app context."""
+    def call():
+        with flask_app.app_context():
+            return fn(*args)
+    return await asyncio.to_thread(call)
+
+
+async def create_new_chat(scope, receive, send, session_data):
+    """Async POST /new_chat: same behaviour as web_app.create_new_chat."""
+    form = await read_form(receive)
+    repo_url = form.get('repo_url', '').strip()
+    project_description = form.get('project_description', '').strip()
+    user_type = form.get('user_type', 'Developer').strip()
+    structured = form.get('structured') == '1'
+    user_id = session_data['user_id']
+
+    if not repo_url:
+        return await redirect(send, url('new_chat'), session_data, 'error', 'Please provide a GitHub repository URL.')
+    if not project_description:
+        return await redirect(send, url('new_chat'), session_data, 'error', 'Please provide a project description.')
+    try:
+        await run_in_app_context(enforce_llm_quota, user_id, len(DUAL_ROLES) if user_type == DUAL_ROLE_USER_TYPE else 1)
+    except quotas.QuotaExceeded as e:
+        return await quota_exceeded(scope, send, e)
+    if user_type == DUAL_ROLE_USER_TYPE:
+        return await create_dual_role_chat(send, session_data, repo_url, project_description)
+    if structured:
+        return await create_structured_chat(send, session_data, repo_url, user_type, project_description)
+
+    try:
+        response = await main.acreate_chat_completion(
+            groq_client(),
+            build_new_chat_messages(repo_url, user_type, project_description),
+            max_tokens=2048,
+            context={'user_id': user_id, 'repository': repo_url},
+        )
+        content = response.choices[0].message.content
+
+        def save():
+            return save_new_chat_export(user_id, repo_url, user_type, content).id
+
+        export_id = await run_in_app_context(save)
+    except Exception as e:
+        return await redirect(send, url('new_chat'), session_data, 'error', f'Error creating new chat: {e}')
+
+    await redirect(
+        send, url('history_detail', entry_id=export_id), session_data,
+        'success', 'Successfully created new chat and generated project outline!',
+    )
+
+
+async def create_structured_chat(send, session_data, repo_url, user_type, project_description):
+    """Async version of web_app.create_structured_chat: tickets generated in JSON mode."""
+    user_id = session_data['user_id']
+    try:
+        response = await main.acreate_chat_completion(
+            groq_client(),
+            structured_tickets.build_messages(repo_url, user_type, project_description),
+            max_tokens=4096,
+            context={'user_id': user_id, 'repository': repo_url},
+            response_format={'type': 'json_object'},
+        )
+        document = structured_tickets.parse_document(response.choices[0].message.content)
+
+        def save():
+            return save_new_chat_export(
+                user_id, repo_url, user_type,
+                structured_tickets.render_markdown(document), tickets=document['tickets'],
+            ).id
+
+        export_id = await run_in_app_context(save)
+    except structured_tickets.TicketValidationError as e:
+        return await redirect(send, url('new_chat'), session_data, 'error', f'The AI reply was not a valid ticket list: {e}')
+    except Exception as e:
+        return await redirect(send, url('new_chat'), session_data, 'error', f'Error creating new chat: {e}')
+
+    await redirect(
+        send, url('history_detail', entry_id=export_id), session_data,
+        'success', f"Successfully generated {len(document['tickets'])} tickets!",
+    )
+
+
+async def create_dual_role_chat(send, session_data, repo_url, project_description):
+    """Async version of web_app.create_dual_role_chat: both roles' outlines generated concurrently."""
+    user_id = session_data['user_id']
+    context = {'user_id': user_id, 'repository': repo_url}
+
+    try:
+        results = await asyncio.gather(*[
+            main.acreate_chat_completion(
+                groq_client(),
+                build_role_outline_messages(role, repo_url, project_description),
+                max_tokens=2048,
+                context=context,
+            )
+            for role, _ in DUAL_ROLES
+        ], return_exceptions=True)
+        errors = [result for result in results if isinstance(result, BaseException)]
+        if errors:
+            raise errors[0]
+        contents = [response.choices[0].message.content for response in results]
+
+        def save():
+            return save_dual_role_exports(user_id, repo_url, contents)[0].id
+
+        export_id = await run_in_app_context(save)
+    except Exception as e:
+        return await redirect(send, url('new_chat'), session_data, 'error', f'Error creating new chat: {e}')
+
+    await redirect(
+        send, url('history_detail', entry_id=export_id), session_data,
+        'success', 'Successfully generated Product Manager and Developer outlines!',
+    )
+
+
+async def update_export(scope, receive, send, session_data, export_id):
+    """Async POST /history/update/<id>: same behaviour as web_app.update_export."""
+    form = await read_form(receive)
+    user_id = session_data['user_id']
+    detail_url = url('history_detail', entry_id=export_id)
+
+    def load():
+        export = Export.query.get(export_id)
+        if not export or export.is_deleted or export.user_id != user_id:
+            return None
+        return {
+            'file_path': export.file_path or '',
+            'user_type': export.user_type,
+            'repository': export.repository,
+        }
+
+    export = await run_in_app_context(load)
+    if export is None:
+        return await redirect(send, url('history'), session_data, 'error', 'Export item not found.')
+
+    file_path = export['file_path']
+    if not file_path or not await asyncio.to_thread(os.path.exists, file_path):
+        return await redirect(send, url('history'), session_data, 'error', 'The associated file is missing or unavailable.')
+
+    user_message = form.get('chat_message', '').strip()
+    if not user_message:
+        return await redirect(send, detail_url, session_data, 'warning', 'Please enter a message.')
+
+    try:
+        await run_in_app_context(enforce_llm_quota, user_id)
+    except quotas.QuotaExceeded as e:
+        return await quota_exceeded(scope, send, e)
+
+    def read():
+        with metrics.time_file_io('read'), open(file_path, 'r') as f:
+            return f.read()
+
+    try:
+        current_content = await asyncio.to_thread(read)
+    except Exception as e:
+        return await redirect(send, detail_url, session_data, 'error', f'Could not read file: {e}')
+
+    try:
+        updated_content = await main.aupdate_markdown_with_ai(
+            groq_client(),
+            current_content,
+            user_message,
+            export['user_type'] or 'Developer',
+            export['repository'] or '',
+            context={'user_id': user_id, 'export_id': export_id, 'repository': export['repository']},
+        )
+
+        def save():
+            save_updated_export(Export.query.get(export_id), current_content, updated_content, user_message)
+
+        await run_in_app_context(save)
+    except Exception as e:
+        return await redirect(send, detail_url, session_data, 'error', f'Error updating file: {e}')
+
+    await redirect(send, detail_url, session_data, 'success', 'Successfully updated the file with AI response!')
+
+
+def load_task_content(file_info):
+    """Text of the session's task file, if it has one that can still be read."""
+    path = (file_info or {}).get('path') or (file_info or {}).get('file_path')
+    if not path:
+        return None
+    content, error = main.read_file_content(path)
+    return None if error else content
+
+
+class ChatSession:
+    """
+    State of one /ws/chat connection: the conversation so far and the
+    export file its turns are appended to.
+    """
+
+    def __init__(self, send, user_id, role, repo_url, file_info=None, task_content=None):
+        self.send_message = send
+        self.user_id = user_id
+        self.role = role
+        self.repo_url = repo_url
+        self.file_info = file_info
+        self.system_prompt = main.get_system_prompt(role, repo_url, task_content)
+        self.messages = [{'role': 'system', 'content': self.system_prompt}]
+        self.export_id = None
+        self.export_path = None
+        # Set when turns were appended since the last revision/search update
+        self.dirty = False
+
+    async def send(self, **message):
+        await send_json(self.send_message, message)
+
+    async def handle(self, frame):
+        """Handle one client frame: a chat message or a command."""
+        content = frame.get('content') or ''
+        command = frame.get('command')
+        if not isinstance(content, str) or not isinstance(command, (str, type(None))):
+            return await self.send(type='error', message='content and command must be strings.')
+        content = content.strip()
+        if frame.get('type') != 'command' and content.upper() in CHAT_COMMANDS:
+            # Typing a command on its own line works as it does in the CLI
+            command = content
+
+        if command:
+            handler = getattr(self, f'command_{command.lower()}', None)
+            if command.upper() not in CHAT_COMMANDS or handler is None:
+                return await self.send(type='error', message=f'Unknown command: {command}')
+            return await handler(frame)
+
+        if content:
+            await self.reply(content)
+
+    async def reply(self, content):
+        """Stream the assistant's answer to `content`, then append the turn to the export file."""
+        try:
+            await run_in_app_context(enforce_llm_quota, self.user_id)
+        except quotas.QuotaExceeded as e:
+            return await self.send(type='error', message=str(e), retry_after=math.ceil(e.retry_after))
+
+        self.messages.append({'role': 'user', 'content': content})
+        parts = []
+        try:
+            async for text in main.astream_chat_completion(
+                groq_client(),
+                self.messages,
+                max_tokens=1024,
+                context={'user_id': self.user_id, 'export_id': self.export_id, 'repository': self.repo_url},
+            ):
+                parts.append(text)
+                await self.send(type='token', content=text)
+        except Exception as e:
+            self.messages.pop()
+            return await self.send(type='error', message=f'Error communicating with Groq API: {e}')
+
+        reply = ''.join(parts)
+        self.messages.append({'role': 'assistant', 'content': reply})
+        await self.persist(self.messages[-2:])
+        await self.send(type='reply', content=reply, export_id=self.export_id)
+
+    async def persist(self, new_messages):
+        """Write finished turns: the first creates the export, later ones are appended."""
+        if self.export_id is None:
+            header = main.format_chat_header(self.role, self.repo_url, self.file_info)
+            # The first write holds the whole conversation, including any loaded by OPEN
+            turns = main.format_chat_turns(self.messages[1:])
+
+            def create():
+                export = create_chat_export(self.user_id, self.role, self.repo_url, header, turns)
+                return export.id, export.file_path
+
+            self.export_id, self.export_path = await run_in_app_context(create)
+        else:
+            await asyncio.to_thread(append_chat_turns, self.export_path, main.format_chat_turns(new_messages))
+        self.dirty = True
+
+    async def finish(self, name=None):
+        """Store the export's current text as a revision and update its search entry."""
+        if self.export_id is None or not (self.dirty or name):
+            return None
+
+        def finish():
+            export = finish_chat_export(self.export_id, name)
+            return export.to_dict() if export else None
+
+        export = await run_in_app_context(finish)
+        self.dirty = False
+        return export
+
+    async def command_new(self, frame):
+        await self.finish()
+        self.messages = [{'role': 'system', 'content': self.system_prompt}]
+        self.export_id = self.export_path = None
+        await self.send(type='new')
+
+    async def command_save(self, frame):
+        if len(self.messages) <= 1:
+            return await self.send(type='error', message='No conversation to save yet.')
+        if self.export_id is None:
+            await self.persist([])
+
+        name = frame.get('name') or ''
+        if not isinstance(name, str):
+            return await self.send(type='error', message='name must be a string.')
+        name = main.sanitize_filename(name) or None
+        export = await self.finish(name)
+        if export is None:
+            export = await run_in_app_context(lambda: Export.query.get(self.export_id).to_dict())
+        await self.send(type='saved', export=export, url=url('history_detail', entry_id=self.export_id))
+
+    async def command_history(self, frame):
+        items = await run_in_app_context(get_chat_exports, self.user_id)
+        await self.send(type='history', items=items)
+
+    async def command_open(self, frame):
+        try:
+            export_id = int(frame.get('export_id'))
+        except (TypeError, ValueError):
+            return await self.send(type='error', message='Choose a chat to open by its id.')
+
+        export, content = await run_in_app_context(open_chat_export, self.user_id, export_id)
+        if export is None:
+            return await self.send(type='error', message=content)
+
+        await self.finish()
+        loaded = main.parse_chat_markdown(content)
+        self.messages = [{'role': 'system', 'content': self.system_prompt}] + loaded
+        # Only chat-format exports can take appended turns; others continue as a new chat export
+        is_chat = bool(loaded)
+        self.export_id = export['id'] if is_chat else None
+        self.export_path = export['file_path'] if is_chat else None
+        await self.send(type='opened', export=export, messages=loaded)
+
+    async def command_help(self, frame):
+        await self.send(type='help', commands=list(CHAT_COMMANDS))
+
+
+async def send_json(send, message):
+    await send({'type': 'websocket.send', 'text': json.dumps(message)})
+
+
+def allowed_origins():
+    return {origin.strip().rstrip('/').lower() for origin in os.environ.get('WS_ALLOWED_ORIGINS', '').split(',') if origin.strip()}
+
+
+def origin_allowed(scope):
+    """
+    Whether a WebSocket handshake may use the session cookie. Browsers send
+    the cookie with cross-site handshakes too, so a page on another origin
+    could otherwise chat as the user; the Origin must match the Host or be
+    listed in WS_ALLOWED_ORIGINS. Clients other than browsers send no Origin.
+    """
+    headers = {key.decode('latin-1').lower(): value.decode('latin-1') for key, value in scope.get('headers', [])}
+    origin = headers.get('origin')
+    if origin is None:
+        return True
+    origin = origin.strip().rstrip('/').lower()
+    if origin in allowed_origins():
+        return True
+    host = headers.get('host', '').strip().lower()
+    return bool(host) and origin.split('://', 1)[-1] == host
+
+
+async def chat_socket(scope, receive, send):
+    """WebSocket /ws/chat: a multi-turn chat using the CLI's role prompts."""
+    message = await receive()
+    if message['type'] != 'websocket.connect':
+        return
+
+    if not origin_allowed(scope):
+        await send({'type': 'websocket.accept'})
+        return await send({'type': 'websocket.close', 'code': WS_POLICY_VIOLATION})
+
+    session_data = load_session(scope)
+    if 'user_id' not in session_data:
+        # Accept first so the browser sees the close code rather than a bare HTTP 403
+        await send({'type': 'websocket.accept'})
+        return await send({'type': 'websocket.close', 'code': WS_UNAUTHORIZED})
+
+    # Role and repository come from the chat page, falling back to the saved session
+    params = {key: values[0] for key, values in parse_qs(scope.get('query_string', b'').decode()).items()}
+    saved = await run_in_app_context(
+        get_current_saved_session, session_data['user_id'], session_data.get('saved_session_id')
+    ) or {}
+    role = params.get('role') or saved.get('role') or 'developer'
+    repo_url = params.get('repository') or saved.get('repository') or ''
+    file_info = saved.get('file_info') if isinstance(saved.get('file_info'), dict) else None
+    task_content = await asyncio.to_thread(load_task_content, file_info)
+    if task_content:
+        # Compact the task file off the event loop; ChatSession then finds its brief in memory
+        await asyncio.to_thread(main.get_task_brief, task_content)
+
+    await send({'type': 'websocket.accept'})
+    chat = ChatSession(send, session_data['user_id'], role, repo_url, file_info, task_content)
+    await chat.send(type='ready', role=role, repository=repo_url, task_file=bool(task_content))
+
+    try:
+        while True:
+            message = await receive()
+            if message['type'] == 'websocket.disconnect':
+                break
+            try:
+                frame = json.loads(message.get('text') or '{}')
+            except ValueError:
+                frame = {'content': message.get('text')}
+            await chat.handle(frame if isinstance(frame, dict) else {})
+    finally:
+        await chat.finish()
+
+
+def match_async_route(scope):
+    """Return (endpoint, handler args) for requests served natively, else None."""
+    if scope['type'] != 'http' or scope['method'] != 'POST':
+        return None
+    if scope['path'] == '/new_chat':
+        return 'create_new_chat', ()
+    match = UPDATE_EXPORT_PATH.match(scope['path'])
+    if match:
+        return 'update_export', (int(match.group(1)),)
+    return None
+
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def app(scope, receive, send):
+    """ASGI application."""
+    if scope['type'] == 'lifespan':
+        return await lifespan(receive, send)
+
+    if scope['type'] == 'websocket':
+        if scope['path'] == CHAT_SOCKET_PATH:
+            return await chat_socket(scope, receive, send)
+        await receive()
+        return await send({'type': 'websocket.close', 'code': 1000})
+
+    route = match_async_route(scope)
+    if route is None:
+        return await wsgi_app(scope, receive, send)
+
+    endpoint, args = route
+    started = time.perf_counter()
+    trace = None
+    if tracing.tracing_enabled():
+        headers = Headers([(key.decode('latin-1'), value.decode('latin-1')) for key, value in scope.get('headers', [])])
+        trace = tracing.start_trace(f"POST {scope['path']}", headers, {
+            'http.method': 'POST', 'http.target': scope['path'], 'flask.endpoint': endpoint,
+        })
+    session_data = load_session(scope)
+    status, error = 302, None
+    try:
+        if 'user_id' not in session_data:
+            await redirect(send, url('login'), session_data, 'error', 'Please log in to access this page.')
+        else:
+            handler = create_new_chat if endpoint == 'create_new_chat' else update_export
+            status = await handler(scope, receive, send, session_data, *args) or 302
+    except Exception as e:
+        status, error = 500, e
+        raise
+    finally:
+        if trace:
+            tracing.finish_trace(*trace, status_code=status, error=error)
+
+    metrics.HTTP_REQUESTS.labels('POST', endpoint, str(status)).inc()
+    metrics.HTTP_LATENCY.labels('POST', endpoint).observe(time.perf_counter() - started)
@@ -0,0 +1,33 @@
+#!/usr/bin/env python3
+"""
+Better Jira Generator - Atomic file writes
+Replace a file so readers see either the old contents or the new ones.
+
+The new contents go to a temporary file beside the target, named after
+the process and thread so concurrent writers in any worker never share
+one, and are moved over the target with os.replace only once they are
+complete. A failed write removes its temporary file and leaves the
+target as it was.
+"""
+
+import os
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+
+
+@contextmanager
+def writing(path, mode='wb', **open_kwargs):
+    """Open a temporary file for `path`; it replaces `path` when the block finishes without error."""
+    path = Path(path)
+    temporary = path.with_name(f'{path.name}.{os.getpid()}.{threading.get_ident()}.tmp')
+    try:
+        with open(temporary, mode, **open_kwargs) as f:
+            yield f
+        os.replace(temporary, path)
+    except BaseException:
+        try:
+            os.remove(temporary)
+        except OSError:
+            pass
+        raise
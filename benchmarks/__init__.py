@@ -0,0 +1,4 @@
+"""
+Better Jira Generator - Benchmarks
+Route benchmarks and load tests run against a seeded throwaway database.
+"""
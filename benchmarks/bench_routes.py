@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Benchmark the listing and detail routes against a seeded throwaway database.
+
+Usage:
+    python -m benchmarks.bench_routes --users 20 --exports 200 --output bench_results.json
+    python -m benchmarks.bench_routes --baseline bench_results.json --threshold 0.2
+
+Each route is called through the Flask test client (no network, LLM stubbed)
+and the results are written as JSON. With --baseline the run exits with
+status 1 if any route's p50 or p95 latency regressed by more than --threshold.
+"""
+
+import argparse
+import json
+import math
+import platform
+import random
+import statistics
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from benchmarks.seed import configure_environment, seed, stub_llm  # noqa: E402
+
+ROUTES = {
+    'items': lambda export_id: '/items',
+    'history': lambda export_id: '/history',
+    'history_detail': lambda export_id: f'/history/view/{export_id}',
+    'api_items': lambda export_id: '/api/v1/items',
+    'api_item_detail': lambda export_id: f'/api/v1/items/{export_id}',
+}
+
+
+def percentile(sorted_values, pct):
+    rank = math.ceil(pct / 100 * len(sorted_values))
+    return sorted_values[min(max(rank, 1), len(sorted_values)) - 1]
+
+
+def summarize(latencies, elapsed):
+    values = sorted(latencies)
+    return {
+        'requests': len(values),
+        'mean_ms': statistics.fmean(values) * 1000,
+        'p50_ms': percentile(values, 50) * 1000,
+        'p95_ms': percentile(values, 95) * 1000,
+        'p99_ms': percentile(values, 99) * 1000,
+        'max_ms': values[-1] * 1000,
+        'throughput_rps': len(values) / elapsed if elapsed else None,
+    }
+
+
+def run_benchmarks(seeded, iterations, warmup, routes):
+    from web_app import app
+
+    rng = random.Random(0)
+    results = {}
+    with app.test_client() as client:
+        for name in routes:
+            build_url = ROUTES[name]
+            latencies = []
+            started = time.perf_counter()
+            for i in range(warmup + iterations):
+                user_id, username, export_ids = rng.choice(seeded)
+                with client.session_transaction() as sess:
+                    sess['user_id'] = user_id
+                    sess['username'] = username
+
+                request_started = time.perf_counter()
+                response = client.get(build_url(rng.choice(export_ids)))
+                duration = time.perf_counter() - request_started
+                if response.status_code != 200:
+                    raise RuntimeError(f'{name} returned {response.status_code}')
+
+                if i == warmup:
+                    started = request_started
+                if i >= warmup:
+                    latencies.append(duration)
+            results[name] = summarize(latencies, time.perf_counter() - started)
+    return results
+
+
+def compare(results, baseline, threshold):
+    """Return a list of human-readable regressions against a baseline results file."""
+    regressions = []
+    for name, current in results['routes'].items():
+        previous = baseline.get('routes', {}).get(name)
+        if not previous:
+            continue
+        for metric in ('p50_ms', 'p95_ms'):
+            if current[metric] > previous[metric] * (1 + threshold):
+                regressions.append(
+                    f'{name} {metric}: {previous[metric]:.2f} -> {current[metric]:.2f} '
+                    f'(+{(current[metric] / previous[metric] - 1) * 100:.0f}%)'
+                )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=10)
+    parser.add_argument('--exports', type=int, default=100, help='exports per user')
+    parser.add_argument('--file-size', type=int, default=8192, help='bytes per export file')
+    parser.add_argument('--iterations', type=int, default=200, help='measured requests per route')
+    parser.add_argument('--warmup', type=int, default=20)
+    parser.add_argument('--routes', nargs='+', choices=sorted(ROUTES), default=list(ROUTES))
+    parser.add_argument('--work-dir', help='folder for the throwaway database and files')
+    parser.add_argument('--output', default='bench_results.json')
+    parser.add_argument('--baseline', help='earlier results file to compare against')
+    parser.add_argument('--threshold', type=float, default=0.2, help='allowed slowdown, 0.2 = 20%%')
+    args = parser.parse_args()
+
+    work_dir = configure_environment(args.work_dir)
+    print(f"Seeding {args.users} users x {args.exports} exports in {work_dir}...")
+    seeded = seed(work_dir, users=args.users, exports_per_user=args.exports, file_size=args.file_size)
+    stub_llm()
+
+    route_results = run_benchmarks(seeded, args.iterations, args.warmup, args.routes)
+    results = {
+        'created_at': datetime.utcnow().isoformat(),
+        'python': platform.python_version(),
+        'config': {
+            'users': args.users,
+            'exports_per_user': args.exports,
+            'file_size': args.file_size,
+            'iterations': args.iterations,
+        },
+        'routes': route_results,
+    }
+
+    print(f"\n{'route':<18}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'req/s':>10}")
+    for name, row in route_results.items():
+        print(f"{name:<18}{row['p50_ms']:>10.2f}{row['p95_ms']:>10.2f}{row['p99_ms']:>10.2f}{row['throughput_rps']:>10.1f}")
+
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"\n✓ Results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, 'r') as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        if regressions:
+            print("\n❌ Regressions against baseline:")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print("✓ No regressions against baseline")
+
+
+if __name__ == '__main__':
+    main()
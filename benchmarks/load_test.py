@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+Load test the gunicorn deployment with concurrent simulated users.
+
+Usage:
+    python -m benchmarks.load_test --users 20 --duration 60 --workers 4
+    python -m benchmarks.load_test --worker-class gthread --threads 8 --llm-delay 2
+
+Seeds a throwaway database, boots `gunicorn benchmarks.stub_app:app` (the real
+app with a stubbed LLM that sleeps --llm-delay seconds per call) and runs
+--users client processes. Each one logs in and repeats the journey
+items -> history_detail -> update_export or new_chat, pausing --think-time
+seconds between steps. Reports p50/p95/p99 latency, errors and throughput
+per step, and optionally writes them as JSON.
+"""
+
+import argparse
+import json
+import math
+import multiprocessing
+import os
+import random
+import signal
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import requests
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+
+from benchmarks.seed import BENCH_PASSWORD, configure_environment, seed  # noqa: E402
+
+STEPS = ['login', 'items', 'history_detail', 'update_export', 'new_chat']
+
+
+def percentile(sorted_values, pct):
+    rank = math.ceil(pct / 100 * len(sorted_values))
+    return sorted_values[min(max(rank, 1), len(sorted_values)) - 1]
+
+
+def start_gunicorn(args, work_dir, port):
+    """Boot gunicorn in the work directory so export files land there."""
+    env = {
+        **os.environ,
+        'PYTHONPATH': os.pathsep.join(filter(None, [str(REPO_ROOT), os.environ.get('PYTHONPATH')])),
+        'STUB_LLM_DELAY': str(args.llm_delay),
+        'PROMETHEUS_MULTIPROC_DIR': str(work_dir / 'metrics'),
+    }
+    command = [
+        sys.executable, '-m', 'gunicorn', 'benchmarks.stub_app:app',
+        '--config', str(REPO_ROOT / 'gunicorn.conf.py'),
+        '--bind', f'127.0.0.1:{port}',
+        '--workers', str(args.workers),
+        '--worker-class', args.worker_class,
+        '--threads', str(args.threads),
+        '--timeout', '120',
+        '--log-level', 'warning',
+    ]
+    process = subprocess.Popen(command, cwd=work_dir, env=env)
+
+    base_url = f'http://127.0.0.1:{port}'
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            if requests.get(f'{base_url}/login', timeout=5).status_code == 200:
+                return process, base_url
+        except requests.RequestException:
+            # Not listening yet, or workers still importing the app
+            pass
+        if process.poll() is not None:
+            raise RuntimeError('gunicorn exited during startup')
+        time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError('gunicorn did not start within 30 seconds')
+
+
+def timed(samples, step, send):
+    started = time.perf_counter()
+    try:
+        response = send()
+        # A redirect back to the login page means the session was lost
+        ok = response.status_code < 400 and '/login' not in response.headers.get('Location', '')
+    except requests.RequestException:
+        ok = False
+    samples.append((step, time.perf_counter() - started, ok))
+    return ok
+
+
+def run_user(job):
+    """One simulated user: log in, then repeat the journey until the deadline."""
+    base_url, username, export_ids, deadline, think_time, new_chat_ratio, seed_value = job
+    rng = random.Random(seed_value)
+    http = requests.Session()
+    samples = []
+
+    def think():
+        time.sleep(rng.uniform(0, 2 * think_time) if think_time else 0)
+
+    if not timed(samples, 'login', lambda: http.post(
+        f'{base_url}/login',
+        data={'username': username, 'password': BENCH_PASSWORD},
+        allow_redirects=False,
+    )):
+        return samples
+
+    while time.time() < deadline:
+        timed(samples, 'items', lambda: http.get(f'{base_url}/items'))
+        think()
+
+        export_id = rng.choice(export_ids)
+        timed(samples, 'history_detail', lambda: http.get(f'{base_url}/history/view/{export_id}'))
+        think()
+
+        if rng.random() < new_chat_ratio:
+            timed(samples, 'new_chat', lambda: http.post(
+                f'{base_url}/new_chat',
+                data={
+                    'repo_url': 'https://github.com/example/load-test',
+                    'project_description': 'Add a saved-cart feature to checkout.',
+                    'user_type': rng.choice(['Developer', 'Product Manager']),
+                },
+                allow_redirects=False,
+            ))
+        else:
+            timed(samples, 'update_export', lambda: http.post(
+                f'{base_url}/history/update/{export_id}',
+                data={'chat_message': 'Add acceptance criteria for refunds.'},
+                allow_redirects=False,
+            ))
+        think()
+
+    return samples
+
+
+def report(samples, elapsed):
+    results = {}
+    for step in STEPS:
+        rows = [(duration, ok) for name, duration, ok in samples if name == step]
+        if not rows:
+            continue
+        latencies = sorted(duration for duration, _ in rows)
+        results[step] = {
+            'requests': len(rows),
+            'errors': sum(1 for _, ok in rows if not ok),
+            'p50_ms': percentile(latencies, 50) * 1000,
+            'p95_ms': percentile(latencies, 95) * 1000,
+            'p99_ms': percentile(latencies, 99) * 1000,
+            'throughput_rps': len(rows) / elapsed,
+        }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=10, help='concurrent simulated users')
+    parser.add_argument('--duration', type=float, default=30, help='seconds to run')
+    parser.add_argument('--think-time', type=float, default=0.5, help='mean pause between steps')
+    parser.add_argument('--new-chat-ratio', type=float, default=0.2, help='share of journeys ending in new_chat')
+    parser.add_argument('--llm-delay', type=float, default=1.0, help='seconds each stubbed LLM call takes')
+    parser.add_argument('--workers', type=int, default=2, help='gunicorn worker processes')
+    parser.add_argument('--worker-class', default='sync', help='gunicorn worker class, e.g. sync or gthread')
+    parser.add_argument('--threads', type=int, default=1, help='threads per gthread worker')
+    parser.add_argument('--seed-users', type=int, default=10)
+    parser.add_argument('--seed-exports', type=int, default=50, help='exports per seeded user')
+    parser.add_argument('--port', type=int, default=8099)
+    parser.add_argument('--work-dir', help='folder for the throwaway database and files')
+    parser.add_argument('--output', help='write results as JSON to this file')
+    args = parser.parse_args()
+
+    work_dir = configure_environment(args.work_dir)
+    print(f"Seeding {args.seed_users} users x {args.seed_exports} exports in {work_dir}...")
+    seeded = seed(work_dir, users=args.seed_users, exports_per_user=args.seed_exports)
+
+    print(f"Starting gunicorn ({args.workers} x {args.worker_class}, {args.threads} threads)...")
+    server, base_url = start_gunicorn(args, work_dir, args.port)
+    try:
+        deadline = time.time() + args.duration
+        jobs = [
+            (base_url, username, export_ids, deadline, args.think_time, args.new_chat_ratio, index)
+            for index, (_, username, export_ids) in (
+                (i, seeded[i % len(seeded)]) for i in range(args.users)
+            )
+        ]
+        print(f"Running {args.users} users for {args.duration:.0f}s...")
+        started = time.time()
+        with multiprocessing.Pool(args.users) as pool:
+            samples = [sample for user_samples in pool.map(run_user, jobs) for sample in user_samples]
+        elapsed = time.time() - started
+    finally:
+        server.send_signal(signal.SIGTERM)
+        server.wait(timeout=30)
+
+    results = report(samples, elapsed)
+    print(f"\n{'step':<16}{'requests':>10}{'errors':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'req/s':>9}")
+    for step, row in results.items():
+        print(
+            f"{step:<16}{row['requests']:>10}{row['errors']:>8}{row['p50_ms']:>10.1f}"
+            f"{row['p95_ms']:>10.1f}{row['p99_ms']:>10.1f}{row['throughput_rps']:>9.1f}"
+        )
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'config': vars(args), 'elapsed': elapsed, 'steps': results}, f, indent=2)
+        print(f"\n✓ Results written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
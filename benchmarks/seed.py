@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Seed a throwaway database with users, exports and export files for benchmarks.
+
+web_app reads DATABASE_URL when it is imported, so call configure_environment()
+before importing it (the benchmark scripts do this for you).
+"""
+
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from types import SimpleNamespace
+
+BENCH_PASSWORD = 'bench-password'
+
+PARAGRAPH = (
+    'The checkout service must validate the cart, reserve inventory and create '
+    'a payment intent before confirming the order. '
+)
+
+
+def configure_environment(work_dir=None):
+    """Point the app at a fresh SQLite database and cache folder. Returns the work directory."""
+    work_dir = Path(work_dir or tempfile.mkdtemp(prefix='jira-bench-'))
+    work_dir.mkdir(parents=True, exist_ok=True)
+    os.environ['DATABASE_URL'] = f"sqlite:///{work_dir / 'bench.db'}"
+    os.environ['RENDER_CACHE_DIR'] = str(work_dir / 'render_cache')
+    return work_dir
+
+
+def export_body(index, size):
+    """Markdown export of roughly `size` bytes."""
+    lines = [f'# Project {index}\n', '\n## Project Overview\n\n']
+    while sum(len(line) for line in lines) < size:
+        lines.append(PARAGRAPH * 3 + '\n\n')
+        lines.append(f'## Section {len(lines)}\n\n- acceptance criterion {len(lines)}\n\n')
+    return ''.join(lines)
+
+
+def seed(work_dir, users=10, exports_per_user=50, file_size=4096, seed_value=42):
+    """Create users with exports and files. Returns a list of (user_id, username, [export ids])."""
+    from web_app import app, db, Export, User, generate_salt, hash_password
+
+    rng = random.Random(seed_value)
+    exports_dir = Path(work_dir) / 'exports'
+    exports_dir.mkdir(parents=True, exist_ok=True)
+    now = datetime.utcnow()
+    seeded = []
+
+    with app.app_context():
+        for user_index in range(users):
+            salt = generate_salt()
+            user = User(
+                username=f'bench-user-{user_index}',
+                password_hash=hash_password(BENCH_PASSWORD, salt),
+                salt=salt,
+            )
+            db.session.add(user)
+            db.session.flush()
+
+            rows = []
+            for export_index in range(exports_per_user):
+                filename = f'bench_{user_index}_{export_index}.md'
+                file_path = exports_dir / filename
+                file_path.write_text(export_body(export_index, file_size))
+                date = now - timedelta(minutes=rng.randint(0, 60 * 24 * 365))
+                rows.append({
+                    'filename': filename,
+                    'original_name': f'Project {export_index} for bench-user-{user_index}',
+                    'date': date,
+                    'created_at': date,
+                    'user_type': rng.choice(['Product Manager', 'Developer']),
+                    'repository': f'https://github.com/example/repo-{rng.randint(0, 9)}',
+                    'file_path': str(file_path),
+                    'action': 'new_chat',
+                    'is_deleted': False,
+                    'user_id': user.id,
+                })
+            db.session.bulk_insert_mappings(Export, rows)
+            db.session.commit()
+
+            export_ids = [export_id for (export_id,) in db.session.query(Export.id).filter_by(user_id=user.id)]
+            seeded.append((user.id, user.username, export_ids))
+
+    return seeded
+
+
+class StubGroqClient:
+    """Stands in for the Groq client: answers instantly (or after `delay` seconds) with fixed usage."""
+
+    def __init__(self, delay=0.0, reply='# Stubbed reply\n\n## Project Overview\n\nGenerated offline.\n'):
+        self.delay = delay
+        self.reply = reply
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def _create(self, model, messages, **kwargs):
+        if self.delay:
+            time.sleep(self.delay)
+        return SimpleNamespace(
+            usage=SimpleNamespace(prompt_tokens=sum(len(m['content']) // 4 for m in messages),
+                                  completion_tokens=len(self.reply) // 4, queue_time=0.0),
+            choices=[SimpleNamespace(message=SimpleNamespace(content=self.reply))],
+        )
+
+
+def stub_llm(delay=0.0):
+    """Make main.get_groq_client return a StubGroqClient, so no request reaches Groq."""
+    import main
+
+    client = StubGroqClient(delay=delay)
+    main.get_groq_client = lambda: client
+    return client
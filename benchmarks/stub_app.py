@@ -0,0 +1,15 @@
+"""
+WSGI entry point for load tests: the real app with the LLM replaced by StubGroqClient.
+
+    STUB_LLM_DELAY=1.5 gunicorn benchmarks.stub_app:app
+
+STUB_LLM_DELAY (seconds) simulates the time a real generation takes.
+"""
+
+import os
+
+from benchmarks.seed import stub_llm
+
+stub_llm(delay=float(os.environ.get('STUB_LLM_DELAY', 0)))
+
+from web_app import app  # noqa: E402,F401
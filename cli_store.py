@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+"""
+Better Jira Generator - CLI Export Store
+Where the CLI keeps its chat history.
+
+The CLI uses the web app's database and models, so chats saved in either
+place show up in both and HISTORY/OPEN are indexed queries instead of a
+scan of data_exports.json. Exports belong to the user named by
+CLI_USERNAME. When the database cannot be opened the CLI falls back to
+data_exports.json; the web app imports those entries on its next start.
+"""
+
+import json
+import math
+import os
+from datetime import datetime, timedelta
+from pathlib import Path
+
+DATA_EXPORTS_PATH = Path('data_exports.json')
+HISTORY_PAGE_SIZE = int(os.environ.get('CLI_HISTORY_PAGE_SIZE', 10))
+HISTORY_FILTERS = ('repo', 'role', 'since', 'until')
+
+
+def cli_username():
+    """Web app user who owns the CLI's exports."""
+    return os.environ.get('CLI_USERNAME', 'demo-pm')
+
+
+class HistoryArgsError(ValueError):
+    """A HISTORY filter was given without a value, or with a date that cannot be read."""
+
+
+def parse_history_args(args):
+    """
+    Parse the words after HISTORY: an optional page number and key=value
+    filters (repo, role, since, until). Returns (page, filters), or None
+    if the words are not a HISTORY command. Raises HistoryArgsError for a
+    known filter with an empty or unreadable value.
+    """
+    page, filters, is_command = 1, {}, True
+    for arg in args:
+        key, sep, value = arg.partition('=')
+        key = key.lower()
+        if not sep and arg.isdigit():
+            page = max(int(arg), 1)
+        elif sep and key in HISTORY_FILTERS:
+            if not value:
+                raise HistoryArgsError(f'{key}= needs a value')
+            if key in ('since', 'until'):
+                try:
+                    value = _parse_date(value, end_of_day=key == 'until')
+                except ValueError:
+                    raise HistoryArgsError(f'{key} must be a date like 2024-06-01, not "{value}"') from None
+            filters[key] = value
+        else:
+            is_command = False
+    return (page, filters) if is_command else None
+
+
+def _parse_date(value, end_of_day=False):
+    date = datetime.fromisoformat(value)
+    # A bare date in `until` includes that whole day
+    return date + timedelta(days=1) if end_of_day and len(value) == 10 else date
+
+
+def _role_label(role):
+    return role.replace('_', ' ').lower()
+
+
+class JsonExportStore:
+    """Offline history kept in data_exports.json."""
+
+    online = False
+    user_id = None
+
+    def __init__(self, path=DATA_EXPORTS_PATH):
+        self.path = Path(path)
+
+    def _load(self):
+        if not self.path.exists():
+            return {'exports': []}
+        try:
+            with open(self.path, 'r') as f:
+                return json.load(f)
+        except Exception as e:
+            print(f"⚠️  Warning: Could not load exports data: {e}")
+            return {'exports': []}
+
+    def _save(self, data):
+        try:
+            with open(self.path, 'w') as f:
+                json.dump(data, f, indent=2)
+        except Exception as e:
+            print(f"❌ Error saving exports data: {e}")
+
+    def attach_usage_hooks(self, hooks):
+        pass
+
+    def record_session(self, session_data):
+        """Offline, saved_session.json is the only record; the web app imports it when it starts."""
+
+    def add(self, entry, content):
+        data = self._load()
+        data['exports'].append(entry)
+        self._save(data)
+        return dict(entry, id=len(data['exports']))
+
+    def page(self, page=1, page_size=HISTORY_PAGE_SIZE, **filters):
+        """Return (entries, total) for one page of history, newest first."""
+        # Ids are positions in the file, so they stay the same under any filter
+        entries = [dict(entry, id=i) for i, entry in enumerate(self._load().get('exports', []), 1)]
+        if filters.get('repo'):
+            entries = [e for e in entries if filters['repo'].lower() in (e.get('repository') or '').lower()]
+        if filters.get('role'):
+            entries = [e for e in entries if (e.get('user_type') or '').lower() == _role_label(filters['role'])]
+        if filters.get('since'):
+            entries = [e for e in entries if e.get('date') and datetime.fromisoformat(e['date']) >= filters['since']]
+        if filters.get('until'):
+            entries = [e for e in entries if e.get('date') and datetime.fromisoformat(e['date']) < filters['until']]
+
+        entries.reverse()
+        start = (page - 1) * page_size
+        return entries[start:start + page_size], len(entries)
+
+    def get(self, export_id):
+        exports = self._load().get('exports', [])
+        if 1 <= export_id <= len(exports):
+            return dict(exports[export_id - 1], id=export_id)
+        return None
+
+    def remove(self, export_id):
+        data = self._load()
+        if 1 <= export_id <= len(data['exports']):
+            data['exports'].pop(export_id - 1)
+            self._save(data)
+
+
+class DatabaseExportStore:
+    """History kept in the web app's database, shared with the web UI."""
+
+    online = True
+
+    def __init__(self, web_app, user_id):
+        self.web_app = web_app
+        self.user_id = user_id
+        # The CLI is a single long-lived thread, so one app context serves every query
+        self.context = web_app.app.app_context()
+        self.context.push()
+
+    def _query(self):
+        Export = self.web_app.Export
+        return Export.query.filter(Export.user_id == self.user_id, Export.is_deleted == False)  # noqa: E712
+
+    def attach_usage_hooks(self, hooks):
+        """Record the CLI's LLM calls in the usage ledger, like the web app's."""
+        if self.web_app.record_llm_usage not in hooks:
+            hooks.append(self.web_app.record_llm_usage)
+
+    def record_session(self, session_data):
+        """List a new CLI session on the web app's saved sessions page."""
+        self.web_app.record_saved_session(
+            self.user_id,
+            session_data.get('role'),
+            session_data.get('repository'),
+            session_data.get('file_info'),
+            session_data.get('timestamp'),
+        )
+
+    def add(self, entry, content):
+        web_app = self.web_app
+        export = web_app.Export(
+            filename=entry['filename'],
+            original_name=entry['original_name'],
+            date=datetime.fromisoformat(entry['date']),
+            user_type=entry['user_type'],
+            repository=entry['repository'],
+            file_path=entry['file_path'],
+            action='cli_chat',
+            user_id=self.user_id,
+            is_deleted=False,
+        )
+        web_app.db.session.add(export)
+        web_app.db.session.commit()
+        web_app.record_revision(export, content, message='Saved from the CLI')
+        web_app.index_export_content(export, content)
+        return export.to_dict()
+
+    def page(self, page=1, page_size=HISTORY_PAGE_SIZE, **filters):
+        """Return (entries, total) for one page of history, newest first."""
+        Export = self.web_app.Export
+        query = self._query()
+        if filters.get('repo'):
+            query = query.filter(Export.repository.ilike(f"%{filters['repo']}%"))
+        if filters.get('role'):
+            query = query.filter(self.web_app.db.func.lower(Export.user_type) == _role_label(filters['role']))
+        if filters.get('since'):
+            query = query.filter(Export.date >= filters['since'])
+        if filters.get('until'):
+            query = query.filter(Export.date < filters['until'])
+
+        total = query.count()
+        exports = query.order_by(Export.date.desc(), Export.id.desc()).offset((page - 1) * page_size).limit(page_size).all()
+        return [export.to_dict() for export in exports], total
+
+    def get(self, export_id):
+        export = self._query().filter(self.web_app.Export.id == export_id).first()
+        return export.to_dict() if export else None
+
+    def remove(self, export_id):
+        """Soft delete, as the web app's delete button does."""
+        export = self._query().filter(self.web_app.Export.id == export_id).first()
+        if export:
+            export.is_deleted = True
+            export.deleted_at = datetime.utcnow()
+            self.web_app.db.session.commit()
+            self.web_app.remove_export_from_index(export.id)
+
+
+def page_count(total, page_size=HISTORY_PAGE_SIZE):
+    return max(math.ceil(total / page_size), 1)
+
+
+def open_export_store():
+    """The shared database store, or the data_exports.json store if the database is unavailable."""
+    username = cli_username()
+    try:
+        import web_app
+        with web_app.app.app_context():
+            user = web_app.User.query.filter_by(username=username).first()
+    except Exception as e:
+        print(f"\n⚠️  Could not open the shared database ({e}).")
+        print("History will be kept in data_exports.json until it is available.")
+        return JsonExportStore()
+
+    if user is None:
+        print(f"\n⚠️  CLI_USERNAME '{username}' is not a web app user.")
+        print("Register it in the web app to share history; using data_exports.json for now.")
+        return JsonExportStore()
+
+    return DatabaseExportStore(web_app, user.id)
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Better Jira Generator - Compression
+gzip/brotli compression of HTML, JSON and other text responses.
+
+Responses at least COMPRESS_MIN_SIZE bytes long are compressed with
+brotli when the client accepts it and the brotli package is installed,
+and with gzip otherwise. Streamed responses and files sent with
+send_file (exports, ZIP archives, range requests) are left alone.
+A compressed response's ETag becomes weak, since the bytes differ from
+the uncompressed ones while the content is the same.
+"""
+
+import gzip
+import os
+
+from flask import request
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_TYPES = {
+    'text/html',
+    'text/css',
+    'text/plain',
+    'text/markdown',
+    'application/javascript',
+    'text/javascript',
+    'application/json',
+    'application/x-ndjson',
+    'image/svg+xml',
+}
+
+# Levels for responses compressed per request; static assets are compressed once at the maximum
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+
+def min_size():
+    return int(os.environ.get('COMPRESS_MIN_SIZE', 1024))
+
+
+def available_encodings():
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def choose_encoding(accept_encodings, encodings=None):
+    """Best encoding the client accepts, preferring brotli, or None."""
+    for encoding in encodings or available_encodings():
+        if accept_encodings.quality(encoding) > 0:
+            return encoding
+    return None
+
+
+def compress(data, encoding, best=False):
+    if encoding == 'br':
+        return brotli.compress(data, quality=11 if best else BROTLI_QUALITY)
+    # mtime=0 keeps the output identical for identical input
+    return gzip.compress(data, compresslevel=9 if best else GZIP_LEVEL, mtime=0)
+
+
+def compress_response(response):
+    """after_request hook: compress a buffered text response when it is worth it."""
+    if (
+        response.direct_passthrough
+        or response.is_streamed
+        or response.status_code < 200
+        or response.status_code in (204, 206, 304)
+        or 'Content-Encoding' in response.headers
+        or response.mimetype not in COMPRESSIBLE_TYPES
+    ):
+        return response
+
+    response.vary.add('Accept-Encoding')
+    encoding = choose_encoding(request.accept_encodings)
+    if encoding is None:
+        return response
+
+    data = response.get_data()
+    if len(data) < min_size():
+        return response
+
+    response.set_data(compress(data, encoding))
+    response.headers['Content-Encoding'] = encoding
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
+
+
+def init_app(app):
+    """Compress the app's responses, unless COMPRESS_RESPONSES=0."""
+    if os.environ.get('COMPRESS_RESPONSES', '1') != '0':
+        app.after_request(compress_response)
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Better Jira Generator - Database Engine Profile
+Connection settings for running several gunicorn workers against one database.
+
+With SQLite's defaults every write takes an exclusive lock on the whole
+file, readers block the writer while it commits, and a worker that cannot
+get the lock in time fails with "database is locked". The `concurrent`
+profile (the default) sets these pragmas on every new connection:
+
+- journal_mode=WAL: readers and the writer no longer block each other
+- busy_timeout: a writer waits for the lock instead of failing at once
+- synchronous=NORMAL: WAL commits skip an fsync; still safe on power loss
+  short of losing the last transactions
+- mmap_size and cache_size: reads come from memory more often
+
+DB_PROFILE=default leaves SQLite's own settings alone. Postgres URLs get a
+sized connection pool with pre-ping, so connections dropped by the server
+are replaced instead of failing the request that picks them up.
+"""
+
+import os
+
+from sqlalchemy import event
+
+DB_PROFILES = ('concurrent', 'default')
+
+
+def database_url():
+    """DATABASE_URL, with Heroku's postgres:// scheme renamed to the postgresql:// SQLAlchemy expects."""
+    url = os.environ.get('DATABASE_URL', 'sqlite:///app.db')
+    if url.startswith('postgres://'):
+        url = 'postgresql://' + url[len('postgres://'):]
+    return url
+
+
+def db_profile():
+    profile = os.environ.get('DB_PROFILE', 'concurrent')
+    if profile not in DB_PROFILES:
+        raise ValueError(f'Unknown DB_PROFILE: {profile}')
+    return profile
+
+
+def sqlite_pragmas():
+    """PRAGMA name -> value applied to each new SQLite connection, in order."""
+    if db_profile() == 'default':
+        return {}
+    return {
+        'journal_mode': os.environ.get('SQLITE_JOURNAL_MODE', 'WAL'),
+        'busy_timeout': int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 10000)),
+        'synchronous': os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL'),
+        'mmap_size': int(os.environ.get('SQLITE_MMAP_SIZE_MB', 128)) * 1024 * 1024,
+        # Negative sizes are in KiB rather than pages
+        'cache_size': -int(os.environ.get('SQLITE_CACHE_SIZE_MB', 32)) * 1024,
+    }
+
+
+def engine_options(url):
+    """Keyword arguments for create_engine (SQLALCHEMY_ENGINE_OPTIONS) for a database URL."""
+    if url.startswith('postgresql'):
+        return {
+            'pool_size': int(os.environ.get('DB_POOL_SIZE', 5)),
+            'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW', 10)),
+            'pool_timeout': int(os.environ.get('DB_POOL_TIMEOUT', 30)),
+            'pool_recycle': int(os.environ.get('DB_POOL_RECYCLE', 1800)),
+            'pool_pre_ping': True,
+        }
+    return {}
+
+
+def apply_sqlite_pragmas(engine):
+    """Set sqlite_pragmas() on every connection the engine opens. Does nothing for other databases."""
+    if engine.dialect.name != 'sqlite':
+        return
+    pragmas = sqlite_pragmas()
+    if not pragmas:
+        return
+
+    @event.listens_for(engine, 'connect')
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f'PRAGMA {name}={value}')
+        finally:
+            cursor.close()
+
+
+def configure(app):
+    """Set the database URL and engine options before SQLAlchemy(app) creates the engine."""
+    url = database_url()
+    app.config['SQLALCHEMY_DATABASE_URI'] = url
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(url)
+
+
+def init_app(app, db):
+    """Apply the SQLite pragmas to the app's engine."""
+    with app.app_context():
+        apply_sqlite_pragmas(db.engine)
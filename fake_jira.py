@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Better Jira Generator - Fake Jira
+A local stand-in for the parts of the Jira REST v2 API the push pipeline
+uses: bulk create, label search and issue lookup. Issues live in memory.
+
+Tests start it on a free port with FakeJira().start() and can make it
+misbehave: fail_next() answers the next requests with an error before
+creating anything, and lose_next() creates the issues but answers 504,
+as if the response was lost on the way back. It can also be run by hand
+(`python fake_jira.py --port 8090`) and used with JIRA_URL=http://127.0.0.1:8090.
+"""
+
+import argparse
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+_LABELS_JQL = re.compile(r'labels\s+in\s*\((.*)\)', re.IGNORECASE)
+
+
+class FakeJira:
+    """In-memory Jira served over HTTP on 127.0.0.1."""
+
+    def __init__(self, port=0, project_keys=None, delay=0.0, require_auth=None):
+        self.issues = {}
+        self.requests = []
+        self.project_keys = set(project_keys) if project_keys else None
+        self.delay = delay
+        self.require_auth = require_auth
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._failures = []
+        self._lock = threading.Lock()
+        self._counter = 0
+        self.server = ThreadingHTTPServer(('127.0.0.1', port), self._handler())
+        self.server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        return f'http://127.0.0.1:{self.server.server_address[1]}'
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def fail_next(self, count=1, status=503, retry_after=None):
+        """Answer the next `count` bulk creates with `status` without creating anything."""
+        with self._lock:
+            self._failures.extend([('fail', status, retry_after)] * count)
+
+    def lose_next(self, count=1):
+        """Create the issues of the next `count` bulk creates but answer 504."""
+        with self._lock:
+            self._failures.extend([('lose', 504, None)] * count)
+
+    def bulk_create_calls(self):
+        return [r for r in self.requests if r['path'] == '/rest/api/2/issue/bulk']
+
+    def _create(self, fields):
+        errors = {}
+        if not fields.get('summary'):
+            errors['summary'] = 'You must specify a summary of the issue.'
+        project = (fields.get('project') or {}).get('key')
+        if not project or (self.project_keys is not None and project not in self.project_keys):
+            errors['project'] = 'valid project is required'
+        if errors:
+            return None, {'errorMessages': [], 'errors': errors}
+
+        with self._lock:
+            self._counter += 1
+            key = f'{project}-{self._counter}'
+            self.issues[key] = {'id': str(10000 + self._counter), 'key': key, 'fields': dict(fields)}
+        return self.issues[key], None
+
+    def bulk_create(self, body):
+        with self._lock:
+            failure = self._failures.pop(0) if self._failures else None
+        if failure and failure[0] == 'fail':
+            return failure[1], {'errorMessages': ['Service unavailable']}, failure[2]
+
+        issues, errors = [], []
+        for number, update in enumerate(body.get('issueUpdates', [])):
+            issue, error = self._create(update.get('fields', {}))
+            if error:
+                errors.append({'status': 400, 'elementErrors': error, 'failedElementNumber': number})
+            else:
+                issues.append({'id': issue['id'], 'key': issue['key'], 'self': f"{self.url}/rest/api/2/issue/{issue['id']}"})
+
+        if failure:
+            return failure[1], {'errorMessages': ['Gateway timeout']}, None
+        return (201 if issues else 400), {'issues': issues, 'errors': errors}, None
+
+    def search(self, query):
+        match = _LABELS_JQL.search(query.get('jql', [''])[0])
+        labels = set(re.findall(r'"([^"]+)"', match.group(1))) if match else set()
+        with self._lock:
+            found = [
+                {'id': issue['id'], 'key': issue['key'], 'fields': {'labels': issue['fields'].get('labels', [])}}
+                for issue in self.issues.values()
+                if labels & set(issue['fields'].get('labels', []))
+            ]
+        return 200, {'startAt': 0, 'total': len(found), 'issues': found}, None
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def _send(self, status, body, retry_after=None):
+                data = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                if retry_after is not None:
+                    self.send_header('Retry-After', str(retry_after))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _handle(self, method):
+                url = urlparse(self.path)
+                length = int(self.headers.get('Content-Length') or 0)
+                body = json.loads(self.rfile.read(length) or b'{}') if length else {}
+                with fake._lock:
+                    fake.requests.append({'method': method, 'path': url.path, 'body': body})
+                    fake.in_flight += 1
+                    fake.max_in_flight = max(fake.max_in_flight, fake.in_flight)
+                try:
+                    if fake.require_auth and self.headers.get('Authorization') != fake.require_auth:
+                        return self._send(401, {'errorMessages': ['Unauthorized']})
+                    if fake.delay:
+                        time.sleep(fake.delay)
+                    if method == 'POST' and url.path == '/rest/api/2/issue/bulk':
+                        return self._send(*fake.bulk_create(body))
+                    if method == 'GET' and url.path == '/rest/api/2/search':
+                        return self._send(*fake.search(parse_qs(url.query)))
+                    if method == 'GET' and url.path.startswith('/rest/api/2/issue/'):
+                        issue = fake.issues.get(url.path.rsplit('/', 1)[1])
+                        if issue:
+                            return self._send(200, issue)
+                        return self._send(404, {'errorMessages': ['Issue does not exist']})
+                    return self._send(404, {'errorMessages': ['Not found']})
+                finally:
+                    with fake._lock:
+                        fake.in_flight -= 1
+
+            def do_GET(self):
+                self._handle('GET')
+
+            def do_POST(self):
+                self._handle('POST')
+
+        return Handler
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Run a local fake Jira server')
+    parser.add_argument('--port', type=int, default=8090)
+    args = parser.parse_args()
+    jira = FakeJira(port=args.port)
+    print(f'Fake Jira listening on {jira.url} (Ctrl+C to stop)')
+    try:
+        jira.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,32 @@
+"""
+Gunicorn settings for `gunicorn web_app:app` and `gunicorn asgi:app -k uvicorn.workers.UvicornWorker` (loaded automatically from the working directory).
+"""
+
+import os
+import shutil
+import tempfile
+
+# Each worker writes its metrics here so /metrics can aggregate across workers.
+# This must be set before the workers import prometheus_client.
+os.environ.setdefault(
+    'PROMETHEUS_MULTIPROC_DIR',
+    os.path.join(tempfile.gettempdir(), 'jira-generator-metrics'),
+)
+
+
+def on_starting(server):
+    """Start every server with an empty metrics directory and precompressed static assets."""
+    metrics_dir = os.environ['PROMETHEUS_MULTIPROC_DIR']
+    shutil.rmtree(metrics_dir, ignore_errors=True)
+    os.makedirs(metrics_dir, exist_ok=True)
+
+    from static_assets import StaticAssets
+
+    StaticAssets().build()
+
+
+def child_exit(server, worker):
+    """Drop live gauges of a worker that exited."""
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
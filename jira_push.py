@@ -0,0 +1,356 @@
+#!/usr/bin/env python3
+"""
+Better Jira Generator - Jira Push
+Turn an export into Jira issues and create them with the bulk-create API.
+
+Each `###` section of an export (or `##` section without subsections)
+becomes one issue. Issues are sent in batches of up to 50, the most
+/rest/api/2/issue/bulk accepts, with a few batches in flight at once.
+Batches that hit a rate limit, a 5xx or a network error are retried with
+backoff. A push runs inside the request, so a Retry-After longer than
+JIRA_MAX_RETRY_AFTER, or a retry that would end after JIRA_PUSH_TIMEOUT,
+fails the batch instead of waiting; pushing again resumes it. Each request
+also times out when the push's time is up, so one slow answer cannot hold
+the push past JIRA_PUSH_TIMEOUT either.
+
+Every issue carries an idempotency key, derived from the export's key and
+the issue summary, as a label. The keys of issues already created are
+stored on the export, so pushing again only sends new or renamed
+sections. When a batch fails without a usable answer (a timeout, or a 5xx
+after Jira may already have created some issues), the issues are looked up
+by label before the batch is retried, so a lost response never creates
+duplicates.
+"""
+
+import hashlib
+import logging
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+# Jira rejects bulk-create requests with more issues than this
+MAX_BATCH_SIZE = 50
+LABEL_PREFIX = 'bjg-'
+GENERATOR_LABEL = 'better-jira-generator'
+SUMMARY_LIMIT = 255
+DESCRIPTION_LIMIT = 32000
+# Longest Retry-After honoured, and the time a whole push may take, in seconds
+MAX_RETRY_AFTER = 10.0
+PUSH_TIMEOUT = 20.0
+
+_HEADING = re.compile(r'^(#{1,3})\s+(.*?)\s*#*\s*$')
+# Setext-style underlines the model likes to put under headings
+_UNDERLINE = re.compile(r'^\s*(=+|-+)\s*$')
+_LIST_ITEM = re.compile(r'^(\s*)([*+-]|\d+\.)\s+(.*)$')
+
+
+class JiraError(Exception):
+    """A Jira request failed. `retryable` is set for rate limits, 5xx and network errors."""
+
+    def __init__(self, message, status=None, retryable=False, retry_after=None):
+        super().__init__(message)
+        self.status = status
+        self.retryable = retryable
+        self.retry_after = retry_after
+
+
+def jira_settings():
+    """Jira connection and push settings from the environment."""
+    return {
+        'url': os.environ.get('JIRA_URL', '').rstrip('/'),
+        'email': os.environ.get('JIRA_EMAIL'),
+        'api_token': os.environ.get('JIRA_API_TOKEN'),
+        'project_key': os.environ.get('JIRA_PROJECT_KEY'),
+        'issue_type': os.environ.get('JIRA_ISSUE_TYPE', 'Task'),
+        'batch_size': min(int(os.environ.get('JIRA_BATCH_SIZE', MAX_BATCH_SIZE)), MAX_BATCH_SIZE),
+        'concurrency': int(os.environ.get('JIRA_CONCURRENCY', 4)),
+        'max_retries': int(os.environ.get('JIRA_MAX_RETRIES', 3)),
+        'max_retry_after': float(os.environ.get('JIRA_MAX_RETRY_AFTER', MAX_RETRY_AFTER)),
+        'push_timeout': float(os.environ.get('JIRA_PUSH_TIMEOUT', PUSH_TIMEOUT)),
+    }
+
+
+class JiraClient:
+    """Minimal Jira REST v2 client: bulk create and label lookup."""
+
+    def __init__(self, base_url, email=None, api_token=None, timeout=PUSH_TIMEOUT, pool_size=4):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.session = requests.Session()
+        # Keep one pooled connection per concurrent batch
+        adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.session.headers['Accept'] = 'application/json'
+        if email and api_token:
+            self.session.auth = (email, api_token)  # Jira Cloud: email + API token
+        elif api_token:
+            self.session.headers['Authorization'] = f'Bearer {api_token}'  # Server/Data Center PAT
+
+    @classmethod
+    def from_env(cls):
+        settings = jira_settings()
+        if not settings['url']:
+            raise ValueError('JIRA_URL not found in environment variables')
+        return cls(settings['url'], settings['email'], settings['api_token'],
+                   timeout=settings['push_timeout'], pool_size=settings['concurrency'])
+
+    def _request(self, method, path, deadline=None, **kwargs):
+        # Never wait for an answer past the push's deadline (a time.monotonic() value)
+        timeout = self.timeout
+        if deadline is not None:
+            timeout = min(timeout, deadline - time.monotonic())
+            if timeout <= 0:
+                raise JiraError('Jira push timed out')
+        try:
+            response = self.session.request(method, self.base_url + path, timeout=timeout, **kwargs)
+        except requests.RequestException as e:
+            raise JiraError(f'Jira request failed: {e}', retryable=True) from e
+
+        if response.status_code == 429 or response.status_code >= 500:
+            retry_after = response.headers.get('Retry-After')
+            raise JiraError(
+                f'Jira returned {response.status_code}',
+                status=response.status_code,
+                retryable=True,
+                retry_after=float(retry_after) if retry_after and retry_after.isdigit() else None,
+            )
+        return response
+
+    def bulk_create(self, issue_updates, deadline=None):
+        """
+        POST /rest/api/2/issue/bulk. Returns Jira's body: `issues` for the
+        elements created, in order, and `errors` with failedElementNumber.
+        """
+        response = self._request('POST', '/rest/api/2/issue/bulk', deadline, json={'issueUpdates': issue_updates})
+        body = response.json() if response.content else {}
+        # 400 means every element failed; the body still lists why
+        if response.status_code not in (200, 201, 400) or (response.status_code == 400 and 'errors' not in body):
+            raise JiraError(f'Jira returned {response.status_code}: {response.text[:200]}', status=response.status_code)
+        return {'issues': body.get('issues', []), 'errors': body.get('errors', [])}
+
+    def find_by_labels(self, labels, deadline=None):
+        """Issue keys of existing issues carrying any of `labels`, as {label: issue key}."""
+        quoted = ', '.join(f'"{label}"' for label in labels)
+        response = self._request('GET', '/rest/api/2/search', deadline, params={
+            'jql': f'labels in ({quoted})',
+            'fields': 'labels',
+            'maxResults': len(labels),
+        })
+        if response.status_code != 200:
+            raise JiraError(f'Jira search returned {response.status_code}', status=response.status_code)
+
+        wanted = set(labels)
+        found = {}
+        for issue in response.json().get('issues', []):
+            for label in issue.get('fields', {}).get('labels', []):
+                if label in wanted:
+                    found[label] = issue['key']
+        return found
+
+
+def issue_key(export_key, summary):
+    """Idempotency key of one issue: the export's key plus its summary."""
+    return LABEL_PREFIX + hashlib.sha256(f'{export_key}:{summary}'.encode()).hexdigest()[:16]
+
+
+def split_sections(content):
+    """
+    (summary, description) for each `###` section, or `##` section without
+    subsections. Summaries are prefixed with their `##` parent.
+    """
+    sections = []
+    parent = None
+    current = None
+    for line in content.splitlines():
+        if _UNDERLINE.match(line):
+            continue
+        match = _HEADING.match(line)
+        if match:
+            level, title = len(match.group(1)), match.group(2).strip()
+            if level == 1:
+                parent = current = None
+                continue
+            if level == 2:
+                current = parent = [title, []]
+            else:
+                # A `##` section with nothing but subsections is replaced by them
+                if current is parent and parent is not None and not ''.join(parent[1]).strip():
+                    sections.remove(parent)
+                current = [f'{parent[0]}: {title}' if parent else title, []]
+            sections.append(current)
+        elif current is not None:
+            current[1].append(line)
+
+    return [(summary, '\n'.join(lines).strip()) for summary, lines in sections if summary]
+
+
+def to_jira_markup(text):
+    """Convert the markdown the model writes to Jira wiki markup (nested lists, bold, code)."""
+    text = re.sub(r'\*\*(.+?)\*\*', r'*\1*', text)
+    text = re.sub(r'`([^`]+)`', r'{{\1}}', text)
+
+    lines = []
+    indents = []  # indentation of each open list level
+    for line in text.split('\n'):
+        match = _LIST_ITEM.match(line)
+        if not match:
+            if line.strip():
+                indents = []
+            lines.append(line)
+            continue
+        indent = len(match.group(1).expandtabs(4))
+        while indents and indents[-1] > indent:
+            indents.pop()
+        if not indents or indents[-1] < indent:
+            indents.append(indent)
+        marker = '#' if match.group(2)[0].isdigit() else '*'
+        lines.append(marker * len(indents) + ' ' + match.group(3))
+    return '\n'.join(lines)
+
+
+def build_issues(content, export_key, project_key, issue_type='Task', labels=()):
+    """
+    Jira issue payloads for an export's content, as a list of
+    (idempotency key, issueUpdate) pairs. Duplicate summaries are sent once.
+    """
+    issues = []
+    seen = set()
+    for summary, description in split_sections(content):
+        summary = summary[:SUMMARY_LIMIT]
+        key = issue_key(export_key, summary)
+        if key in seen:
+            continue
+        seen.add(key)
+        issues.append((key, {'fields': {
+            'project': {'key': project_key},
+            'issuetype': {'name': issue_type},
+            'summary': summary,
+            'description': to_jira_markup(description)[:DESCRIPTION_LIMIT],
+            'labels': [GENERATOR_LABEL, key, *labels],
+        }}))
+    return issues
+
+
+def _backoff(attempt, retry_after=None):
+    if retry_after is not None:
+        return retry_after
+    return min(0.5 * 2 ** attempt, 10.0)
+
+
+def _failures(pending, error):
+    return [{'key': key, 'summary': update['fields']['summary'], 'error': error} for key, update in pending]
+
+
+def push_batch(client, batch, max_retries=3, sleep=time.sleep, deadline=None, max_retry_after=MAX_RETRY_AFTER):
+    """
+    Create one batch of (idempotency key, issueUpdate) pairs. Returns
+    ({idempotency key: issue key}, [{'key', 'summary', 'error'}]).
+    `deadline` is a time.monotonic() value after which no request or retry is started.
+    """
+    created = {}
+    failed = []
+    pending = list(batch)
+    if deadline is not None and time.monotonic() >= deadline:
+        return created, _failures(pending, 'Jira push timed out before this batch was sent')
+
+    attempt = 0
+    while pending:
+        try:
+            result = client.bulk_create([update for _, update in pending], deadline)
+        except JiraError as e:
+            if not e.retryable or attempt >= max_retries:
+                failed.extend(_failures(pending, str(e)))
+                break
+            delay = _backoff(attempt, e.retry_after)
+            if delay > max_retry_after:
+                failed.extend(_failures(pending, f'{e}; Jira asked to retry after {delay:.0f}s'))
+                break
+            if deadline is not None and time.monotonic() + delay >= deadline:
+                failed.extend(_failures(pending, f'{e}; Jira push timed out'))
+                break
+            sleep(delay)
+            attempt += 1
+            # Jira may have created some of the batch before failing; never send those twice
+            try:
+                existing = client.find_by_labels([key for key, _ in pending], deadline)
+            except JiraError as lookup_error:
+                failed.extend(_failures(pending, str(lookup_error)))
+                break
+            created.update(existing)
+            pending = [(key, update) for key, update in pending if key not in existing]
+            continue
+
+        failed_numbers = {}
+        for error in result['errors']:
+            messages = error.get('elementErrors', {})
+            detail = '; '.join(list(messages.get('errorMessages', [])) + [
+                f'{field}: {message}' for field, message in messages.get('errors', {}).items()
+            ])
+            failed_numbers[error.get('failedElementNumber')] = detail or f"Jira returned {error.get('status')}"
+
+        accepted = []
+        for number, (key, update) in enumerate(pending):
+            if number in failed_numbers:
+                failed.append({'key': key, 'summary': update['fields']['summary'], 'error': failed_numbers[number]})
+            else:
+                accepted.append((key, update))
+
+        if len(result['issues']) == len(accepted):
+            created.update((key, issue['key']) for (key, _), issue in zip(accepted, result['issues']))
+            break
+
+        # The issues cannot be matched to elements by position; find the ones created by label
+        error = f"Jira returned {len(result['issues'])} issues for {len(accepted)} accepted elements"
+        try:
+            existing = client.find_by_labels([key for key, _ in accepted], deadline)
+        except JiraError as lookup_error:
+            failed.extend(_failures(accepted, f'{error}; {lookup_error}'))
+            break
+        created.update(existing)
+        failed.extend(_failures([(key, update) for key, update in accepted if key not in existing], error))
+        break
+    return created, failed
+
+
+def push_issues(client, issues, already_created=None, batch_size=MAX_BATCH_SIZE, concurrency=4,
+                max_retries=3, on_batch=None, timeout=None, max_retry_after=MAX_RETRY_AFTER):
+    """
+    Create the issues not in `already_created` ({idempotency key: issue key}),
+    `batch_size` at a time with up to `concurrency` batches in flight.
+    `on_batch(created, failed)` is called from the calling thread as each batch
+    finishes, so progress can be saved. Batches not finished within `timeout`
+    seconds are reported as failed. Returns {'created', 'skipped', 'failed'}.
+    """
+    deadline = time.monotonic() + timeout if timeout else None
+    already_created = already_created or {}
+    to_send = [(key, update) for key, update in issues if key not in already_created]
+    batch_size = max(1, min(batch_size, MAX_BATCH_SIZE))
+    batches = [to_send[i:i + batch_size] for i in range(0, len(to_send), batch_size)]
+
+    created = {}
+    failed = []
+    # The executor's work queue holds the batches; only `concurrency` run at once
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+        futures = [
+            executor.submit(push_batch, client, batch, max_retries, deadline=deadline, max_retry_after=max_retry_after)
+            for batch in batches
+        ]
+        for future in as_completed(futures):
+            batch_created, batch_failed = future.result()
+            created.update(batch_created)
+            failed.extend(batch_failed)
+            if on_batch:
+                on_batch(batch_created, batch_failed)
+
+    logger.info('Jira push: %d created, %d skipped, %d failed', len(created), len(issues) - len(to_send), len(failed))
+    return {
+        'created': created,
+        'skipped': {key: already_created[key] for key, _ in issues if key in already_created},
+        'failed': failed,
+    }
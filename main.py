@@ -4,16 +4,33 @@ Better Jira Generator - CLI Prototype
 A chatbot to help product managers and developers with Jira task descriptions.
 """
 
+import asyncio
 import os
 import sys
 import json
+import time
 from pathlib import Path
 from datetime import datetime
-from groq import Groq
+from groq import AsyncGroq, Groq
 from dotenv import load_dotenv
 import PyPDF2
 from docx import Document
 
+import cli_store
+import task_brief
+import token_budget
+
+DEFAULT_MODEL = "llama-3.1-8b-instant"
+
+# Compacted task files, shared by the CLI and every web worker through TASK_BRIEF_DIR
+task_briefs = task_brief.BriefCache(
+    os.environ.get('TASK_BRIEF_DIR', 'task_briefs'),
+    max_entries=int(os.environ.get('TASK_BRIEF_CACHE_SIZE', 64)),
+)
+
+# Callables notified after every LLM call with a dict describing it (see create_chat_completion)
+LLM_CALL_HOOKS = []
+
 
 def check_env_file():
     """Check if .env file exists and has required API key and save folder."""
@@ -103,31 +120,6 @@ def check_save_folder():
     return str(save_path)
 
 
-def load_exports_data():
-    """Load the data_exports.json file."""
-    exports_file = Path('data_exports.json')
-    
-    if not exports_file.exists():
-        return {'exports': []}
-    
-    try:
-        with open(exports_file, 'r') as f:
-            return json.load(f)
-    except Exception as e:
-        print(f"⚠️  Warning: Could not load exports data: {e}")
-        return {'exports': []}
-
-
-def save_exports_data(data):
-    """Save data to data_exports.json file."""
-    exports_file = Path('data_exports.json')
-    try:
-        with open(exports_file, 'w') as f:
-            json.dump(data, f, indent=2)
-    except Exception as e:
-        print(f"❌ Error saving exports data: {e}")
-
-
 def load_session_data():
     """Load the saved_session.json file."""
     session_file = Path('saved_session.json')
@@ -207,8 +199,56 @@ def check_saved_session():
             print("❌ Please enter 'y' or 'n'.")
 
 
-def save_chat_to_file(messages, save_folder, role, repo_url, file_info=None):
-    """Save chat conversation to a markdown file."""
+def sanitize_filename(name):
+    """Reduce a user-supplied name to letters, digits, '-' and '_'."""
+    name = "".join(c for c in name if c.isalnum() or c in (' ', '-', '_')).strip()
+    return name.replace(' ', '_')
+
+
+def format_chat_header(role, repo_url, file_info=None):
+    """Markdown header written at the top of a chat export."""
+    content = f"""# Better Jira Generator - Chat Export
+
+**Date:** {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}  
+**Role:** {role.replace('_', ' ').title()}  
+**Repository:** {repo_url}  
+"""
+    
+    if file_info:
+        content += f"**Task File:** {file_info.get('name') or file_info.get('filename')}  \n"
+    
+    return content + "\n---\n\n"
+
+
+def format_chat_turns(messages):
+    """Markdown for user and assistant messages, in the chat export format."""
+    content = ""
+    for msg in messages:
+        if msg['role'] == 'user':
+            content += f"## User\n\n{msg['content']}\n\n"
+        elif msg['role'] == 'assistant':
+            content += f"## Assistant\n\n{msg['content']}\n\n"
+    return content
+
+
+def parse_chat_markdown(content):
+    """Parse a chat export back into user and assistant messages."""
+    messages = []
+    sections = content.split('## ')
+    
+    for section in sections[1:]:  # Skip header
+        if section.startswith('User'):
+            msg_content = section.replace('User\n\n', '', 1).strip()
+            messages.append({'role': 'user', 'content': msg_content})
+        elif section.startswith('Assistant'):
+            msg_content = section.replace('Assistant\n\n', '', 1).strip()
+            messages.append({'role': 'assistant', 'content': msg_content})
+    
+    return messages
+
+
+def save_chat_to_file(store, messages, save_folder, role, repo_url, file_info=None):
+    """Save chat conversation to a markdown file and register it in the export store."""
     print("\n" + "-"*60)
     print("SAVE CHAT")
     print("-"*60)
@@ -224,9 +264,7 @@ def save_chat_to_file(messages, save_folder, role, repo_url, file_info=None):
             print("❌ Filename cannot be empty.")
             continue
         
-        # Sanitize filename
-        filename = "".join(c for c in filename if c.isalnum() or c in (' ', '-', '_')).strip()
-        filename = filename.replace(' ', '_')
+        filename = sanitize_filename(filename)
         
         if not filename:
             print("❌ Please enter a valid filename.")
@@ -239,33 +277,14 @@ def save_chat_to_file(messages, save_folder, role, repo_url, file_info=None):
     full_filename = f"{filename}_{timestamp}.md"
     file_path = Path(save_folder) / full_filename
     
-    # Build markdown content
-    content = f"""# Better Jira Generator - Chat Export
-
-**Date:** {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}  
-**Role:** {role.replace('_', ' ').title()}  
-**Repository:** {repo_url}  
-"""
-    
-    if file_info:
-        content += f"**Task File:** {file_info['name']}  \n"
-    
-    content += "\n---\n\n"
-    
-    # Add conversation (skip system message)
-    for msg in messages[1:]:  # Skip system prompt
-        if msg['role'] == 'user':
-            content += f"## User\n\n{msg['content']}\n\n"
-        elif msg['role'] == 'assistant':
-            content += f"## Assistant\n\n{msg['content']}\n\n"
+    # Build markdown content (skip system message)
+    content = format_chat_header(role, repo_url, file_info) + format_chat_turns(messages[1:])
     
     # Save file
     try:
         with open(file_path, 'w', encoding='utf-8') as f:
             f.write(content)
         
-        # Register in data_exports.json
-        exports_data = load_exports_data()
         export_entry = {
             'filename': full_filename,
             'original_name': filename,
@@ -274,8 +293,7 @@ def save_chat_to_file(messages, save_folder, role, repo_url, file_info=None):
             'repository': repo_url,
             'file_path': str(file_path)
         }
-        exports_data['exports'].append(export_entry)
-        save_exports_data(exports_data)
+        store.add(export_entry, content)
         
         print(f"\n✓ Chat saved successfully!")
         print(f"  File: {full_filename}")
@@ -288,47 +306,52 @@ def save_chat_to_file(messages, save_folder, role, repo_url, file_info=None):
         return None
 
 
-def list_chat_history():
-    """Display list of saved chats."""
-    exports_data = load_exports_data()
-    exports = exports_data.get('exports', [])
+def list_chat_history(store, page=1, filters=None):
+    """Display one page of saved chats, newest first. Returns (page shown, page count, total chats)."""
+    filters = filters or {}
+    page_count = 1
+    entries, total = store.page(page, **filters)
     
-    if not exports:
+    if total:
+        page_count = cli_store.page_count(total)
+        if page > page_count:
+            page = page_count
+            entries, total = store.page(page, **filters)
+    
+    if not entries:
         print("\n" + "-"*60)
         print("No saved chats found.")
         print("-"*60)
-        return
+        return page, page_count, total
     
     print("\n" + "="*60)
-    print("CHAT HISTORY")
+    print(f"CHAT HISTORY - page {page} of {page_count} ({total} chats)")
     print("="*60)
     
-    for i, export in enumerate(exports, 1):
-        date_obj = datetime.fromisoformat(export['date'])
-        date_str = date_obj.strftime("%Y-%m-%d %H:%M")
+    for export in entries:
+        date_str = export['date'][:16].replace('T', ' ') if export.get('date') else 'N/A'
         
-        print(f"\n{i}. {export['original_name']}")
+        print(f"\n#{export['id']}. {export.get('original_name') or export['filename']}")
         print(f"   File: {export['filename']}")
         print(f"   Date: {date_str}")
-        print(f"   Role: {export['user_type']}")
-        print(f"   Repo: {export['repository']}")
+        print(f"   Role: {export.get('user_type') or 'N/A'}")
+        print(f"   Repo: {export.get('repository') or 'N/A'}")
     
     print("\n" + "="*60)
+    if page_count > 1 or not store.online:
+        print("HISTORY <page> repo=<text> role=<role> since=<YYYY-MM-DD> until=<YYYY-MM-DD>")
+    if not store.online:
+        print("(Offline: showing data_exports.json)")
+    return page, page_count, total
 
 
-def load_chat_from_file(save_folder):
+def load_chat_from_file(store, save_folder):
     """Load an existing chat file and return its messages."""
-    exports_data = load_exports_data()
-    exports = exports_data.get('exports', [])
-    
-    if not exports:
-        print("\n❌ No saved chats found.")
+    page, page_count, total = list_chat_history(store)
+    if not total:
         return None, None, None
     
-    # Display list
-    list_chat_history()
-    
-    print("\nEnter the number of the chat to open (or 'cancel' to go back):")
+    print("\nEnter the # of the chat to open, 'n'/'p' for the next/previous page, or 'cancel' to go back:")
     
     while True:
         choice = input("\nChoice: ").strip()
@@ -336,61 +359,55 @@ def load_chat_from_file(save_folder):
         if choice.upper() in ['EXIT', 'CANCEL']:
             return None, None, None
         
+        if choice.lower() in ('n', 'p'):
+            page = min(page + 1, page_count) if choice.lower() == 'n' else max(page - 1, 1)
+            page, page_count, total = list_chat_history(store, page)
+            continue
+        
         try:
-            idx = int(choice) - 1
-            if 0 <= idx < len(exports):
-                export = exports[idx]
-                file_path = Path(export['file_path'])
-                
-                if not file_path.exists():
-                    print(f"\n❌ File not found: {file_path}")
-                    print("The file may have been moved or deleted.")
-                    print("\nWhat would you like to do?")
-                    print("1. Delete this entry from history")
-                    print("2. Keep the entry in history")
-                    
-                    while True:
-                        action = input("\nChoice (1 or 2): ").strip()
-                        
-                        if action == '1':
-                            # Remove entry from exports
-                            exports.remove(export)
-                            exports_data['exports'] = exports
-                            save_exports_data(exports_data)
-                            print("\n✓ Entry removed from history.")
-                            break
-                        elif action == '2':
-                            print("\n✓ Entry kept in history.")
-                            break
-                        else:
-                            print("❌ Please enter 1 or 2.")
-                    
-                    continue
-                
-                # Read the file and extract messages
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    content = f.read()
-                
-                # Parse markdown content back to messages
-                messages = []
-                sections = content.split('## ')
-                
-                for section in sections[1:]:  # Skip header
-                    if section.startswith('User'):
-                        msg_content = section.replace('User\n\n', '', 1).strip()
-                        messages.append({'role': 'user', 'content': msg_content})
-                    elif section.startswith('Assistant'):
-                        msg_content = section.replace('Assistant\n\n', '', 1).strip()
-                        messages.append({'role': 'assistant', 'content': msg_content})
-                
-                print(f"\n✓ Loaded chat: {export['original_name']}")
-                print(f"  {len(messages)} messages loaded")
-                
-                return messages, export.get('repository', ''), export.get('user_type', '').lower().replace(' ', '_')
-            else:
-                print(f"❌ Please enter a number between 1 and {len(exports)}.")
+            export = store.get(int(choice.lstrip('#')))
         except ValueError:
             print("❌ Please enter a valid number.")
+            continue
+        
+        if not export:
+            print("❌ No chat with that number. Pick one from the list above.")
+            continue
+        
+        file_path = Path(export['file_path'] or '')
+        
+        if not export['file_path'] or not file_path.exists():
+            print(f"\n❌ File not found: {file_path}")
+            print("The file may have been moved or deleted.")
+            print("\nWhat would you like to do?")
+            print("1. Delete this entry from history")
+            print("2. Keep the entry in history")
+            
+            while True:
+                action = input("\nChoice (1 or 2): ").strip()
+                
+                if action == '1':
+                    store.remove(export['id'])
+                    print("\n✓ Entry removed from history.")
+                    break
+                elif action == '2':
+                    print("\n✓ Entry kept in history.")
+                    break
+                else:
+                    print("❌ Please enter 1 or 2.")
+            
+            continue
+        
+        # Read the file and extract messages
+        with open(file_path, 'r', encoding='utf-8') as f:
+            content = f.read()
+        
+        messages = parse_chat_markdown(content)
+        
+        print(f"\n✓ Loaded chat: {export.get('original_name') or export['filename']}")
+        print(f"  {len(messages)} messages loaded")
+        
+        return messages, export.get('repository') or '', (export.get('user_type') or '').lower().replace(' ', '_')
 
 
 def get_user_role():
@@ -530,11 +547,37 @@ def get_github_repo():
             print("❌ Please enter a valid repository URL.")
 
 
-def get_system_prompt(role, repo_url, task_content=None):
-    """Generate system prompt based on user role and optional task file."""
+def summarize_task_brief(client, brief, context=None):
+    """Condense a task brief with the LLM; used once per document by task_briefs."""
+    messages = [
+        {
+            "role": "system",
+            "content": "Condense this task document for use as context in later conversations. Keep every "
+                       "requirement, constraint, name, number and acceptance criterion; drop background, "
+                       "repetition and prose. Reply with the condensed document in markdown only.",
+        },
+        {"role": "user", "content": brief},
+    ]
+    response = create_chat_completion(client, messages, max_tokens=1024, temperature=0.2, context=context)
+    return response.choices[0].message.content
+
+
+def get_task_brief(task_content, client=None, context=None):
+    """(document hash, brief) of a task file, compacted once per document and summarized once if enabled."""
+    summarize = (lambda brief: summarize_task_brief(client, brief, context)) if client is not None else None
+    return task_briefs.get(task_content, summarize=summarize)
+
+
+def get_system_prompt(role, repo_url, task_content=None, client=None, context=None):
+    """
+    Generate system prompt based on user role and optional task file.
+    The task file is sent as its cached brief; with a client the brief
+    may be summarized (see task_brief).
+    """
     task_context = ""
     if task_content:
-        task_context = f"\n\nThe user has provided this task description:\n---\n{task_content}\n---\n"
+        _, brief = get_task_brief(task_content, client, context)
+        task_context = f"\n\nThe user has provided this task description:\n---\n{brief}\n---\n"
     
     if role == 'product_manager':
         return f"""You are an AI assistant helping a Product Manager write clear, detailed Jira task descriptions.
@@ -572,9 +615,10 @@ def show_help():
     print("="*60)
     print("\n  NEW     - Start a new chat session")
     print("  SAVE    - Save current chat to markdown file")
-    print("  HISTORY - View saved chat history")
+    print("  HISTORY - View saved chat history (HISTORY <page> repo=... role=... since=... until=...)")
     print("  OPEN    - Open and continue a saved chat")
     print("  LIST    - View loaded resources")
+    print("  TASK    - Show the task brief sent to the assistant (TASK FULL adds the full task file to the chat)")
     print("  HELP    - Show this help message")
     print("  EXIT    - Quit the program")
     print("\n" + "="*60)
@@ -589,20 +633,150 @@ def get_groq_client():
     return Groq(api_key=api_key)
 
 
-def update_markdown_with_ai(client, current_content, user_message, role, repo_url):
+def get_async_groq_client():
+    """Initialize and return an asyncio Groq client."""
+    load_dotenv()
+    api_key = os.getenv('GROQ_API_KEY')
+    if not api_key:
+        raise ValueError("GROQ_API_KEY not found in environment variables")
+    return AsyncGroq(api_key=api_key)
+
+
+def _new_call_record(model, context):
+    return {
+        'model': model,
+        'context': context or {},
+        'outcome': 'success',
+        'error': None,
+        'prompt_tokens': None,
+        'completion_tokens': None,
+        'queue_time': None,
+        'time_to_first_token': None,
+    }
+
+
+def _record_usage(record, response):
+    usage = getattr(response, 'usage', None)
+    if usage is not None:
+        record['prompt_tokens'] = getattr(usage, 'prompt_tokens', None)
+        record['completion_tokens'] = getattr(usage, 'completion_tokens', None)
+        record['queue_time'] = getattr(usage, 'queue_time', None)
+
+
+def _notify_hooks(record, started):
+    record['duration'] = time.perf_counter() - started
+    for hook in LLM_CALL_HOOKS:
+        try:
+            hook(record)
+        except Exception:
+            # Instrumentation must never break the call itself
+            pass
+
+
+def create_chat_completion(client, messages, max_tokens=1024, temperature=0.7, model=DEFAULT_MODEL, context=None,
+                           response_format=None):
     """
-    Use AI to update markdown content based on user message.
-    
+    Send a chat completion request and report it to every hook in LLM_CALL_HOOKS.
+
     Args:
         client: Groq API client
-        current_content: Current markdown content
-        user_message: User's message to update the content
-        role: User role (Product Manager or Developer)
-        repo_url: Repository URL for context
-    
+        messages: Conversation messages to send
+        max_tokens: Maximum tokens in the reply; lowered if the prompt leaves less room
+        temperature: Sampling temperature
+        model: Model name
+        context: Optional dict passed through to hooks (e.g. user_id, export_id)
+        response_format: Optional response format, e.g. {'type': 'json_object'} for JSON mode
+
     Returns:
-        Updated markdown content
+        The Groq chat completion response
+
+    Raises:
+        token_budget.TokenBudgetError: if the prompt is too large to send
+    """
+    # Refuses prompts too large for the model and lowers max_tokens to the room left
+    max_tokens = token_budget.check(messages, model, max_tokens)['max_tokens']
+    record = _new_call_record(model, context)
+    started = time.perf_counter()
+    try:
+        response = client.chat.completions.create(
+            model=model,
+            messages=messages,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            **({'response_format': response_format} if response_format else {}),
+        )
+        _record_usage(record, response)
+        return response
+    except Exception as e:
+        record['outcome'] = 'error'
+        record['error'] = type(e).__name__
+        raise
+    finally:
+        _notify_hooks(record, started)
+
+
+async def acreate_chat_completion(client, messages, max_tokens=1024, temperature=0.7, model=DEFAULT_MODEL, context=None,
+                                  response_format=None):
+    """Async version of create_chat_completion for an AsyncGroq client."""
+    # Refuses prompts too large for the model and lowers max_tokens to the room left
+    max_tokens = (await asyncio.to_thread(token_budget.check, messages, model, max_tokens))['max_tokens']
+    record = _new_call_record(model, context)
+    started = time.perf_counter()
+    try:
+        response = await client.chat.completions.create(
+            model=model,
+            messages=messages,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            **({'response_format': response_format} if response_format else {}),
+        )
+        _record_usage(record, response)
+        return response
+    except Exception as e:
+        record['outcome'] = 'error'
+        record['error'] = type(e).__name__
+        raise
+    finally:
+        _notify_hooks(record, started)
+
+
+async def astream_chat_completion(client, messages, max_tokens=1024, temperature=0.7, model=DEFAULT_MODEL, context=None):
     """
+    Stream a chat completion from an AsyncGroq client, yielding reply text as it arrives.
+
+    Hooks are notified once the stream ends, with time_to_first_token set
+    and token counts taken from the final chunk.
+    """
+    # Refuses prompts too large for the model and lowers max_tokens to the room left
+    max_tokens = (await asyncio.to_thread(token_budget.check, messages, model, max_tokens))['max_tokens']
+    record = _new_call_record(model, context)
+    started = time.perf_counter()
+    try:
+        stream = await client.chat.completions.create(
+            model=model,
+            messages=messages,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            stream=True,
+        )
+        async for chunk in stream:
+            if getattr(chunk, 'x_groq', None) is not None:
+                _record_usage(record, chunk.x_groq)
+            text = chunk.choices[0].delta.content if chunk.choices else None
+            if text:
+                if record['time_to_first_token'] is None:
+                    record['time_to_first_token'] = time.perf_counter() - started
+                yield text
+    except Exception as e:
+        record['outcome'] = 'error'
+        record['error'] = type(e).__name__
+        raise
+    finally:
+        _notify_hooks(record, started)
+
+
+def build_update_messages(current_content, user_message, role, repo_url):
+    """Build the messages asking the model to revise a markdown document."""
     # Build system prompt for continuation
     system_prompt = f"""You are an AI assistant helping update Jira task descriptions.
 
@@ -619,7 +793,7 @@ Your task:
 Be thorough, professional, and focus on clarity and completeness."""
     
     # Build messages for the conversation
-    messages = [
+    return [
         {"role": "system", "content": system_prompt},
         {
             "role": "user",
@@ -634,14 +808,27 @@ Be thorough, professional, and focus on clarity and completeness."""
 Please return the updated markdown content."""
         }
     ]
+
+
+def update_markdown_with_ai(client, current_content, user_message, role, repo_url, context=None):
+    """
+    Use AI to update markdown content based on user message.
+    
+    Args:
+        client: Groq API client
+        current_content: Current markdown content
+        user_message: User's message to update the content
+        role: User role (Product Manager or Developer)
+        repo_url: Repository URL for context
+        context: Optional dict passed to LLM_CALL_HOOKS
+    
+    Returns:
+        Updated markdown content
+    """
+    messages = build_update_messages(current_content, user_message, role, repo_url)
     
     try:
-        response = client.chat.completions.create(
-            model="llama-3.1-8b-instant",
-            messages=messages,
-            temperature=0.7,
-            max_tokens=2048,
-        )
+        response = create_chat_completion(client, messages, max_tokens=2048, context=context)
         
         updated_content = response.choices[0].message.content
         return updated_content
@@ -649,8 +836,21 @@ Please return the updated markdown content."""
         raise Exception(f"AI service error: {e}")
 
 
-def chat_loop(client, role, repo_url, task_content=None, file_info=None, save_folder=None):
+async def aupdate_markdown_with_ai(client, current_content, user_message, role, repo_url, context=None):
+    """Async version of update_markdown_with_ai for an AsyncGroq client."""
+    messages = build_update_messages(current_content, user_message, role, repo_url)
+    
+    try:
+        response = await acreate_chat_completion(client, messages, max_tokens=2048, context=context)
+        return response.choices[0].message.content
+    except Exception as e:
+        raise Exception(f"AI service error: {e}")
+
+
+def chat_loop(client, role, repo_url, task_content=None, file_info=None, save_folder=None, store=None):
     """Main chat loop with the LLM."""
+    store = store or cli_store.JsonExportStore()
+    usage_context = {'user_id': store.user_id, 'repository': repo_url}
     print("\n" + "="*60)
     print(f"          CHAT SESSION - {role.replace('_', ' ').upper()}")
     print("="*60)
@@ -658,9 +858,16 @@ def chat_loop(client, role, repo_url, task_content=None, file_info=None, save_fo
     print("\nType 'HELP' to see available commands.\n")
     
     # Initialize conversation history
-    system_prompt = get_system_prompt(role, repo_url, task_content)
+    system_prompt = get_system_prompt(role, repo_url, task_content, client, usage_context)
     messages = [{"role": "system", "content": system_prompt}]
     
+    # A large task file can leave little or no room for the conversation
+    preflight = token_budget.estimate(messages, DEFAULT_MODEL)
+    if not preflight['allowed']:
+        print(f"\n⚠️  {preflight['reason']}")
+    elif preflight['prompt_tokens'] > preflight['context_tokens'] // 2:
+        print(f"\n⚠️  The task file uses about {preflight['prompt_tokens']:,} of {preflight['context_tokens']:,} context tokens.")
+    
     while True:
         # Get user input
         user_input = input("\nYou: ").strip()
@@ -687,19 +894,27 @@ def chat_loop(client, role, repo_url, task_content=None, file_info=None, save_fo
                 print("\n❌ No conversation to save yet.")
                 continue
             
-            saved_file = save_chat_to_file(messages, save_folder, role, repo_url, file_info)
+            saved_file = save_chat_to_file(store, messages, save_folder, role, repo_url, file_info)
             if saved_file:
                 print("\nYou can continue chatting or type EXIT to quit.")
             continue
         
-        # Handle HISTORY command
-        if user_input.upper() == 'HISTORY':
-            list_chat_history()
+        # Handle HISTORY command, with an optional page number and filters
+        words = user_input.split()
+        try:
+            history_args = cli_store.parse_history_args(words[1:]) if words and words[0].upper() == 'HISTORY' else None
+        except cli_store.HistoryArgsError as e:
+            print(f"\n❌ {e}.")
+            print("Usage: HISTORY <page> repo=<text> role=<role> since=<YYYY-MM-DD> until=<YYYY-MM-DD>")
+            continue
+        if history_args:
+            page, filters = history_args
+            list_chat_history(store, page, filters)
             continue
         
         # Handle OPEN command
         if user_input.upper() == 'OPEN':
-            loaded_messages, loaded_repo, loaded_role = load_chat_from_file(save_folder)
+            loaded_messages, loaded_repo, loaded_role = load_chat_from_file(store, save_folder)
             
             if loaded_messages:
                 # Update current conversation
@@ -729,6 +944,23 @@ def chat_loop(client, role, repo_url, task_content=None, file_info=None, save_fo
             print("-"*60)
             continue
         
+        # Handle TASK command: the prompt carries the brief, the full file is added on request
+        if user_input.upper() in ('TASK', 'TASK FULL'):
+            if not task_content:
+                print("\n❌ No task file loaded.")
+                continue
+            if user_input.upper() == 'TASK FULL':
+                messages.append({"role": "user", "content": f"Here is the full task description:\n---\n{task_content}\n---"})
+                print(f"\n✓ Full task file added to the chat ({len(task_content):,} characters).")
+                continue
+            brief_hash, brief = get_task_brief(task_content)
+            print("\n" + "-"*60)
+            print(f"TASK BRIEF ({len(brief):,} of {len(task_content):,} characters, document {brief_hash[:12]})")
+            print("-"*60)
+            print(brief)
+            print("-"*60)
+            continue
+        
         # Handle HELP command
         if user_input.upper() == 'HELP':
             show_help()
@@ -744,12 +976,7 @@ def chat_loop(client, role, repo_url, task_content=None, file_info=None, save_fo
             # Call Groq API
             print("\nAssistant: ", end="", flush=True)
             
-            response = client.chat.completions.create(
-                model="llama-3.1-8b-instant",
-                messages=messages,
-                temperature=0.7,
-                max_tokens=1024,
-            )
+            response = create_chat_completion(client, messages, max_tokens=1024, context=usage_context)
             
             assistant_message = response.choices[0].message.content
             print(assistant_message)
@@ -757,6 +984,9 @@ def chat_loop(client, role, repo_url, task_content=None, file_info=None, save_fo
             # Add assistant response to history
             messages.append({"role": "assistant", "content": assistant_message})
             
+        except token_budget.TokenBudgetError as e:
+            messages.pop()
+            print(f"\n❌ {e}")
         except Exception as e:
             print(f"\n❌ Error communicating with Groq API: {e}")
             print("Please check your API key and internet connection.")
@@ -774,6 +1004,10 @@ def main():
         # Initialize Groq client
         client = Groq(api_key=api_key)
         
+        # Open chat history: the web app's database, or data_exports.json when offline
+        store = cli_store.open_export_store()
+        store.attach_usage_hooks(LLM_CALL_HOOKS)
+        
         # Check for saved session
         saved_session = check_saved_session()
         
@@ -811,9 +1045,10 @@ def main():
                 'timestamp': datetime.now().isoformat()
             }
             save_session_data(session_data)
+            store.record_session(session_data)
         
         # Start chat loop
-        chat_loop(client, role, repo_url, task_content, file_info, save_folder)
+        chat_loop(client, role, repo_url, task_content, file_info, save_folder, store)
         
     except KeyboardInterrupt:
         print("\n\nProgram interrupted by user. Goodbye!")
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Better Jira Generator - Markdown Rendering
+Renders export files to sanitized HTML and caches the result by content hash.
+"""
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+import bleach
+import markdown
+
+import atomic_file
+
+ALLOWED_TAGS = [
+    'a', 'abbr', 'b', 'blockquote', 'br', 'code', 'del', 'em', 'h1', 'h2', 'h3',
+    'h4', 'h5', 'h6', 'hr', 'i', 'li', 'ol', 'p', 'pre', 'strong', 'table',
+    'tbody', 'td', 'th', 'thead', 'tr', 'ul',
+]
+ALLOWED_ATTRIBUTES = {
+    'a': ['href', 'title'],
+    'abbr': ['title'],
+    'th': ['align'],
+    'td': ['align'],
+}
+ALLOWED_PROTOCOLS = ['http', 'https', 'mailto']
+
+
+def render_markdown(content):
+    """Convert markdown to HTML and strip anything outside the allowed tags and attributes."""
+    html = markdown.markdown(content, extensions=['fenced_code', 'tables', 'sane_lists'])
+    return bleach.clean(
+        html,
+        tags=ALLOWED_TAGS,
+        attributes=ALLOWED_ATTRIBUTES,
+        protocols=ALLOWED_PROTOCOLS,
+        strip=True,
+    )
+
+
+class RenderCache:
+    """
+    Rendered HTML keyed by the SHA-256 of the markdown source.
+
+    Recently used entries are kept in an in-memory LRU and every entry is
+    also written to cache_dir so other workers and restarts can reuse it.
+    File hashes are remembered per (path, mtime, size), so a repeat view of
+    an unchanged file costs a stat() and two dictionary lookups.
+    """
+
+    def __init__(self, cache_dir, max_entries=128):
+        self.cache_dir = Path(cache_dir)
+        self.max_entries = max_entries
+        self._rendered = OrderedDict()
+        self._file_hashes = {}
+        self._lock = threading.Lock()
+
+    def file_hash(self, file_path):
+        """Return the content hash of a file, reading it only when it has changed."""
+        stat = os.stat(file_path)
+        key = (stat.st_mtime_ns, stat.st_size)
+
+        with self._lock:
+            cached = self._file_hashes.get(file_path)
+        if cached and cached[0] == key:
+            return cached[1]
+        return self._read(file_path)[0]
+
+    def get(self, file_path):
+        """
+        Return (content_hash, html) for a file, rendering it only on a cache
+        miss. When the file has to be read, the HTML is rendered from the
+        same bytes that were hashed, so a concurrent rewrite can never leave
+        the new content's HTML cached under the old content's hash.
+        """
+        stat = os.stat(file_path)
+        with self._lock:
+            cached = self._file_hashes.get(file_path)
+            if cached and cached[0] == (stat.st_mtime_ns, stat.st_size):
+                html = self._rendered.get(cached[1])
+                if html is not None:
+                    self._rendered.move_to_end(cached[1])
+                    return cached[1], html
+
+        content_hash, data = self._read(file_path)
+        return content_hash, self.render(data, content_hash)
+
+    def render(self, data, content_hash=None):
+        """HTML for markdown given as bytes, from the cache when those bytes were rendered before."""
+        content_hash = content_hash or hashlib.sha256(data).hexdigest()
+        with self._lock:
+            html = self._rendered.get(content_hash)
+            if html is not None:
+                self._rendered.move_to_end(content_hash)
+                return html
+
+        disk_path = self.cache_dir / f'{content_hash}.html'
+        try:
+            html = disk_path.read_text(encoding='utf-8')
+        except FileNotFoundError:
+            html = render_markdown(data.decode('utf-8', errors='replace').replace('\r\n', '\n'))
+            self._write_to_disk(disk_path, html)
+
+        self._remember(content_hash, html)
+        return html
+
+    def invalidate(self, file_path):
+        """Drop the cached hash and rendering of a file that is about to be rewritten."""
+        with self._lock:
+            cached = self._file_hashes.pop(file_path, None)
+            if not cached:
+                return
+            content_hash = cached[1]
+            self._rendered.pop(content_hash, None)
+
+        try:
+            (self.cache_dir / f'{content_hash}.html').unlink()
+        except FileNotFoundError:
+            pass
+
+    def _read(self, file_path):
+        """(content_hash, bytes) of a file from one read, remembering the hash under the stat of that read."""
+        with open(file_path, 'rb') as f:
+            stat = os.fstat(f.fileno())
+            data = f.read()
+        content_hash = hashlib.sha256(data).hexdigest()
+        with self._lock:
+            self._file_hashes[file_path] = ((stat.st_mtime_ns, stat.st_size), content_hash)
+        return content_hash, data
+
+    def _remember(self, content_hash, html):
+        with self._lock:
+            self._rendered[content_hash] = html
+            self._rendered.move_to_end(content_hash)
+            while len(self._rendered) > self.max_entries:
+                self._rendered.popitem(last=False)
+
+    def _write_to_disk(self, disk_path, html):
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            with atomic_file.writing(disk_path, 'w', encoding='utf-8') as f:
+                f.write(html)
+        except OSError:
+            pass
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Better Jira Generator - Metrics
+Prometheus metrics for routes, database queries, LLM calls and export file I/O.
+
+When PROMETHEUS_MULTIPROC_DIR is set (gunicorn.conf.py does this), every
+worker writes its samples to that directory and /metrics aggregates them,
+so a scrape sees the whole server rather than one worker.
+"""
+
+import os
+import time
+from contextlib import contextmanager
+
+from flask import g, request
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+import tracing
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+HTTP_REQUESTS = Counter(
+    'http_requests_total', 'HTTP requests handled', ['method', 'endpoint', 'status']
+)
+HTTP_LATENCY = Histogram(
+    'http_request_duration_seconds', 'HTTP request latency', ['method', 'endpoint'],
+    buckets=LATENCY_BUCKETS,
+)
+DB_QUERIES = Counter('db_queries_total', 'SQL statements executed', ['operation'])
+DB_LATENCY = Histogram(
+    'db_query_duration_seconds', 'SQL statement latency', ['operation'], buckets=LATENCY_BUCKETS
+)
+LLM_REQUESTS = Counter('llm_requests_total', 'LLM calls by outcome', ['model', 'outcome'])
+LLM_LATENCY = Histogram(
+    'llm_request_duration_seconds', 'LLM call latency', ['model'], buckets=LATENCY_BUCKETS
+)
+LLM_TOKENS = Counter('llm_tokens_total', 'LLM tokens used', ['model', 'direction'])
+FILE_IO_LATENCY = Histogram(
+    'export_file_io_duration_seconds', 'Export file read/write latency', ['operation'],
+    buckets=LATENCY_BUCKETS,
+)
+
+
+@contextmanager
+def time_file_io(operation):
+    """Time an export file read or write, and trace it when the request is traced."""
+    started = time.perf_counter()
+    try:
+        with tracing.span(f'file {operation}', **{'file.operation': operation}):
+            yield
+    finally:
+        FILE_IO_LATENCY.labels(operation).observe(time.perf_counter() - started)
+
+
+def record_llm_call(record):
+    """LLM_CALL_HOOKS callback from main.create_chat_completion."""
+    model = record['model']
+    LLM_REQUESTS.labels(model, record['outcome']).inc()
+    LLM_LATENCY.labels(model).observe(record['duration'])
+    if record.get('prompt_tokens'):
+        LLM_TOKENS.labels(model, 'in').inc(record['prompt_tokens'])
+    if record.get('completion_tokens'):
+        LLM_TOKENS.labels(model, 'out').inc(record['completion_tokens'])
+
+
+def _statement_operation(statement):
+    words = statement.split(None, 1)
+    return words[0].upper() if words else 'UNKNOWN'
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('metrics_query_start', []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info['metrics_query_start'].pop()
+    operation = _statement_operation(statement)
+    DB_QUERIES.labels(operation).inc()
+    DB_LATENCY.labels(operation).observe(time.perf_counter() - started)
+
+
+@event.listens_for(Engine, 'handle_error')
+def _handle_error(exception_context):
+    # A failed statement never reaches after_cursor_execute, so drop its start time here
+    conn = exception_context.connection
+    if conn is not None and conn.info.get('metrics_query_start'):
+        conn.info['metrics_query_start'].pop()
+
+
+def _observe_request(status):
+    started = g.pop('metrics_request_start', None)
+    if started is None:
+        return
+    endpoint = request.endpoint or 'unmatched'
+    HTTP_REQUESTS.labels(request.method, endpoint, str(status)).inc()
+    HTTP_LATENCY.labels(request.method, endpoint).observe(time.perf_counter() - started)
+
+
+def metrics_response():
+    """Render all metrics in the Prometheus text format, aggregated across workers if needed."""
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), 200, {'Content-Type': CONTENT_TYPE_LATEST}
+
+
+def init_app(app):
+    """Install the request timing hooks, the LLM hook and the /metrics route."""
+    try:
+        from main import LLM_CALL_HOOKS
+    except ImportError:
+        # The AI routes report the service as unavailable, so there are no LLM calls to count
+        LLM_CALL_HOOKS = None
+
+    if LLM_CALL_HOOKS is not None and record_llm_call not in LLM_CALL_HOOKS:
+        LLM_CALL_HOOKS.append(record_llm_call)
+
+    @app.before_request
+    def start_request_timer():
+        g.metrics_request_start = time.perf_counter()
+
+    @app.after_request
+    def observe_request(response):
+        _observe_request(response.status_code)
+        return response
+
+    @app.teardown_request
+    def observe_failed_request(exc):
+        # after_request is skipped for unhandled exceptions, which end up as 500s
+        if exc is not None:
+            _observe_request(500)
+
+    @app.route('/metrics', methods=['GET'])
+    def metrics():
+        """Prometheus scrape endpoint. Requires METRICS_TOKEN as a bearer token when it is set."""
+        token = os.environ.get('METRICS_TOKEN')
+        if token and request.headers.get('Authorization') != f'Bearer {token}':
+            return 'Unauthorized', 401
+        return metrics_response()
@@ -10,7 +10,7 @@ from pathlib import Path
 from datetime import datetime
 
 # Import from web_app
-from web_app import app, db, Export
+from web_app import app, db, Export, sync_search_index
 
 DATA_EXPORTS_PATH = Path('data_exports.json')
 
@@ -70,6 +70,8 @@ def main():
 
         db.session.commit()
 
+    sync_search_index()
+
     print(f"\n✓ Migration complete. {migrated} records imported into the database.")
 
 
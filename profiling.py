@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Better Jira Generator - Request Profiling
+Opt-in cProfile capture for selected requests of the Flask app.
+
+Nothing is installed unless PROFILING_ENABLED is set, so a disabled
+profiler costs nothing per request. When enabled, a request is profiled if
+it is picked by PROFILE_SAMPLE_RATE or carries a valid X-Profile-Token
+header (issued to administrators on the profiles page).
+"""
+
+import cProfile
+import io
+import os
+import pstats
+import random
+import re
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+from flask import request
+from itsdangerous import BadSignature, URLSafeTimedSerializer
+
+PROFILE_HEADER = 'X-Profile-Token'
+PROFILE_TOKEN_MAX_AGE = 3600
+
+# cProfile allows only one active profiler per process (Python 3.12+), so requests take turns
+_profiler_lock = threading.Lock()
+
+
+def profiling_enabled():
+    return os.environ.get('PROFILING_ENABLED', '').lower() in ('1', 'true', 'yes')
+
+
+def profile_dir():
+    return Path(os.environ.get('PROFILE_DIR', 'profiles'))
+
+
+def _serializer(app):
+    return URLSafeTimedSerializer(app.secret_key, salt='request-profile')
+
+
+def create_profile_token(app, username):
+    """Signed token that lets the holder profile their requests for an hour."""
+    return _serializer(app).dumps(username)
+
+
+def _valid_token(app, token):
+    try:
+        _serializer(app).loads(token, max_age=PROFILE_TOKEN_MAX_AGE)
+        return True
+    except BadSignature:
+        return False
+
+
+def _should_profile(app):
+    token = request.headers.get(PROFILE_HEADER)
+    if token:
+        return _valid_token(app, token)
+    sample_rate = float(os.environ.get('PROFILE_SAMPLE_RATE', 0))
+    return sample_rate > 0 and random.random() < sample_rate
+
+
+def _prune(directory, max_files):
+    profiles = sorted(directory.glob('*.prof'), key=lambda path: path.stat().st_mtime)
+    for path in profiles[:-max_files] if max_files > 0 else profiles:
+        path.unlink(missing_ok=True)
+        path.with_suffix('.txt').unlink(missing_ok=True)
+
+
+def _save_profile(profiler, duration):
+    directory = profile_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+
+    endpoint = re.sub(r'[^A-Za-z0-9_]', '_', request.endpoint or 'unmatched')
+    name = f"{datetime.utcnow().strftime('%Y%m%d_%H%M%S_%f')}_{request.method}_{endpoint}_{int(duration * 1000)}ms"
+    profiler.dump_stats(directory / f'{name}.prof')
+
+    summary = io.StringIO()
+    summary.write(f'{request.method} {request.full_path}\n{duration * 1000:.1f} ms\n\n')
+    pstats.Stats(profiler, stream=summary).sort_stats('cumulative').print_stats(40)
+    (directory / f'{name}.txt').write_text(summary.getvalue())
+
+    _prune(directory, int(os.environ.get('PROFILE_MAX_FILES', 50)))
+
+
+def list_profiles():
+    """Saved profiles, newest first, as dicts with name, size and modification time."""
+    directory = profile_dir()
+    if not directory.exists():
+        return []
+    profiles = sorted(directory.glob('*.prof'), key=lambda path: path.stat().st_mtime, reverse=True)
+    return [
+        {
+            'name': path.stem,
+            'size': path.stat().st_size,
+            'modified': datetime.utcfromtimestamp(path.stat().st_mtime),
+        }
+        for path in profiles
+    ]
+
+
+def profile_path(name, suffix):
+    """Path of a saved profile file, or None for unknown or unsafe names."""
+    if not re.fullmatch(r'[A-Za-z0-9_]+', name or ''):
+        return None
+    path = profile_dir() / f'{name}{suffix}'
+    return path if path.exists() else None
+
+
+def init_app(app):
+    """Install the profiling hooks when PROFILING_ENABLED is set."""
+    if not profiling_enabled():
+        return
+
+    @app.before_request
+    def start_profile():
+        if not _should_profile(app) or not _profiler_lock.acquire(blocking=False):
+            return
+        profiler = cProfile.Profile()
+        request.environ['profiling.profile'] = (profiler, time.perf_counter())
+        profiler.enable()
+
+    @app.teardown_request
+    def finish_profile(exc):
+        profile = request.environ.pop('profiling.profile', None)
+        if profile is None:
+            return
+        profiler, started = profile
+        try:
+            profiler.disable()
+            _save_profile(profiler, time.perf_counter() - started)
+        except Exception:
+            app.logger.exception('Could not save request profile')
+        finally:
+            _profiler_lock.release()
@@ -0,0 +1,317 @@
+#!/usr/bin/env python3
+"""
+Better Jira Generator - Purge
+Archive or delete soft-deleted exports once they are past the retention window.
+
+Deleting an export in the web app only marks it deleted, so without this
+job the rows, their revisions and their files are kept forever and every
+listing query has to skip over them. Exports deleted more than
+PURGE_RETENTION_DAYS ago are handled PURGE_BATCH_SIZE at a time:
+
+- archive (default): the row moves to archived_exports and the file is
+  gzipped into ARCHIVE_FOLDER_PATH
+- delete: the row and the file are removed
+
+Either way their revisions, tickets and search index entries are dropped
+and LLM calls keep their usage but lose the export reference. The database
+is vacuumed afterwards so the freed pages go back to the filesystem.
+
+Run it from cron or the Heroku Scheduler:
+
+    python purge.py
+    python purge.py --mode delete --days 7
+    python purge.py --dry-run
+"""
+
+import argparse
+import gzip
+import os
+import shutil
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+import atomic_file
+from web_app import (
+    app,
+    db,
+    ArchivedExport,
+    Export,
+    ExportRevision,
+    ExportTicket,
+    LLMCall,
+    TicketLabel,
+    render_cache,
+    search_index_enabled,
+)
+
+PURGE_MODES = ('archive', 'delete')
+
+
+def purge_settings():
+    return {
+        'days': float(os.environ.get('PURGE_RETENTION_DAYS', 30)),
+        'mode': os.environ.get('PURGE_MODE', 'archive'),
+        'batch_size': int(os.environ.get('PURGE_BATCH_SIZE', 100)),
+        'archive_dir': os.environ.get('ARCHIVE_FOLDER_PATH', 'archive'),
+    }
+
+
+def database_size():
+    """Bytes taken by the SQLite database file, or None for other databases."""
+    if db.engine.dialect.name != 'sqlite':
+        return None
+    page_count = db.session.execute(text('PRAGMA page_count')).scalar()
+    page_size = db.session.execute(text('PRAGMA page_size')).scalar()
+    return page_count * page_size
+
+
+def purgeable_exports(cutoff):
+    """Soft-deleted exports deleted before the cutoff; rows deleted before deleted_at existed go by created_at."""
+    deleted = db.func.coalesce(Export.deleted_at, Export.created_at)
+    return Export.query.filter(Export.is_deleted == True, deleted < cutoff).order_by(Export.id)  # noqa: E712
+
+
+def archive_file(file_path, archive_dir, export_id):
+    """Gzip an export file into the archive folder. Returns the archive path."""
+    archive_dir = Path(archive_dir)
+    archive_dir.mkdir(parents=True, exist_ok=True)
+    target = archive_dir / f'{export_id}-{Path(file_path).name}.gz'
+    with open(file_path, 'rb') as source, atomic_file.writing(target) as written:
+        with gzip.GzipFile(filename=target.stem, mode='wb', fileobj=written) as archived:
+            shutil.copyfileobj(source, archived)
+    return target
+
+
+def remove_file(file_path):
+    """Delete an export file and its cached rendering."""
+    try:
+        # The render cache only knows the hash of files it has seen, so look it up first
+        render_cache.file_hash(file_path)
+        render_cache.invalidate(file_path)
+        os.remove(file_path)
+    except OSError:
+        return False
+    return True
+
+
+def purge_batch(exports, mode, archive_dir, report):
+    """Archive or delete one batch of exports in a single transaction, then remove their files."""
+    ids = [export.id for export in exports]
+    paths = {export.file_path for export in exports if export.file_path}
+    # Never remove a file another export still points at
+    shared = {
+        row[0] for row in db.session.query(Export.file_path).filter(
+            Export.file_path.in_(paths), Export.id.notin_(ids)
+        )
+    }
+
+    files, archived = [], []
+    # Exports in this batch sharing a file count, archive and remove it once
+    handled = {}
+    try:
+        for export in exports:
+            file_path = export.file_path
+            size = archive_path = None
+            if file_path in handled:
+                size, archive_path = handled[file_path]
+            elif file_path and file_path not in shared and Path(file_path).is_file():
+                size = Path(file_path).stat().st_size
+                files.append(file_path)
+                report['files'] += 1
+                report['file_bytes'] += size
+                if mode == 'archive':
+                    archive_path = archive_file(file_path, archive_dir, export.id)
+                    archived.append(archive_path)
+                    report['archive_bytes'] += archive_path.stat().st_size
+            elif file_path and file_path not in shared:
+                report['missing_files'] += 1
+            handled[file_path] = size, archive_path
+
+            if mode == 'archive':
+                db.session.add(ArchivedExport(
+                    export_id=export.id,
+                    filename=export.filename,
+                    original_name=export.original_name,
+                    date=export.date,
+                    user_type=export.user_type,
+                    repository=export.repository,
+                    action=export.action,
+                    created_at=export.created_at,
+                    deleted_at=export.deleted_at,
+                    user_id=export.user_id,
+                    linked_export_id=export.linked_export_id,
+                    jira_issues=export.jira_issues,
+                    file_path=file_path,
+                    archive_path=str(archive_path) if archive_path else None,
+                    file_size=size,
+                ))
+
+        revisions = ExportRevision.query.filter(ExportRevision.export_id.in_(ids))
+        report['revision_bytes'] += revisions.with_entities(db.func.sum(db.func.length(ExportRevision.data))).scalar() or 0
+        report['revisions'] += revisions.delete(synchronize_session=False)
+        tickets = db.session.query(ExportTicket.id).filter(ExportTicket.export_id.in_(ids))
+        TicketLabel.query.filter(TicketLabel.ticket_id.in_(tickets.scalar_subquery())).delete(synchronize_session=False)
+        ExportTicket.query.filter(ExportTicket.export_id.in_(ids)).delete(synchronize_session=False)
+        LLMCall.query.filter(LLMCall.export_id.in_(ids)).update({'export_id': None}, synchronize_session=False)
+        Export.query.filter(Export.linked_export_id.in_(ids)).update({'linked_export_id': None}, synchronize_session=False)
+        if search_index_enabled():
+            for export_id in ids:
+                db.session.execute(text('DELETE FROM exports_fts WHERE rowid = :id'), {'id': export_id})
+        Export.query.filter(Export.id.in_(ids)).delete(synchronize_session=False)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        for archive_path in archived:
+            archive_path.unlink(missing_ok=True)
+        raise
+
+    report['exports'] += len(ids)
+    # The rows are gone, so a failure from here on only leaves a stray file behind
+    for file_path in files:
+        if not remove_file(file_path):
+            report['failed_files'].append(file_path)
+
+
+def vacuum():
+    """Give free pages back to the filesystem. Returns False when another connection holds the database."""
+    dialect = db.engine.dialect.name
+    if dialect not in ('sqlite', 'postgresql'):
+        return False
+    db.session.remove()
+    try:
+        # VACUUM cannot run inside a transaction
+        with db.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as connection:
+            if dialect == 'sqlite':
+                if search_index_enabled():
+                    connection.execute(text("INSERT INTO exports_fts (exports_fts) VALUES ('optimize')"))
+                connection.execute(text('VACUUM'))
+            else:
+                connection.execute(text('VACUUM ANALYZE'))
+    except OperationalError:
+        return False
+    return True
+
+
+def purge_deleted_exports(days=None, mode=None, batch_size=None, archive_dir=None, dry_run=False, run_vacuum=True):
+    """Purge exports soft-deleted more than `days` ago. Returns a report of what was removed and the space reclaimed."""
+    settings = purge_settings()
+    days = settings['days'] if days is None else days
+    mode = mode or settings['mode']
+    batch_size = batch_size or settings['batch_size']
+    archive_dir = archive_dir or settings['archive_dir']
+    if mode not in PURGE_MODES:
+        raise ValueError(f'Unknown purge mode: {mode}')
+
+    cutoff = datetime.utcnow() - timedelta(days=days)
+    report = {
+        'mode': mode,
+        'cutoff': cutoff.isoformat(),
+        'dry_run': dry_run,
+        'exports': 0,
+        'revisions': 0,
+        'revision_bytes': 0,
+        'files': 0,
+        'file_bytes': 0,
+        'archive_bytes': 0,
+        'missing_files': 0,
+        'failed_files': [],
+        'db_bytes_before': None,
+        'db_bytes_after': None,
+        'vacuumed': False,
+    }
+
+    with app.app_context():
+        report['db_bytes_before'] = database_size()
+
+        if dry_run:
+            exports = purgeable_exports(cutoff).all()
+            ids = [export.id for export in exports]
+            report['exports'] = len(exports)
+            for export in exports:
+                if export.file_path and Path(export.file_path).is_file():
+                    report['files'] += 1
+                    report['file_bytes'] += Path(export.file_path).stat().st_size
+            if ids:
+                revisions = ExportRevision.query.filter(ExportRevision.export_id.in_(ids))
+                report['revisions'] = revisions.count()
+                report['revision_bytes'] = revisions.with_entities(db.func.sum(db.func.length(ExportRevision.data))).scalar() or 0
+            return report
+
+        while True:
+            exports = purgeable_exports(cutoff).limit(batch_size).all()
+            if not exports:
+                break
+            purge_batch(exports, mode, archive_dir, report)
+
+        if report['exports'] and run_vacuum:
+            report['vacuumed'] = vacuum()
+        report['db_bytes_after'] = database_size()
+
+    return report
+
+
+def reclaimed_bytes(report):
+    """Disk space freed by a purge: files removed (less their archives) plus the database shrinking."""
+    reclaimed = report['file_bytes'] - report['archive_bytes']
+    if report['db_bytes_before'] is not None and report['db_bytes_after'] is not None:
+        reclaimed += report['db_bytes_before'] - report['db_bytes_after']
+    return reclaimed
+
+
+def format_bytes(size):
+    for unit in ('B', 'KB', 'MB', 'GB'):
+        if abs(size) < 1024 or unit == 'GB':
+            return f'{size:,.0f} {unit}' if unit == 'B' else f'{size:,.1f} {unit}'
+        size /= 1024
+
+
+def print_report(report):
+    if report['dry_run']:
+        print(f"Dry run: {report['exports']} exports deleted before {report['cutoff']} would be purged "
+              f"({report['mode']})")
+        print(f"  {report['files']} files, {format_bytes(report['file_bytes'])}")
+        print(f"  {report['revisions']} revisions, {format_bytes(report['revision_bytes'])}")
+        return
+
+    action = 'Archived' if report['mode'] == 'archive' else 'Deleted'
+    print(f"✓ {action} {report['exports']} exports deleted before {report['cutoff']}")
+    print(f"  Files: {report['files']} removed, {format_bytes(report['file_bytes'])}"
+          + (f", archived as {format_bytes(report['archive_bytes'])}" if report['mode'] == 'archive' else ''))
+    if report['missing_files']:
+        print(f"  {report['missing_files']} files were already missing")
+    for file_path in report['failed_files']:
+        print(f"  ✗ Could not remove {file_path}")
+    print(f"  Revisions: {report['revisions']} removed, {format_bytes(report['revision_bytes'])}")
+    if report['db_bytes_before'] is not None:
+        vacuumed = '' if report['vacuumed'] or not report['exports'] else ' (not vacuumed: database busy)'
+        print(f"  Database: {format_bytes(report['db_bytes_before'])} -> {format_bytes(report['db_bytes_after'])}{vacuumed}")
+    print(f"  Space reclaimed: {format_bytes(reclaimed_bytes(report))}")
+
+
+def main():
+    settings = purge_settings()
+    parser = argparse.ArgumentParser(description='Archive or delete soft-deleted exports past the retention window.')
+    parser.add_argument('--days', type=float, default=settings['days'], help='Retention window in days (default: %(default)s)')
+    parser.add_argument('--mode', choices=PURGE_MODES, default=settings['mode'], help='Archive or delete (default: %(default)s)')
+    parser.add_argument('--batch-size', type=int, default=settings['batch_size'], help='Exports per transaction (default: %(default)s)')
+    parser.add_argument('--archive-dir', default=settings['archive_dir'], help='Folder for archived files (default: %(default)s)')
+    parser.add_argument('--dry-run', action='store_true', help='Report what would be purged without changing anything')
+    parser.add_argument('--no-vacuum', action='store_true', help='Skip vacuuming the database afterwards')
+    args = parser.parse_args()
+
+    report = purge_deleted_exports(
+        days=args.days,
+        mode=args.mode,
+        batch_size=args.batch_size,
+        archive_dir=args.archive_dir,
+        dry_run=args.dry_run,
+        run_vacuum=not args.no_vacuum,
+    )
+    print_report(report)
+
+
+if __name__ == '__main__':
+    main()
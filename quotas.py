@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Better Jira Generator - Quotas
+Per-user token buckets for LLM requests and LLM tokens.
+
+Each user has one bucket per kind, holding up to the kind's limit and
+refilling continuously at limit / QUOTA_WINDOW_SECONDS. A request needs
+one unit of the `requests` bucket. LLM tokens are charged after each call
+from its reported usage, since the reply length is not known beforehand;
+a new call is allowed while the `tokens` bucket is above zero, so a user
+can overshoot by at most one call and then waits for the debt to refill.
+
+The buckets live in the database (see web_app.take_quota) and are updated
+with a single conditional UPDATE, so every gunicorn worker and the ASGI
+server enforce the same quota. Limits come from the environment; a kind
+without a limit is not enforced.
+"""
+
+import math
+import os
+
+QUOTA_KINDS = ('requests', 'tokens')
+
+# Minimum bucket level needed to start a call, per kind
+REQUIRED_LEVEL = {'requests': 1, 'tokens': 1}
+
+
+class QuotaExceeded(Exception):
+    """Raised when a user's bucket is empty. `retry_after` is in seconds."""
+
+    def __init__(self, kind, retry_after, limit):
+        self.kind = kind
+        self.retry_after = retry_after
+        self.limit = limit
+        what = 'LLM requests' if kind == 'requests' else 'LLM tokens'
+        super().__init__(
+            f'Quota of {limit:,} {what} per {describe_window(window_seconds())} used up. '
+            f'Try again in {math.ceil(retry_after)} seconds.'
+        )
+
+
+def window_seconds():
+    return float(os.environ.get('QUOTA_WINDOW_SECONDS', 3600))
+
+
+def quota_limits():
+    """{kind: limit per window, or None when the kind is not limited}."""
+    limits = {}
+    for kind in QUOTA_KINDS:
+        value = os.environ.get(f'QUOTA_{kind.upper()}')
+        limits[kind] = int(value) if value and int(value) > 0 else None
+    return limits
+
+
+def describe_window(seconds):
+    if seconds % 86400 == 0:
+        return 'day' if seconds == 86400 else f'{int(seconds // 86400)} days'
+    if seconds % 3600 == 0:
+        return 'hour' if seconds == 3600 else f'{int(seconds // 3600)} hours'
+    if seconds % 60 == 0:
+        return 'minute' if seconds == 60 else f'{int(seconds // 60)} minutes'
+    return f'{seconds:g} seconds'
+
+
+def refill_rate(limit, window=None):
+    """Units added back per second."""
+    return limit / (window or window_seconds())
+
+
+def current_level(level, updated_at, now, limit, window=None):
+    """Bucket level at `now`, refilled since `updated_at` and capped at the limit."""
+    return min(float(limit), level + max(now - updated_at, 0.0) * refill_rate(limit, window))
+
+
+def seconds_until(level, needed, limit, window=None):
+    """Seconds until a bucket at `level` holds `needed` units."""
+    if level >= needed:
+        return 0.0
+    return (needed - level) / refill_rate(limit, window)
+
+
+def retry_after_header(seconds):
+    """Retry-After value: whole seconds, at least 1."""
+    return str(max(1, math.ceil(seconds)))
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Better Jira Generator - Export Revisions
+Line-based deltas used to store export history compactly.
+
+A revision is either a snapshot (the full text) or a delta against the
+previous revision. Deltas list operations over the previous version's
+lines: ['=', start, end] copies lines start:end and ['+', [lines]] inserts
+new lines. Both forms are stored zlib-compressed.
+"""
+
+import difflib
+import json
+import zlib
+
+
+def make_delta(old, new):
+    """Encode `new` as operations over the lines of `old`."""
+    old_lines = old.splitlines(keepends=True)
+    new_lines = new.splitlines(keepends=True)
+    ops = []
+    matcher = difflib.SequenceMatcher(None, old_lines, new_lines, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == 'equal':
+            ops.append(['=', i1, i2])
+        elif tag in ('replace', 'insert'):
+            ops.append(['+', new_lines[j1:j2]])
+        # 'delete' needs no operation: the old lines are simply not copied
+    return ops
+
+
+def apply_delta(old, ops):
+    """Rebuild the new text from `old` and the operations made by make_delta."""
+    old_lines = old.splitlines(keepends=True)
+    parts = []
+    for op in ops:
+        if op[0] == '=':
+            parts.extend(old_lines[op[1]:op[2]])
+        else:
+            parts.extend(op[1])
+    return ''.join(parts)
+
+
+def pack_snapshot(text):
+    return zlib.compress(text.encode('utf-8'))
+
+
+def pack_delta(ops):
+    return zlib.compress(json.dumps(ops, separators=(',', ':')).encode('utf-8'))
+
+
+def unpack_snapshot(data):
+    return zlib.decompress(data).decode('utf-8')
+
+
+def unpack_delta(data):
+    return json.loads(zlib.decompress(data).decode('utf-8'))
+
+
+def rebuild(revisions):
+    """
+    Rebuild the text of the last revision in `revisions`, which must run in
+    order from a snapshot. Each item needs `is_snapshot` and `data`.
+    """
+    text = None
+    for revision in revisions:
+        if revision.is_snapshot:
+            text = unpack_snapshot(revision.data)
+        else:
+            text = apply_delta(text, unpack_delta(revision.data))
+    return text
+
+
+def unified_diff(old, new, old_label, new_label):
+    """Unified diff between two revisions' text."""
+    return ''.join(difflib.unified_diff(
+        old.splitlines(keepends=True),
+        new.splitlines(keepends=True),
+        fromfile=old_label,
+        tofile=new_label,
+    ))
@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+Better Jira Generator - Sections
+Address the sections of a markdown export by their heading path.
+
+A section runs from its heading to the next heading of the same or a
+higher level, so it includes its subsections. Its path is the slugs of
+its heading and the headings above it, e.g.
+`project-overview/acceptance-criteria`; a repeated heading under the same
+parent gets `-2`, `-3`, ... Headings inside fenced code blocks are ignored.
+
+SectionIndex keeps each file's sections with their byte ranges and
+content hashes, keyed by the file's mtime and size like RenderCache, so
+reading one section is a stat() and a seek instead of parsing the file.
+The same index splits a file into pages at headings for the rendered view.
+"""
+
+import codecs
+import hashlib
+import os
+import re
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+_HEADING = re.compile(rb'^(#{1,6})[ \t]+(.+?)[ \t]*#*[ \t]*$')
+_FENCE = re.compile(rb'^[ \t]{0,3}(```|~~~)')
+_fallback_lock = threading.Lock()
+
+
+class SectionError(ValueError):
+    """New section content that would change the document's structure."""
+
+
+def slugify(title):
+    slug = re.sub(r'[^\w\s-]', '', title.lower()).strip()
+    return re.sub(r'[\s_-]+', '-', slug) or 'section'
+
+
+def content_hash(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def parse_sections(data):
+    """
+    Sections of a UTF-8 markdown document given as bytes, in document order:
+    dicts with path, title, level and the byte offsets start (heading),
+    body_start (line after the heading) and end, plus the hash of the section.
+    """
+    sections = []
+    open_sections = []  # innermost last
+    sibling_slugs = {}
+    in_fence = None
+    offset = 0
+
+    for line in data.splitlines(keepends=True):
+        stripped = line.rstrip(b'\r\n')
+        fence = _FENCE.match(stripped)
+        if fence:
+            if in_fence is None:
+                in_fence = fence.group(1)
+            elif fence.group(1) == in_fence:
+                in_fence = None
+        match = _HEADING.match(stripped) if in_fence is None and not fence else None
+
+        if match:
+            level = len(match.group(1))
+            while open_sections and open_sections[-1]['level'] >= level:
+                open_sections.pop()['end'] = offset
+            parent = open_sections[-1]['path'] if open_sections else ''
+            title = match.group(2).decode('utf-8', errors='replace')
+
+            slug = slugify(title)
+            seen = sibling_slugs.setdefault(parent, {})
+            seen[slug] = seen.get(slug, 0) + 1
+            if seen[slug] > 1:
+                slug = f'{slug}-{seen[slug]}'
+
+            section = {
+                'path': f'{parent}/{slug}' if parent else slug,
+                'title': title,
+                'level': level,
+                'start': offset,
+                'body_start': offset + len(line),
+                'end': None,
+            }
+            sections.append(section)
+            open_sections.append(section)
+        offset += len(line)
+
+    for section in open_sections:
+        section['end'] = offset
+    for section in sections:
+        section['hash'] = content_hash(data[section['start']:section['end']])
+    return sections
+
+
+def find_section(sections, path):
+    path = path.strip('/')
+    for section in sections:
+        if section['path'] == path:
+            return section
+    return None
+
+
+def subsections(sections, section):
+    """Paths of a section's direct children."""
+    return [
+        other['path'] for other in sections
+        if other['path'].rsplit('/', 1)[0] == section['path'] and other['path'] != section['path']
+    ]
+
+
+def replace_body(data, section, body):
+    """
+    The document with a section's body (everything under its heading,
+    subsections included) replaced. The body may only contain headings
+    deeper than the section's own, so the section keeps its place.
+    """
+    encoded = body.encode('utf-8')
+    for heading_level in (len(match.group(1)) for match in map(_HEADING.match, encoded.splitlines()) if match):
+        if heading_level <= section['level']:
+            raise SectionError(f"Headings in the new content must be deeper than level {section['level']}")
+
+    if encoded and not encoded.endswith(b'\n'):
+        encoded += b'\n'
+    # Keep a blank line before the next heading
+    if section['end'] < len(data) and not encoded.endswith(b'\n\n'):
+        encoded += b'\n'
+    return data[:section['body_start']] + encoded + data[section['end']:]
+
+
+class SectionIndex:
+    """Parsed sections per file, reused until the file's mtime or size changes."""
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, file_path):
+        """Sections of a file, parsing it only when it changed."""
+        with open(file_path, 'rb') as f:
+            return self._sections(file_path, f)
+
+    def read(self, file_path, path):
+        """
+        (section, body, sections) for a heading path, where body is the text
+        under the section's heading; section and body are None when there is
+        no such section. Only the section's bytes are read when the index is current.
+        """
+        with open(file_path, 'rb') as f:
+            sections = self._sections(file_path, f)
+            section = find_section(sections, path)
+            if section is None:
+                return None, None, sections
+            f.seek(section['body_start'])
+            body = f.read(section['end'] - section['body_start']).decode('utf-8', errors='replace')
+        return section, body, sections
+
+    def read_page(self, file_path, offset=0, limit=64 * 1024):
+        """
+        (bytes, next_offset) of the page of a file starting at `offset`,
+        where next_offset is None on the last page. A page holds as many
+        whole sections as fit in `limit` bytes and ends where a heading
+        starts, so no markdown block is split across pages. A stretch
+        without headings that is longer than a page ends at a line break.
+        """
+        with open(file_path, 'rb') as f:
+            sections = self._sections(file_path, f)
+            size = os.fstat(f.fileno()).st_size
+            offset = min(max(offset, 0), size)
+            starts = [section['start'] for section in sections if offset < section['start'] < size] + [size]
+
+            fitting = [start for start in starts if start - offset <= limit]
+            end = fitting[-1] if fitting else starts[0]
+            f.seek(offset)
+            if end - offset <= limit:
+                data = f.read(end - offset)
+            else:
+                data = f.read(limit)
+                if not data.endswith(b'\n'):
+                    data += f.readline(min(limit, end - offset - len(data)))
+                if not data.endswith(b'\n'):
+                    # A line longer than two pages continues on the next one, after a whole character
+                    decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+                    decoder.decode(data)
+                    pending = len(decoder.getstate()[0])
+                    if pending and pending < len(data):
+                        data = data[:-pending]
+        next_offset = offset + len(data)
+        return data, next_offset if next_offset < size else None
+
+    def _sections(self, file_path, f):
+        # Keyed by the open file's own stat, so the offsets always match what is read from it
+        stat = os.fstat(f.fileno())
+        key = (stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            cached = self._entries.get(file_path)
+            if cached and cached[0] == key:
+                self._entries.move_to_end(file_path)
+                return cached[1]
+
+        sections = parse_sections(f.read())
+        with self._lock:
+            self._entries[file_path] = (key, sections)
+            self._entries.move_to_end(file_path)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return sections
+
+    def invalidate(self, file_path):
+        with self._lock:
+            self._entries.pop(file_path, None)
+
+
+@contextmanager
+def locked(file_path):
+    """Hold an exclusive lock on a file, across worker processes, while it is read and rewritten."""
+    if fcntl is None:
+        # Without flock (Windows) this only serializes threads of one process
+        with _fallback_lock:
+            yield
+        return
+    with open(file_path, 'a') as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
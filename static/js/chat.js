@@ -0,0 +1,146 @@
+// Live chat over the /ws/chat WebSocket (served by asgi:app)
+(function () {
+    const log = document.getElementById('chat-log');
+    const form = document.getElementById('chat-form');
+    const input = document.getElementById('chat-message');
+    const controls = document.querySelectorAll('#chat-send, #chat-message, [data-command]');
+    let socket = null;
+    let streaming = null;
+
+    function addTurn(speaker, text, className) {
+        const turn = document.createElement('div');
+        turn.className = 'turn ' + (className || '');
+        if (speaker) {
+            const label = document.createElement('span');
+            label.className = 'speaker';
+            label.textContent = speaker;
+            turn.appendChild(label);
+        }
+        const body = document.createElement('span');
+        body.textContent = text;
+        turn.appendChild(body);
+        log.appendChild(turn);
+        log.scrollTop = log.scrollHeight;
+        return body;
+    }
+
+    function setEnabled(enabled) {
+        controls.forEach(function (control) { control.disabled = !enabled; });
+    }
+
+    function send(frame) {
+        socket.send(JSON.stringify(frame));
+    }
+
+    function showHistory(items) {
+        if (!items.length) {
+            addTurn(null, 'No saved chats found.', 'system');
+            return;
+        }
+        const turn = addTurn('History', '', 'system');
+        items.forEach(function (item) {
+            const row = document.createElement('div');
+            const open = document.createElement('a');
+            open.href = '#';
+            open.className = 'link';
+            open.textContent = 'Open';
+            open.addEventListener('click', function (event) {
+                event.preventDefault();
+                send({type: 'command', command: 'OPEN', export_id: item.id});
+            });
+            row.textContent = '#' + item.id + ' ' + (item.original_name || item.filename) + ' (' + (item.date || '').slice(0, 16) + ') ';
+            row.appendChild(open);
+            turn.appendChild(row);
+        });
+    }
+
+    function handle(message) {
+        if (message.type === 'ready') {
+            addTurn(null, 'Connected as ' + message.role.replace('_', ' ') + (message.repository ? ' for ' + message.repository : '') + '.', 'system');
+            setEnabled(true);
+        } else if (message.type === 'token') {
+            if (!streaming) {
+                streaming = addTurn('Assistant', '');
+            }
+            streaming.textContent += message.content;
+            log.scrollTop = log.scrollHeight;
+        } else if (message.type === 'reply') {
+            streaming = null;
+            setEnabled(true);
+        } else if (message.type === 'new') {
+            log.innerHTML = '';
+            addTurn(null, 'New chat session started.', 'system');
+        } else if (message.type === 'saved') {
+            const saved = addTurn(null, 'Chat saved as ' + (message.export.original_name || message.export.filename) + '. ', 'system');
+            const view = document.createElement('a');
+            view.href = message.url;
+            view.className = 'link';
+            view.textContent = 'View';
+            saved.parentNode.appendChild(view);
+        } else if (message.type === 'history') {
+            showHistory(message.items);
+        } else if (message.type === 'opened') {
+            log.innerHTML = '';
+            addTurn(null, 'Loaded ' + (message.export.original_name || message.export.filename) + '.', 'system');
+            message.messages.forEach(function (msg) {
+                addTurn(msg.role === 'user' ? 'You' : 'Assistant', msg.content);
+            });
+        } else if (message.type === 'help') {
+            addTurn(null, 'Commands: ' + message.commands.join(', '), 'system');
+        } else if (message.type === 'error') {
+            streaming = null;
+            addTurn(null, message.message, 'error');
+            setEnabled(true);
+        }
+    }
+
+    document.getElementById('chat-connect').addEventListener('click', function () {
+        if (socket) {
+            socket.close();
+        }
+        const params = new URLSearchParams({
+            role: document.getElementById('chat-role').value,
+            repository: document.getElementById('chat-repository').value.trim(),
+        });
+        const scheme = window.location.protocol === 'https:' ? 'wss://' : 'ws://';
+        socket = new WebSocket(scheme + window.location.host + '/ws/chat?' + params.toString());
+        socket.addEventListener('message', function (event) { handle(JSON.parse(event.data)); });
+        socket.addEventListener('close', function (event) {
+            setEnabled(false);
+            addTurn(null, event.code === 4401 ? 'Please log in again.' : 'Disconnected. Live chat needs the ASGI server (uvicorn asgi:app).', 'system');
+        });
+    });
+
+    document.querySelectorAll('[data-command]').forEach(function (button) {
+        button.addEventListener('click', function () {
+            const frame = {type: 'command', command: button.dataset.command};
+            if (frame.command === 'SAVE') {
+                const name = window.prompt('Name for this chat (optional):');
+                if (name === null) {
+                    return;
+                }
+                frame.name = name;
+            }
+            send(frame);
+        });
+    });
+
+    form.addEventListener('submit', function (event) {
+        event.preventDefault();
+        const content = input.value.trim();
+        if (!content || !socket) {
+            return;
+        }
+        const openMatch = content.match(/^OPEN\s+(\d+)$/i);
+        if (openMatch) {
+            send({type: 'command', command: 'OPEN', export_id: openMatch[1]});
+        } else {
+            if (['NEW', 'SAVE', 'HISTORY', 'OPEN', 'HELP'].indexOf(content.toUpperCase()) === -1) {
+                addTurn('You', content);
+                setEnabled(false);
+            }
+            send({type: 'message', content: content});
+        }
+        input.value = '';
+    });
+})();
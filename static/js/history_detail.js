@@ -0,0 +1,61 @@
+// The document is rendered a page at a time; each page is revalidated by its own ETag
+document.addEventListener('DOMContentLoaded', function () {
+    var rendered = document.getElementById('rendered-contents');
+    var more = document.getElementById('rendered-more');
+
+    function load(offset) {
+        more.disabled = true;
+        fetch(rendered.dataset.url + '?offset=' + offset, { credentials: 'same-origin' })
+            .then(function (response) {
+                if (!response.ok) { throw new Error(response.status); }
+                return response.text().then(function (html) {
+                    return { html: html, nextOffset: response.headers.get('X-Next-Offset') };
+                });
+            })
+            .then(function (page) {
+                if (offset === 0) { rendered.innerHTML = ''; }
+                rendered.insertAdjacentHTML('beforeend', page.html);
+                if (page.nextOffset === null) {
+                    more.hidden = true;
+                } else {
+                    more.dataset.nextOffset = page.nextOffset;
+                    more.hidden = false;
+                    more.disabled = false;
+                }
+            })
+            .catch(function () {
+                if (offset === 0) {
+                    rendered.innerHTML = '<p class="file-info">Unable to render this document. See the raw markdown below.</p>';
+                } else {
+                    more.disabled = false;
+                }
+            });
+    }
+
+    more.addEventListener('click', function () { load(more.dataset.nextOffset); });
+    load(0);
+});
+
+// Fetch the rest of a large export page by page instead of inlining it all
+document.addEventListener('DOMContentLoaded', function () {
+    var button = document.getElementById('load-more');
+    if (!button) { return; }
+    var contents = document.getElementById('file-contents');
+    var url = button.dataset.url;
+
+    button.addEventListener('click', function () {
+        button.disabled = true;
+        fetch(url + '?offset=' + button.dataset.nextOffset, { credentials: 'same-origin' })
+            .then(function (response) { return response.json(); })
+            .then(function (page) {
+                contents.appendChild(document.createTextNode(page.content));
+                if (page.next_offset === null) {
+                    button.remove();
+                } else {
+                    button.dataset.nextOffset = page.next_offset;
+                    button.disabled = false;
+                }
+            })
+            .catch(function () { button.disabled = false; });
+    });
+});
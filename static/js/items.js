@@ -0,0 +1,3 @@
+function confirmDelete(filename) {
+    return confirm('Are you sure you want to delete: ' + filename + '?\n\nThis action cannot be undone.');
+}
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Better Jira Generator - Static Assets
+Fingerprinted URLs and precompressed copies for the files in static/.
+
+Templates link assets with asset_url('css/app.css'), which gives
+/assets/css/app.<hash>.css. The hash is taken from the file's contents,
+so the URL changes whenever the file does and browsers may cache it for a
+year without revalidating. gzip (and brotli, when installed) copies are
+written once to STATIC_BUILD_DIR and sent as-is to clients that accept
+them, so assets are never compressed per request.
+
+Run `python static_assets.py` to build the compressed copies ahead of
+time; gunicorn.conf.py does this before forking workers, and the app
+builds any that are missing on startup.
+"""
+
+import hashlib
+import mimetypes
+import os
+from pathlib import Path
+
+from flask import abort, request, send_file
+
+import atomic_file
+import compression
+
+# Fingerprinted URLs never change content, so they can be cached for a year
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+HASH_LENGTH = 10
+COMPRESSED_SUFFIXES = {'gzip': '.gz', 'br': '.br'}
+COMPRESSIBLE_SUFFIXES = {'.css', '.js', '.svg', '.json', '.txt', '.html', '.map'}
+
+
+def fingerprint(relative_path, content):
+    """css/app.css -> css/app.<hash>.css"""
+    digest = hashlib.sha256(content).hexdigest()[:HASH_LENGTH]
+    path = Path(relative_path)
+    return str(path.with_name(f'{path.stem}.{digest}{path.suffix}').as_posix())
+
+
+class StaticAssets:
+    """Manifest of fingerprinted asset names and their precompressed copies."""
+
+    def __init__(self, folder=None, build_dir=None, url_prefix='/assets'):
+        self.folder = Path(folder) if folder else Path(__file__).parent / 'static'
+        self.build_dir = Path(build_dir or os.environ.get('STATIC_BUILD_DIR', 'static_build'))
+        self.url_prefix = url_prefix
+        # Logical name -> fingerprinted name, and the reverse for serving
+        self.manifest = {}
+        self.sources = {}
+
+    def scan(self):
+        """Hash every file under the static folder."""
+        self.manifest, self.sources = {}, {}
+        if not self.folder.is_dir():
+            return self.manifest
+        for path in sorted(self.folder.rglob('*')):
+            if path.is_file():
+                relative = path.relative_to(self.folder).as_posix()
+                hashed = fingerprint(relative, path.read_bytes())
+                self.manifest[relative] = hashed
+                self.sources[hashed] = path
+        return self.manifest
+
+    def compressed_path(self, hashed, encoding):
+        return self.build_dir / (hashed + COMPRESSED_SUFFIXES[encoding])
+
+    def build(self):
+        """Write compressed copies of compressible assets that do not have them yet. Returns their count."""
+        if not self.manifest:
+            self.scan()
+        written = 0
+        for hashed, source in self.sources.items():
+            if source.suffix not in COMPRESSIBLE_SUFFIXES:
+                continue
+            data = None
+            for encoding in compression.available_encodings():
+                target = self.compressed_path(hashed, encoding)
+                if target.exists():
+                    continue
+                data = data if data is not None else source.read_bytes()
+                target.parent.mkdir(parents=True, exist_ok=True)
+                with atomic_file.writing(target) as f:
+                    f.write(compression.compress(data, encoding, best=True))
+                written += 1
+        return written
+
+    def url(self, relative_path):
+        """Fingerprinted URL of an asset; unknown files fall back to /static."""
+        hashed = self.manifest.get(relative_path)
+        if hashed is None:
+            return f'/static/{relative_path}'
+        return f'{self.url_prefix}/{hashed}'
+
+    def serve(self, filename):
+        """Send a fingerprinted asset, precompressed when the client accepts it."""
+        source = self.sources.get(filename)
+        if source is None or not source.exists():
+            abort(404)
+
+        path, encoding = source, None
+        if source.suffix in COMPRESSIBLE_SUFFIXES:
+            accepted = compression.choose_encoding(request.accept_encodings)
+            if accepted and self.compressed_path(filename, accepted).exists():
+                path, encoding = self.compressed_path(filename, accepted), accepted
+
+        response = send_file(path.resolve(), mimetype=_mimetype(source), conditional=True, etag=True, max_age=31536000)
+        response.headers['Cache-Control'] = IMMUTABLE_CACHE_CONTROL
+        if source.suffix in COMPRESSIBLE_SUFFIXES:
+            response.vary.add('Accept-Encoding')
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+        return response
+
+    def init_app(self, app):
+        self.scan()
+        try:
+            self.build()
+        except OSError:
+            app.logger.warning('Could not write precompressed assets to %s', self.build_dir)
+        app.add_url_rule(f'{self.url_prefix}/<path:filename>', 'asset', self.serve)
+        app.jinja_env.globals['asset_url'] = self.url
+
+
+def _mimetype(path):
+    if path.suffix == '.js':
+        return 'text/javascript'
+    return mimetypes.guess_type(path.name)[0] or 'application/octet-stream'
+
+
+if __name__ == '__main__':
+    assets = StaticAssets()
+    assets.scan()
+    print(f'{assets.build()} compressed assets written to {assets.build_dir}')
+    for name, hashed in assets.manifest.items():
+        print(f'  {name} -> {hashed}')
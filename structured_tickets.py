@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+"""
+Better Jira Generator - Structured Tickets
+JSON-mode generation of Jira tickets, validated and rendered to markdown.
+
+The model is asked for a JSON document matching TICKET_SCHEMA: a title,
+an overview and a list of tickets with a summary, description, acceptance
+criteria, technical requirements, labels and optional story points. The
+reply is validated here and stored one row per ticket (see
+web_app.ExportTicket), so tickets can be queried with SQL; the export file
+holds the markdown rendered from it. Later edits to that markdown are
+parsed back with parse_markdown, since it keeps the same layout.
+"""
+
+import json
+import re
+
+SUMMARY_LIMIT = 255
+LABEL_LIMIT = 100
+
+TICKET_SCHEMA = {
+    'type': 'object',
+    'required': ['title', 'tickets'],
+    'properties': {
+        'title': {'type': 'string'},
+        'overview': {'type': 'string'},
+        'tickets': {
+            'type': 'array',
+            'minItems': 1,
+            'items': {
+                'type': 'object',
+                'required': ['summary', 'description', 'acceptance_criteria'],
+                'properties': {
+                    'summary': {'type': 'string', 'maxLength': SUMMARY_LIMIT},
+                    'description': {'type': 'string'},
+                    'acceptance_criteria': {'type': 'array', 'items': {'type': 'string'}},
+                    'technical_requirements': {'type': 'array', 'items': {'type': 'string'}},
+                    'labels': {'type': 'array', 'items': {'type': 'string'}},
+                    'story_points': {'type': ['integer', 'null']},
+                },
+            },
+        },
+    },
+}
+
+ACCEPTANCE_HEADING = 'Acceptance Criteria'
+TECHNICAL_HEADING = 'Technical Requirements'
+
+_FENCE = re.compile(r'^```(?:json)?\s*\n(.*)\n```\s*$', re.DOTALL)
+_BOLD_HEADING = re.compile(r'^\*\*(.+?)\*\*$')
+_FIELD = re.compile(r'^\*\*(Labels|Story Points):\*\*\s*(.*)$')
+_LIST_ITEM = re.compile(r'^\s*[-*+]\s+(.*)$')
+
+
+class TicketValidationError(ValueError):
+    """The model's reply is not valid JSON or does not match TICKET_SCHEMA."""
+
+
+def build_messages(repo_url, user_type, project_description):
+    """Messages asking the model for the project's tickets as JSON."""
+    system_prompt = f"""You are an AI assistant helping create Jira tickets.
+
+The codebase is at: {repo_url}
+User role: {user_type}
+
+Break the project described by the user into Jira tickets a {user_type} would work from.
+Reply with a single JSON object and nothing else, matching this JSON schema:
+
+{json.dumps(TICKET_SCHEMA, indent=2)}
+
+- summary: a short imperative ticket title
+- description: one or two paragraphs of markdown
+- acceptance_criteria: testable statements, one per item
+- technical_requirements: implementation notes, one per item
+- labels: a few lowercase keywords such as "backend" or "auth"
+- story_points: a Fibonacci estimate (1, 2, 3, 5, 8, 13), or null"""
+
+    return [
+        {'role': 'system', 'content': system_prompt},
+        {
+            'role': 'user',
+            'content': f"""Create the Jira tickets for this project:
+
+---PROJECT DESCRIPTION---
+{project_description}""",
+        },
+    ]
+
+
+def normalize_label(label):
+    """Jira labels cannot contain spaces."""
+    return re.sub(r'\s+', '-', label.strip().lower())[:LABEL_LIMIT]
+
+
+def _text(value, where, required=True):
+    if value is None and not required:
+        return ''
+    if not isinstance(value, str) or (required and not value.strip()):
+        raise TicketValidationError(f'{where} must be a non-empty string')
+    return value.strip()
+
+
+def _strings(value, where):
+    if value is None:
+        return []
+    if not isinstance(value, list) or not all(isinstance(item, str) for item in value):
+        raise TicketValidationError(f'{where} must be a list of strings')
+    return [item.strip() for item in value if item.strip()]
+
+
+def validate_document(data):
+    """Check a parsed reply against TICKET_SCHEMA. Returns it normalized (stripped, labels deduplicated)."""
+    if not isinstance(data, dict):
+        raise TicketValidationError('The reply must be a JSON object')
+    tickets = data.get('tickets')
+    if not isinstance(tickets, list) or not tickets:
+        raise TicketValidationError('tickets must be a non-empty list')
+
+    document = {
+        'title': _text(data.get('title'), 'title'),
+        'overview': _text(data.get('overview'), 'overview', required=False),
+        'tickets': [],
+    }
+    for i, ticket in enumerate(tickets):
+        where = f'tickets[{i}]'
+        if not isinstance(ticket, dict):
+            raise TicketValidationError(f'{where} must be an object')
+        summary = _text(ticket.get('summary'), f'{where}.summary')
+        if len(summary) > SUMMARY_LIMIT:
+            raise TicketValidationError(f'{where}.summary is longer than {SUMMARY_LIMIT} characters')
+        points = ticket.get('story_points')
+        if points is not None and (isinstance(points, bool) or not isinstance(points, (int, float)) or points != int(points) or points < 0):
+            raise TicketValidationError(f'{where}.story_points must be a whole number or null')
+
+        labels = []
+        for label in _strings(ticket.get('labels'), f'{where}.labels'):
+            label = normalize_label(label)
+            if label not in labels:
+                labels.append(label)
+
+        document['tickets'].append({
+            'summary': summary,
+            'description': _text(ticket.get('description'), f'{where}.description', required=False),
+            'acceptance_criteria': _strings(ticket.get('acceptance_criteria'), f'{where}.acceptance_criteria'),
+            'technical_requirements': _strings(ticket.get('technical_requirements'), f'{where}.technical_requirements'),
+            'labels': labels,
+            'story_points': int(points) if points is not None else None,
+        })
+    return document
+
+
+def parse_document(text):
+    """Parse and validate the model's JSON reply."""
+    text = (text or '').strip()
+    # JSON mode should not wrap the reply in a code fence, but models sometimes do
+    match = _FENCE.match(text)
+    if match:
+        text = match.group(1)
+    try:
+        data = json.loads(text)
+    except json.JSONDecodeError as e:
+        raise TicketValidationError(f'The reply is not valid JSON: {e}') from None
+    return validate_document(data)
+
+
+def render_markdown(document):
+    """The export file for a structured document; one `##` section per ticket, as jira_push expects."""
+    lines = [f"# {document['title']}", '']
+    if document.get('overview'):
+        lines += [document['overview'], '']
+
+    for ticket in document['tickets']:
+        lines += [f"## {ticket['summary']}", '']
+        if ticket['description']:
+            lines += [ticket['description'], '']
+        for heading, items in ((ACCEPTANCE_HEADING, ticket['acceptance_criteria']),
+                               (TECHNICAL_HEADING, ticket['technical_requirements'])):
+            if items:
+                lines += [f'**{heading}**', '']
+                lines += [f'- {item}' for item in items]
+                lines.append('')
+        if ticket['labels']:
+            lines.append(f"**Labels:** {', '.join(ticket['labels'])}")
+        if ticket['story_points'] is not None:
+            lines.append(f"**Story Points:** {ticket['story_points']}")
+        if ticket['labels'] or ticket['story_points'] is not None:
+            lines.append('')
+
+    return '\n'.join(lines).rstrip() + '\n'
+
+
+def parse_markdown(content):
+    """
+    Read tickets back from markdown laid out like render_markdown's, e.g.
+    after the document was revised in a chat. Returns a validated document,
+    or raises TicketValidationError if no tickets are found.
+    """
+    title, overview, tickets = None, [], []
+    ticket = section = None
+    for line in content.splitlines():
+        if line.startswith('# ') and title is None and ticket is None:
+            title = line[2:].strip()
+            continue
+        if line.startswith('## '):
+            ticket = {'summary': line[3:].strip(), 'description': [], 'acceptance_criteria': [],
+                      'technical_requirements': [], 'labels': [], 'story_points': None}
+            tickets.append(ticket)
+            section = 'description'
+            continue
+        if ticket is None:
+            overview.append(line)
+            continue
+
+        field = _FIELD.match(line.strip())
+        heading = _BOLD_HEADING.match(line.strip())
+        item = _LIST_ITEM.match(line)
+        if field:
+            name, value = field.groups()
+            if name == 'Labels':
+                ticket['labels'] = [label for label in (part.strip() for part in value.split(',')) if label]
+            else:
+                ticket['story_points'] = int(value) if value.strip().isdigit() else None
+        elif heading and heading.group(1).strip().rstrip(':') in (ACCEPTANCE_HEADING, TECHNICAL_HEADING):
+            section = 'acceptance_criteria' if heading.group(1).startswith(ACCEPTANCE_HEADING) else 'technical_requirements'
+        elif item and section != 'description':
+            ticket[section].append(item.group(1))
+        elif section == 'description':
+            ticket['description'].append(line)
+
+    for ticket in tickets:
+        ticket['description'] = '\n'.join(ticket['description']).strip()
+    return validate_document({
+        'title': title or (tickets[0]['summary'] if tickets else ''),
+        'overview': '\n'.join(overview).strip(),
+        'tickets': tickets,
+    })
@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""
+Better Jira Generator - Task Briefs
+Compact task documents once and reuse the result across sessions and users.
+
+The system prompt carries the task file on every turn, so its size is paid
+for again and again. A brief is the document with whitespace normalized,
+boilerplate (HTML comments, badges and images, horizontal rules, tables of
+contents) stripped and repeated paragraphs dropped. When
+TASK_BRIEF_SUMMARIZE is on and the brief is still over
+TASK_BRIEF_SUMMARY_TOKENS tokens, it is summarized by the LLM once and
+the summary cached beside it.
+
+Briefs are keyed by the SHA-256 of the document, kept in an in-memory LRU
+and written to TASK_BRIEF_DIR with the original next to them, so every
+worker, the CLI and later sessions reuse them and the full document can
+still be retrieved by its hash.
+"""
+
+import hashlib
+import os
+import re
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+import atomic_file
+import token_budget
+
+_FENCE = re.compile(r'^[ \t]{0,3}(```|~~~)')
+_HTML_COMMENT = re.compile(r'<!--.*?-->', re.DOTALL)
+# Badges ([![build](...)](...)) and images carry no requirements
+_BADGE = re.compile(r'\[!\[[^\]]*\]\([^)]*\)\]\([^)]*\)')
+_IMAGE = re.compile(r'!\[[^\]]*\]\([^)]*\)')
+_RULE = re.compile(r'^[ \t]*([-*_])([ \t]*\1){2,}[ \t]*$')
+_HEADING = re.compile(r'^(#{1,6})[ \t]+(.+?)[ \t]*#*[ \t]*$')
+_TOC_TITLES = {'table of contents', 'contents', 'toc'}
+_TOC_ENTRY = re.compile(r'^[ \t]*(?:[-*+]|\d+\.)[ \t]+\[[^\]]+\]\(#[^)]*\)[ \t]*$')
+_SPACES = re.compile(r'(?<=\S)[ \t]{2,}')
+
+
+def brief_settings():
+    return {
+        'summarize': os.environ.get('TASK_BRIEF_SUMMARIZE', '').lower() in ('1', 'true', 'yes', 'on'),
+        'summary_tokens': int(os.environ.get('TASK_BRIEF_SUMMARY_TOKENS', 2000)),
+    }
+
+
+def content_hash(content):
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+
+def _blocks(lines):
+    """Split lines into paragraphs at blank lines, keeping each fenced code block whole."""
+    block, fence = [], None
+    for line in lines:
+        match = _FENCE.match(line)
+        if fence is None and not line.strip():
+            if block:
+                yield block
+                block = []
+            continue
+        block.append(line)
+        if match:
+            if fence is None:
+                fence = match.group(1)
+            elif match.group(1) == fence:
+                fence = None
+    if block:
+        yield block
+
+
+def _without_toc(blocks):
+    """Drop a 'Table of Contents' heading and the list of in-page links under it."""
+    skipping = False
+    for block in blocks:
+        heading = _HEADING.match(block[0])
+        if heading and len(block) == 1 and heading.group(2).strip().lower() in _TOC_TITLES:
+            skipping = True
+            continue
+        if skipping and all(_TOC_ENTRY.match(line) for line in block):
+            continue
+        skipping = False
+        yield block
+
+
+def compact(content):
+    """The brief of a task document: the same text with boilerplate, repetition and extra whitespace removed."""
+    content = _HTML_COMMENT.sub('', content.replace('\r\n', '\n').replace('\r', '\n'))
+
+    lines, fence = [], None
+    for line in content.split('\n'):
+        line = line.rstrip()
+        match = _FENCE.match(line)
+        if fence is not None:
+            # Code is kept as written
+            lines.append(line)
+            if match and match.group(1) == fence:
+                fence = None
+            continue
+        if match:
+            fence = match.group(1)
+            lines.append(line)
+            continue
+        if _RULE.match(line):
+            lines.append('')
+            continue
+        line = _IMAGE.sub('', _BADGE.sub('', line)).rstrip()
+        lines.append(_SPACES.sub(' ', line.expandtabs(4)))
+
+    seen, kept = set(), []
+    for block in _without_toc(_blocks(lines)):
+        text = '\n'.join(block)
+        # Headings repeat legitimately (a "Notes" under every ticket); repeated paragraphs do not
+        key = ' '.join(text.lower().split())
+        if not _HEADING.match(text) and key in seen:
+            continue
+        seen.add(key)
+        kept.append(text)
+    return '\n\n'.join(kept) + '\n' if kept else ''
+
+
+class BriefCache:
+    """
+    Task briefs keyed by the SHA-256 of the original document, in an
+    in-memory LRU and in cache_dir as `<hash>.brief.md` beside the
+    original `<hash>.md`. Summaries are kept apart as `<hash>.summary.md`,
+    so a brief made without a summarizer never stands in for one.
+    """
+
+    def __init__(self, cache_dir, max_entries=64):
+        self.cache_dir = Path(cache_dir)
+        self.max_entries = max_entries
+        self._briefs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, content, summarize=None):
+        """
+        Return (content_hash, brief) for a task document, compacting it only
+        on a cache miss. When summaries are enabled and the brief is over
+        TASK_BRIEF_SUMMARY_TOKENS, a cached summary is returned instead;
+        without one, `summarize` is called with the brief and its result
+        stored. Callers without a summarizer, or whose summary failed, get
+        the brief, and a later caller with a summarizer tries again.
+        """
+        document_hash = content_hash(content)
+        brief = self._cached(document_hash, 'brief')
+        if brief is None:
+            brief = compact(content)
+            self._write_to_disk(self.cache_dir / f'{document_hash}.md', content)
+            self._store(document_hash, 'brief', brief)
+
+        settings = brief_settings()
+        if not settings['summarize'] or token_budget.count_tokens(brief) <= settings['summary_tokens']:
+            return document_hash, brief
+
+        summary = self._cached(document_hash, 'summary')
+        if summary is None and summarize:
+            try:
+                summary = summarize(brief)
+            except Exception:
+                summary = None
+            if summary is not None:
+                self._store(document_hash, 'summary', summary)
+        return document_hash, summary if summary is not None else brief
+
+    def original(self, document_hash):
+        """The full document a brief was made from, or None if it is not cached."""
+        if not re.fullmatch(r'[0-9a-f]{64}', document_hash or ''):
+            return None
+        return self._read_from_disk(self.cache_dir / f'{document_hash}.md')
+
+    def _cached(self, document_hash, kind):
+        key = (document_hash, kind)
+        with self._lock:
+            text = self._briefs.get(key)
+            if text is not None:
+                self._briefs.move_to_end(key)
+                return text
+        text = self._read_from_disk(self.cache_dir / f'{document_hash}.{kind}.md')
+        if text is not None:
+            self._remember(key, text)
+        return text
+
+    def _store(self, document_hash, kind, text):
+        self._write_to_disk(self.cache_dir / f'{document_hash}.{kind}.md', text)
+        self._remember((document_hash, kind), text)
+
+    def _remember(self, key, text):
+        with self._lock:
+            self._briefs[key] = text
+            self._briefs.move_to_end(key)
+            while len(self._briefs) > self.max_entries:
+                self._briefs.popitem(last=False)
+
+    def _read_from_disk(self, disk_path):
+        # newline='' keeps the text exactly as written, so an original still matches its hash
+        try:
+            with open(disk_path, 'r', encoding='utf-8', newline='') as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def _write_to_disk(self, disk_path, text):
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            with atomic_file.writing(disk_path, 'w', encoding='utf-8', newline='') as f:
+                f.write(text)
+        except OSError:
+            pass
@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+"""
+ASGI Tests for Better Jira Generator
+Tests the async serving mode for LLM-bound routes.
+"""
+
+import asyncio
+import json
+import sys
+import time
+from pathlib import Path
+from types import SimpleNamespace
+from unittest import mock
+
+# Add the project root to Python path
+sys.path.insert(0, str(Path(__file__).parent))
+
+
+class SlowAsyncClient:
+    """AsyncGroq stand-in whose completions take `delay` seconds."""
+
+    def __init__(self, delay):
+        self.delay = delay
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    async def create(self, **kwargs):
+        await asyncio.sleep(self.delay)
+        return SimpleNamespace(
+            usage=None,
+            choices=[SimpleNamespace(message=SimpleNamespace(content='# Outline\n\nGenerated.\n'))],
+        )
+
+
+class StreamingAsyncClient:
+    """AsyncGroq stand-in that streams a fixed reply in chunks."""
+
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.requests = []
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    async def create(self, **kwargs):
+        self.requests.append(dict(kwargs, messages=list(kwargs['messages'])))
+        return self.stream()
+
+    async def stream(self):
+        for text in self.chunks:
+            yield SimpleNamespace(x_groq=None, choices=[SimpleNamespace(delta=SimpleNamespace(content=text))])
+        usage = SimpleNamespace(prompt_tokens=12, completion_tokens=3, queue_time=0.01)
+        yield SimpleNamespace(x_groq=SimpleNamespace(usage=usage), choices=[])
+
+
+async def call(app, method, path, body=b'', cookie=None):
+    """Send one HTTP request to an ASGI app and return (status, headers)."""
+    headers = [(b'content-type', b'application/x-www-form-urlencoded')]
+    if cookie:
+        headers.append((b'cookie', cookie.encode()))
+    scope = {
+        'type': 'http', 'http_version': '1.1', 'method': method, 'path': path,
+        'raw_path': path.encode(), 'query_string': b'', 'root_path': '', 'scheme': 'http',
+        'headers': headers, 'server': ('testserver', 80), 'client': ('127.0.0.1', 1234),
+    }
+    messages = [{'type': 'http.request', 'body': body, 'more_body': False}]
+    response = {}
+
+    async def receive():
+        return messages.pop(0) if messages else {'type': 'http.disconnect'}
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            response['status'] = message['status']
+            response['headers'] = {k.decode().lower(): v.decode() for k, v in message['headers']}
+
+    await app(scope, receive, send)
+    return response['status'], response['headers']
+
+
+def test_async_new_chat_runs_concurrently():
+    """Test that concurrent new chats overlap their LLM waits and create exports."""
+    import asgi
+    from web_app import app as flask_app, db, Export, ExportRevision, User
+
+    print("Testing async new_chat...")
+
+    with flask_app.app_context():
+        user = User.query.filter_by(username='demo-dev').first()
+        assert user is not None, "demo-dev user should exist"
+        user_id = user.id
+    cookie = 'session=' + asgi._serializer().dumps({'user_id': user_id, 'username': 'demo-dev'})
+    body = b'repo_url=https%3A%2F%2Fgithub.com%2Fexample%2Fasgi-test&project_description=Saved+carts&user_type=Developer'
+
+    async def run():
+        started = time.perf_counter()
+        results = await asyncio.gather(*[call(asgi.app, 'POST', '/new_chat', body, cookie) for _ in range(5)])
+        return results, time.perf_counter() - started
+
+    with mock.patch.object(asgi, '_groq_client', SlowAsyncClient(delay=0.5)):
+        results, elapsed = asyncio.run(run())
+
+    try:
+        assert all(status == 302 for status, _ in results)
+        assert all('/history/view/' in headers['location'] for _, headers in results), results
+        assert elapsed < 2.0, f"5 x 0.5s generations should overlap, took {elapsed:.2f}s"
+        print(f"✓ 5 concurrent generations finished in {elapsed:.2f}s")
+
+        status, headers = asyncio.run(call(asgi.app, 'POST', '/new_chat', body))
+        assert status == 302 and headers['location'].endswith('/login')
+
+        status, _ = asyncio.run(call(asgi.app, 'GET', '/login'))
+        assert status == 200, "Other routes should be served by the Flask app"
+        print("✓ Logged-out users are redirected and other routes fall through to Flask")
+    finally:
+        with flask_app.app_context():
+            for export in Export.query.filter_by(repository='https://github.com/example/asgi-test').all():
+                Path(export.file_path).unlink(missing_ok=True)
+                ExportRevision.query.filter_by(export_id=export.id).delete()
+                db.session.execute(db.text('DELETE FROM exports_fts WHERE rowid = :id'), {'id': export.id})
+                db.session.delete(export)
+            db.session.commit()
+
+
+def test_chat_socket_streams_and_persists_turns():
+    """Test the /ws/chat WebSocket: streamed replies, incremental saving and commands."""
+    import asgi
+    import main
+    from web_app import app as flask_app, db, Export, ExportRevision, User
+
+    print("Testing /ws/chat...")
+
+    with flask_app.app_context():
+        user_id = User.query.filter_by(username='demo-dev').first().id
+    cookie = 'session=' + asgi._serializer().dumps({'user_id': user_id, 'username': 'demo-dev'})
+    repo = 'https://github.com/example/ws-chat-test'
+    client = StreamingAsyncClient(['Add a ', 'saved cart ', 'table.'])
+    records = []
+
+    async def run(frames, headers):
+        incoming = [{'type': 'websocket.connect'}]
+        incoming += [{'type': 'websocket.receive', 'text': json.dumps(frame)} for frame in frames]
+        incoming.append({'type': 'websocket.disconnect', 'code': 1000})
+        sent = []
+
+        async def receive():
+            return incoming.pop(0)
+
+        async def send(message):
+            sent.append(message)
+
+        scope = {
+            'type': 'websocket', 'path': '/ws/chat', 'headers': headers,
+            'query_string': ('role=developer&repository=' + repo).encode(),
+        }
+        await asgi.app(scope, receive, send)
+        return sent
+
+    def replies(sent):
+        return [json.loads(message['text']) for message in sent if message['type'] == 'websocket.send']
+
+    try:
+        with mock.patch.object(asgi, '_groq_client', client), \
+                mock.patch.object(main, 'LLM_CALL_HOOKS', [records.append]):
+            sent = asyncio.run(run([
+                {'type': 'message', 'content': 'How do I store carts?'},
+                {'type': 'message', 'content': 'And expiry?'},
+                {'type': 'command', 'command': 'SAVE', 'name': 'cart chat'},
+                {'type': 'message', 'content': 'HISTORY'},
+            ], [(b'cookie', cookie.encode())]))
+
+        assert sent[0]['type'] == 'websocket.accept'
+        frames = replies(sent)
+        assert frames[0]['type'] == 'ready' and frames[0]['repository'] == repo
+        tokens = [frame['content'] for frame in frames if frame['type'] == 'token']
+        assert tokens[:3] == ['Add a ', 'saved cart ', 'table.'], tokens
+        reply_frames = [frame for frame in frames if frame['type'] == 'reply']
+        assert len(reply_frames) == 2 and reply_frames[0]['content'] == 'Add a saved cart table.'
+        export_id = reply_frames[0]['export_id']
+        assert reply_frames[1]['export_id'] == export_id, "Later turns should go to the same export"
+        print("✓ Replies are streamed token by token")
+
+        system_prompt = client.requests[0]['messages'][0]['content']
+        assert system_prompt == main.get_system_prompt('developer', repo)
+        assert client.requests[0]['stream'] is True
+        assert len(client.requests[1]['messages']) == 4, "Second turn should carry the first one"
+        assert records[0]['prompt_tokens'] == 12 and records[0]['time_to_first_token'] is not None
+        print("✓ The CLI's role prompt is used and usage is reported")
+
+        saved = next(frame for frame in frames if frame['type'] == 'saved')
+        assert saved['export']['original_name'] == 'cart_chat'
+        history = next(frame for frame in frames if frame['type'] == 'history')
+        assert history['items'][0]['id'] == export_id
+        with flask_app.app_context():
+            export = Export.query.get(export_id)
+            with open(export.file_path, encoding='utf-8') as f:
+                content = f.read()
+            assert export.action == 'web_chat' and export.user_id == user_id
+            assert main.parse_chat_markdown(content) == [
+                {'role': 'user', 'content': 'How do I store carts?'},
+                {'role': 'assistant', 'content': 'Add a saved cart table.'},
+                {'role': 'user', 'content': 'And expiry?'},
+                {'role': 'assistant', 'content': 'Add a saved cart table.'},
+            ]
+            assert ExportRevision.query.filter_by(export_id=export_id).count() == 1
+        print("✓ Turns are appended to one export and SAVE/HISTORY work")
+
+        with mock.patch.object(asgi, '_groq_client', client):
+            frames = replies(asyncio.run(run([
+                {'type': 'command', 'command': 'OPEN', 'export_id': export_id},
+                {'type': 'message', 'content': 'What about guests?'},
+            ], [(b'cookie', cookie.encode())])))
+        opened = next(frame for frame in frames if frame['type'] == 'opened')
+        assert len(opened['messages']) == 4
+        assert len(client.requests[-1]['messages']) == 6, "Opened chat should continue with its history"
+        with flask_app.app_context():
+            with open(Export.query.get(export_id).file_path, encoding='utf-8') as f:
+                assert len(main.parse_chat_markdown(f.read())) == 6
+        print("✓ OPEN continues a saved chat in the same file")
+
+        with mock.patch.object(asgi, '_groq_client', client):
+            frames = replies(asyncio.run(run([
+                {'type': 'message', 'content': 5},
+                {'type': 'command', 'command': 1},
+                {'type': 'message', 'content': 'Still here?'},
+                {'type': 'command', 'command': 'SAVE', 'name': ['x']},
+            ], [(b'cookie', cookie.encode())])))
+        errors = [frame for frame in frames if frame['type'] == 'error']
+        assert [error['message'] for error in errors] == [
+            'content and command must be strings.', 'content and command must be strings.', 'name must be a string.',
+        ], errors
+        assert any(frame['type'] == 'reply' for frame in frames), "The connection survives malformed frames"
+        print("✓ Frames with non-string fields get an error frame")
+
+        sent = asyncio.run(run([], []))
+        assert sent[-1] == {'type': 'websocket.close', 'code': asgi.WS_UNAUTHORIZED}
+        print("✓ Logged-out connections are refused")
+
+        same_site = [(b'cookie', cookie.encode()), (b'host', b'jira.example.com'), (b'origin', b'https://jira.example.com')]
+        assert replies(asyncio.run(run([], same_site)))[0]['type'] == 'ready'
+        cross_site = [(b'cookie', cookie.encode()), (b'host', b'jira.example.com'), (b'origin', b'https://evil.example')]
+        sent = asyncio.run(run([], cross_site))
+        assert sent[-1] == {'type': 'websocket.close', 'code': asgi.WS_POLICY_VIOLATION} and not replies(sent)
+        with mock.patch.dict('os.environ', {'WS_ALLOWED_ORIGINS': 'https://evil.example'}):
+            assert replies(asyncio.run(run([], cross_site)))[0]['type'] == 'ready'
+        print("✓ Handshakes from other origins are refused unless allowed")
+    finally:
+        with flask_app.app_context():
+            for export in Export.query.filter_by(repository=repo).all():
+                Path(export.file_path).unlink(missing_ok=True)
+                ExportRevision.query.filter_by(export_id=export.id).delete()
+                db.session.execute(db.text('DELETE FROM exports_fts WHERE rowid = :id'), {'id': export.id})
+                db.session.delete(export)
+            db.session.commit()
+
+
+if __name__ == '__main__':
+    test_async_new_chat_runs_concurrently()
+    test_chat_socket_streams_and_persists_turns()
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Atomic File Tests for Better Jira Generator
+Tests that concurrent and failed writes never leave a partial file behind.
+"""
+
+import sys
+import tempfile
+import threading
+from pathlib import Path
+
+# Add the project root to Python path
+sys.path.insert(0, str(Path(__file__).parent))
+
+
+def test_atomic_writes():
+    """Test that threads writing one file each publish a whole copy."""
+    import atomic_file
+
+    print("Testing atomic file writes...")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        target = Path(tmp_dir) / 'cached.html'
+        contents = [str(i).encode() * 200_000 for i in range(8)]
+        start = threading.Barrier(len(contents))
+
+        def writer(data):
+            start.wait()
+            with atomic_file.writing(target) as f:
+                for i in range(0, len(data), 4096):
+                    f.write(data[i:i + 4096])
+
+        threads = [threading.Thread(target=writer, args=(data,)) for data in contents]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert target.read_bytes() in contents
+        assert [path.name for path in Path(tmp_dir).iterdir()] == ['cached.html']
+        print("✓ Threads in one process never share a temporary file")
+
+        before = target.read_bytes()
+        try:
+            with atomic_file.writing(target, 'w', encoding='utf-8') as f:
+                f.write('half a file')
+                raise RuntimeError('disk full')
+        except RuntimeError:
+            pass
+        assert target.read_bytes() == before
+        assert [path.name for path in Path(tmp_dir).iterdir()] == ['cached.html']
+        print("✓ A failed write leaves the old file and no temporary file")
+
+
+if __name__ == '__main__':
+    test_atomic_writes()
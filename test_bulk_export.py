@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Bulk Export Tests for Better Jira Generator
+Tests the streamed ZIP download of a user's exports.
+"""
+
+import io
+import json
+import sys
+import tempfile
+import zipfile
+from datetime import datetime
+from pathlib import Path
+
+# Add the project root to Python path
+sys.path.insert(0, str(Path(__file__).parent))
+
+
+def test_stream_exports_zip():
+    """Test that the archive is streamed in chunks and holds every readable file."""
+    from bulk_export import stream_exports_zip
+
+    print("Testing streamed ZIP archives...")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        large = Path(tmp_dir) / 'large.md'
+        large.write_bytes(b''.join(f'line {i} {i * 7919 % 104729}\n'.encode() for i in range(20000)))
+        entries = [
+            {'id': 1, 'filename': 'large.md', 'file_path': str(large), 'date': '2024-05-01T10:00:00'},
+            {'id': 2, 'filename': 'large.md', 'file_path': str(large), 'date': None},
+            {'id': 3, 'filename': 'gone.md', 'file_path': str(Path(tmp_dir) / 'gone.md'), 'date': None},
+        ]
+
+        chunks = list(stream_exports_zip(entries, chunk_size=4096))
+        assert len(chunks) > 10, "The archive should arrive in many small chunks"
+        assert max(len(chunk) for chunk in chunks) < 64 * 1024
+
+        archive = zipfile.ZipFile(io.BytesIO(b''.join(chunks)))
+        assert archive.testzip() is None
+        assert archive.read('exports/large.md') == large.read_bytes()
+        assert archive.read('exports/2_large.md') == large.read_bytes(), "Duplicate names get the export id"
+
+        manifest = [json.loads(line) for line in archive.read('manifest.ndjson').splitlines()]
+        assert [row['included'] for row in manifest] == [True, True, False]
+        assert manifest[0]['archive_path'] == 'exports/large.md'
+        print(f"✓ {len(chunks)} chunks make a valid archive with a manifest")
+
+
+def test_archive_route_filters():
+    """Test the archive endpoint's ownership and filters."""
+    from web_app import app, db, Export, User
+
+    print("Testing /api/v1/items/archive...")
+
+    with tempfile.TemporaryDirectory() as tmp_dir, app.app_context():
+        user = User.query.filter_by(username='demo-dev').first()
+        other = User.query.filter_by(username='demo-pm').first()
+        assert user is not None and other is not None, "demo users should exist"
+
+        repo = 'https://github.com/example/archive-test'
+        exports = []
+        for name, owner, user_type, date in [
+            ('a.md', user, 'Developer', datetime(2024, 3, 1, 12)),
+            ('b.md', user, 'Product Manager', datetime(2024, 3, 2, 12)),
+            ('c.md', other, 'Developer', datetime(2024, 3, 1, 12)),
+        ]:
+            file_path = Path(tmp_dir) / name
+            file_path.write_text(f'# {name}\n')
+            export = Export(filename=name, file_path=str(file_path), user_id=owner.id,
+                            repository=repo, user_type=user_type, date=date)
+            db.session.add(export)
+            exports.append(export)
+        db.session.commit()
+
+        def archive_names(client, query):
+            response = client.get(f'/api/v1/items/archive?repository={repo}{query}')
+            assert response.status_code == 200 and response.is_streamed
+            assert response.mimetype == 'application/zip'
+            names = zipfile.ZipFile(io.BytesIO(response.get_data())).namelist()
+            return sorted(name for name in names if name != 'manifest.ndjson')
+
+        try:
+            with app.test_client() as client:
+                with client.session_transaction() as sess:
+                    sess['user_id'] = user.id
+                    sess['username'] = user.username
+
+                assert archive_names(client, '') == ['exports/a.md', 'exports/b.md']
+                assert archive_names(client, '&user_type=developer') == ['exports/a.md']
+                assert archive_names(client, '&since=2024-03-02') == ['exports/b.md']
+                assert archive_names(client, '&until=2024-03-01') == ['exports/a.md']
+                print("✓ Only the user's exports are included and filters apply")
+
+                for username, prefix in (('名前', f'exports_user{user.id}_'), ('bob"; x=1', 'exports_bob_x1_')):
+                    with client.session_transaction() as sess:
+                        sess['username'] = username
+                    response = client.get(f'/api/v1/items/archive?repository={repo}')
+                    assert response.status_code == 200 and response.get_data()
+                    assert response.headers['Content-Disposition'].startswith(f'attachment; filename={prefix}')
+                print("✓ The archive name is safe for any username")
+
+                response = client.get('/api/v1/items/archive?since=yesterday')
+                assert response.status_code == 400
+                print("✓ Malformed dates are rejected")
+        finally:
+            for export in exports:
+                db.session.delete(export)
+            db.session.commit()
+
+
+if __name__ == '__main__':
+    test_stream_exports_zip()
+    test_archive_route_filters()
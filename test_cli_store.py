@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+CLI Store Tests for Better Jira Generator
+Tests the CLI's shared-database history and its data_exports.json fallback.
+"""
+
+import sys
+import tempfile
+from datetime import datetime
+from pathlib import Path
+
+# Add the project root to Python path
+sys.path.insert(0, str(Path(__file__).parent))
+
+
+def make_entries(tmp_dir):
+    entries = []
+    for i, (repo, role) in enumerate([
+        ('https://github.com/example/cli-store-alpha', 'Developer'),
+        ('https://github.com/example/cli-store-beta', 'Product Manager'),
+        ('https://github.com/example/cli-store-alpha', 'Product Manager'),
+    ]):
+        file_path = Path(tmp_dir) / f'cli_store_{i}.md'
+        file_path.write_text(f'# Chat {i}\n\n## User\n\nHello {i}\n\n')
+        entries.append({
+            'filename': file_path.name,
+            'original_name': f'chat-{i}',
+            'date': datetime(2024, 6, i + 1, 9).isoformat(),
+            'user_type': role,
+            'repository': repo,
+            'file_path': str(file_path),
+        })
+    return entries
+
+
+def check_store(store, entries):
+    """Shared checks for both store implementations."""
+    ids = [store.add(entry, Path(entry['file_path']).read_text())['id'] for entry in entries]
+
+    found, total = store.page(1, page_size=2, repo='cli-store')
+    assert total == 3 and [e['id'] for e in found] == [ids[2], ids[1]], "Newest first, paginated"
+    found, _ = store.page(2, page_size=2, repo='cli-store')
+    assert [e['id'] for e in found] == [ids[0]]
+
+    _, total = store.page(repo='cli-store-alpha', role='product_manager')
+    assert total == 1
+    _, total = store.page(repo='cli-store', since=datetime(2024, 6, 2), until=datetime(2024, 6, 3))
+    assert total == 1
+
+    assert store.get(ids[1])['original_name'] == 'chat-1'
+    return ids
+
+
+def test_parse_history_args():
+    """Test HISTORY page numbers and filters."""
+    from cli_store import HistoryArgsError, parse_history_args
+
+    print("Testing HISTORY arguments...")
+    assert parse_history_args([]) == (1, {})
+    page, filters = parse_history_args(['3', 'repo=alpha', 'until=2024-06-01'])
+    assert page == 3 and filters['repo'] == 'alpha'
+    assert filters['until'] == datetime(2024, 6, 2), "A bare until date includes the whole day"
+    assert parse_history_args(['of', 'the', 'project']) is None, "Ordinary messages are not commands"
+    print("✓ Page numbers and filters are parsed")
+
+    for args in (['since=2024-13-01'], ['since=yesterday'], ['repo='], ['2', 'until='], ['of', 'Role=']):
+        try:
+            parse_history_args(args)
+            assert False, f"{args} should be a usage error"
+        except HistoryArgsError:
+            pass
+    print("✓ Known filters with empty or bad values are usage errors")
+
+
+def test_json_store():
+    """Test the offline data_exports.json store."""
+    from cli_store import JsonExportStore
+
+    print("Testing the JSON export store...")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        store = JsonExportStore(Path(tmp_dir) / 'data_exports.json')
+        ids = check_store(store, make_entries(tmp_dir))
+        store.remove(ids[2])
+        assert store.page(repo='cli-store')[1] == 2
+    print("✓ Offline history pages and filters like the database")
+
+
+def test_database_store():
+    """Test that the database store shares history with the web app."""
+    import main
+    from cli_store import DatabaseExportStore
+    import web_app
+    from web_app import app, db, Export, ExportRevision, User
+
+    print("Testing the database export store...")
+    with app.app_context():
+        user_id = User.query.filter_by(username='demo-dev').first().id
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        store = DatabaseExportStore(web_app, user_id)
+        try:
+            ids = check_store(store, make_entries(tmp_dir))
+            assert web_app.search_exports(user_id, 'Hello')
+            assert ExportRevision.query.filter_by(export_id=ids[0]).count() == 1
+            print("✓ CLI saves are indexed, searchable and revisioned")
+
+            hooks = []
+            store.attach_usage_hooks(hooks)
+            store.attach_usage_hooks(hooks)
+            assert hooks == [web_app.record_llm_usage]
+
+            store.remove(ids[0])
+            assert store.get(ids[0]) is None
+            assert Export.query.get(ids[0]).is_deleted, "Removal is a soft delete"
+
+            page, page_count, total = main.list_chat_history(store, 9, {'repo': 'cli-store'})
+            assert (page, page_count, total) == (1, 1, 2), "Pages past the end show the last page"
+            print("✓ History pages, filters and soft deletes work")
+        finally:
+            for export in Export.query.filter(Export.repository.like('%cli-store%')).all():
+                ExportRevision.query.filter_by(export_id=export.id).delete()
+                db.session.execute(db.text('DELETE FROM exports_fts WHERE rowid = :id'), {'id': export.id})
+                db.session.delete(export)
+            db.session.commit()
+            store.context.pop()
+
+
+if __name__ == '__main__':
+    test_parse_history_args()
+    test_json_store()
+    test_database_store()
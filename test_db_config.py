@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Database Engine Profile Tests for Better Jira Generator
+Tests the SQLite pragmas, Postgres pool options and concurrent writers.
+"""
+
+import multiprocessing
+import os
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from unittest import mock
+
+# Add the project root to Python path
+sys.path.insert(0, str(Path(__file__).parent))
+
+PROCESSES = 4
+THREADS = 4
+WRITES = 40
+
+
+def stress_worker(url, results):
+    """One 'gunicorn worker': writer threads doing read-then-write transactions next to a busy reader."""
+    from sqlalchemy import create_engine, text
+    from sqlalchemy.exc import OperationalError
+
+    import db_config
+
+    engine = create_engine(url, **db_config.engine_options(url))
+    db_config.apply_sqlite_pragmas(engine)
+    errors, slowest = [], 0.0
+
+    def writer():
+        nonlocal slowest
+        for _ in range(WRITES):
+            started = time.perf_counter()
+            try:
+                with engine.begin() as connection:
+                    count = connection.execute(text('SELECT value FROM counters WHERE id = 1')).scalar()
+                    connection.execute(text('INSERT INTO events (seen) VALUES (:seen)'), {'seen': count})
+                    connection.execute(text('UPDATE counters SET value = value + 1 WHERE id = 1'))
+            except OperationalError as e:
+                errors.append(str(e.orig))
+            slowest = max(slowest, time.perf_counter() - started)
+
+    def reader():
+        while not done.is_set():
+            try:
+                with engine.connect() as connection:
+                    connection.execute(text('SELECT COUNT(*), MAX(seen) FROM events')).fetchone()
+            except OperationalError as e:
+                errors.append(str(e.orig))
+
+    done = threading.Event()
+    reading = threading.Thread(target=reader)
+    reading.start()
+    threads = [threading.Thread(target=writer) for _ in range(THREADS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    done.set()
+    reading.join()
+    engine.dispose()
+    results.put((errors, slowest))
+
+
+def test_app_connections_use_profile():
+    """Test that the app's SQLite connections get the concurrent profile."""
+    from sqlalchemy import text
+
+    from web_app import app, db
+
+    print("Testing the app's SQLite pragmas...")
+    with app.app_context():
+        if db.engine.dialect.name != 'sqlite':
+            print("○ Not a SQLite database, skipping")
+            return
+        assert db.session.execute(text('PRAGMA journal_mode')).scalar() == 'wal'
+        assert db.session.execute(text('PRAGMA busy_timeout')).scalar() == 10000
+        assert db.session.execute(text('PRAGMA synchronous')).scalar() == 1  # NORMAL
+        assert db.session.execute(text('PRAGMA cache_size')).scalar() == -32 * 1024
+    print("✓ WAL, busy_timeout=10s, synchronous=NORMAL and a 32 MB cache")
+
+
+def test_engine_options():
+    """Test Postgres pool options, Heroku URLs and the default profile."""
+    import db_config
+
+    print("Testing engine options...")
+    with mock.patch.dict(os.environ, {'DATABASE_URL': 'postgres://u:p@db.example.com/app', 'DB_POOL_SIZE': '8'}):
+        url = db_config.database_url()
+        assert url == 'postgresql://u:p@db.example.com/app'
+        options = db_config.engine_options(url)
+        assert options['pool_pre_ping'] is True and options['pool_size'] == 8 and options['max_overflow'] == 10
+    assert db_config.engine_options('sqlite:///app.db') == {}
+    with mock.patch.dict(os.environ, {'DB_PROFILE': 'default'}):
+        assert db_config.sqlite_pragmas() == {}
+    print("✓ Postgres gets a pre-pinged pool; DB_PROFILE=default leaves SQLite alone")
+
+
+def test_concurrent_writers():
+    """Test that several processes writing at once never see "database is locked"."""
+    from sqlalchemy import create_engine, text
+
+    print(f"Testing {PROCESSES} processes x {THREADS} threads x {WRITES} writes...")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        url = f'sqlite:///{Path(tmp_dir) / "stress.db"}'
+        engine = create_engine(url)
+        with engine.begin() as connection:
+            connection.execute(text('CREATE TABLE counters (id INTEGER PRIMARY KEY, value INTEGER NOT NULL)'))
+            connection.execute(text('CREATE TABLE events (id INTEGER PRIMARY KEY, seen INTEGER NOT NULL)'))
+            connection.execute(text('INSERT INTO counters (id, value) VALUES (1, 0)'))
+
+        context = multiprocessing.get_context('spawn')
+        results = context.Queue()
+        started = time.perf_counter()
+        processes = [context.Process(target=stress_worker, args=(url, results)) for _ in range(PROCESSES)]
+        for process in processes:
+            process.start()
+        outcomes = [results.get(timeout=120) for _ in processes]
+        for process in processes:
+            process.join()
+        elapsed = time.perf_counter() - started
+
+        errors = [error for process_errors, _ in outcomes for error in process_errors]
+        assert not errors, f"{len(errors)} lock errors, e.g. {errors[0]}"
+        total = PROCESSES * THREADS * WRITES
+        with engine.connect() as connection:
+            assert connection.execute(text('SELECT value FROM counters')).scalar() == total
+            assert connection.execute(text('SELECT COUNT(*) FROM events')).scalar() == total
+            assert connection.execute(text('PRAGMA journal_mode')).scalar() == 'wal'
+        engine.dispose()
+        slowest = max(slow for _, slow in outcomes)
+        print(f"✓ {total} writes in {elapsed:.1f}s with no lock errors (slowest transaction {slowest * 1000:.0f} ms)")
+
+
+if __name__ == '__main__':
+    test_app_connections_use_profile()
+    test_engine_options()
+    test_concurrent_writers()
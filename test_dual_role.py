@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Dual-Role Generation Tests for Better Jira Generator
+Tests generating linked Product Manager and Developer outlines in parallel.
+"""
+
+import asyncio
+import sys
+import time
+from pathlib import Path
+from types import SimpleNamespace
+from unittest import mock
+
+# Add the project root to Python path
+sys.path.insert(0, str(Path(__file__).parent))
+
+REPO = 'https://github.com/example/dual-role-test'
+FORM = {
+    'repo_url': REPO,
+    'project_description': 'Saved carts',
+    'user_type': 'Product Manager + Developer',
+}
+
+
+def completion(messages):
+    role = 'pm' if 'Product Manager' in messages[0]['content'] else 'dev'
+    return SimpleNamespace(
+        usage=None,
+        choices=[SimpleNamespace(message=SimpleNamespace(content=f'# Outline ({role})\n'))],
+    )
+
+
+class SlowClient:
+    """Groq stand-in whose completions take `delay` seconds."""
+
+    def __init__(self, delay):
+        self.delay = delay
+        self.system_prompts = []
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, messages, **kwargs):
+        self.system_prompts.append(messages[0]['content'])
+        time.sleep(self.delay)
+        return completion(messages)
+
+
+class SlowAsyncClient(SlowClient):
+    async def create(self, messages, **kwargs):
+        self.system_prompts.append(messages[0]['content'])
+        await asyncio.sleep(self.delay)
+        return completion(messages)
+
+
+def check_linked_exports(export_id):
+    from web_app import Export
+
+    first = Export.query.get(export_id)
+    second = Export.query.get(first.linked_export_id)
+    assert second.linked_export_id == first.id, "Exports should link to each other"
+    assert (first.user_type, second.user_type) == ('Product Manager', 'Developer')
+    assert Path(first.file_path).read_text() == '# Outline (pm)\n'
+    assert Path(second.file_path).read_text() == '# Outline (dev)\n'
+
+
+def cleanup():
+    from web_app import db, Export, ExportRevision
+
+    for export in Export.query.filter_by(repository=REPO).all():
+        Path(export.file_path).unlink(missing_ok=True)
+        ExportRevision.query.filter_by(export_id=export.id).delete()
+        db.session.execute(db.text('DELETE FROM exports_fts WHERE rowid = :id'), {'id': export.id})
+        db.session.delete(export)
+    db.session.commit()
+
+
+def test_dual_role_new_chat():
+    """Test that the Flask route runs both roles concurrently and links the results."""
+    import main
+    from web_app import app, User
+
+    print("Testing dual-role new chat (WSGI)...")
+
+    client = SlowClient(delay=0.5)
+    with app.app_context():
+        user = User.query.filter_by(username='demo-dev').first()
+        try:
+            with app.test_client() as http, mock.patch.object(main, 'get_groq_client', lambda: client):
+                with http.session_transaction() as sess:
+                    sess['user_id'] = user.id
+                    sess['username'] = user.username
+
+                started = time.perf_counter()
+                response = http.post('/new_chat', data=FORM)
+                elapsed = time.perf_counter() - started
+
+            assert response.status_code == 302 and '/history/view/' in response.location
+            assert elapsed < 0.9, f"Two 0.5s calls should overlap, took {elapsed:.2f}s"
+            for role in ('product_manager', 'developer'):
+                role_prompt = main.get_system_prompt(role, REPO)
+                assert any(prompt.startswith(role_prompt) for prompt in client.system_prompts), \
+                    "Each call should use the CLI's role prompt"
+            check_linked_exports(int(response.location.rsplit('/', 1)[1]))
+            print(f"✓ Both outlines generated in {elapsed:.2f}s and linked")
+        finally:
+            cleanup()
+
+
+def test_dual_role_new_chat_asgi():
+    """Test the async route's dual-role mode."""
+    import asgi
+    from test_asgi import call
+    from web_app import app, User
+
+    print("Testing dual-role new chat (ASGI)...")
+
+    with app.app_context():
+        user_id = User.query.filter_by(username='demo-dev').first().id
+    cookie = 'session=' + asgi._serializer().dumps({'user_id': user_id, 'username': 'demo-dev'})
+    body = f'repo_url={REPO}&project_description=Saved+carts&user_type=Product+Manager+%2B+Developer'.encode()
+
+    client = SlowAsyncClient(delay=0.5)
+    with mock.patch.object(asgi, '_groq_client', client):
+        started = time.perf_counter()
+        status, headers = asyncio.run(call(asgi.app, 'POST', '/new_chat', body, cookie))
+        elapsed = time.perf_counter() - started
+
+    with app.app_context():
+        try:
+            assert status == 302 and '/history/view/' in headers['location']
+            assert elapsed < 0.9, f"Two 0.5s calls should overlap, took {elapsed:.2f}s"
+            check_linked_exports(int(headers['location'].rsplit('/', 1)[1]))
+            print(f"✓ Both outlines generated in {elapsed:.2f}s and linked")
+        finally:
+            cleanup()
+
+
+def test_dual_role_save_is_atomic():
+    """Test that a failed commit leaves neither export nor either file behind."""
+    from web_app import app, db, Export, User, save_dual_role_exports
+
+    print("Testing a failed dual-role save...")
+    with app.app_context():
+        user = User.query.filter_by(username='demo-dev').first()
+        files_before = set(Path('exports').glob('*.md'))
+        try:
+            with mock.patch.object(db.session, 'commit', side_effect=RuntimeError('database is locked')):
+                save_dual_role_exports(user.id, REPO, ['# Outline (pm)\n', '# Outline (dev)\n'])
+            assert False, "The failed commit should be raised"
+        except RuntimeError:
+            pass
+        try:
+            assert Export.query.filter_by(repository=REPO).count() == 0
+            assert set(Path('exports').glob('*.md')) == files_before
+            print("✓ Neither export nor its file is left when the commit fails")
+        finally:
+            cleanup()
+
+
+if __name__ == '__main__':
+    test_dual_role_new_chat()
+    test_dual_role_new_chat_asgi()
+    test_dual_role_save_is_atomic()
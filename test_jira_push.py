@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Jira Push Tests for Better Jira Generator
+Tests converting exports to Jira issues and pushing them to a fake Jira server.
+"""
+
+import os
+import sys
+import time
+from pathlib import Path
+from unittest import mock
+
+# Add the project root to Python path
+sys.path.insert(0, str(Path(__file__).parent))
+
+OUTLINE = """# Saved Carts
+=============
+
+## Project Overview
+------------------
+
+Let shoppers keep a cart between visits.
+
+## Key Features
+
+### Save for Later
+
+*   Move an item out of the cart
+    *   Keeps its price
+*   **Restore** it with one click
+
+### Shared Carts
+
+1. Share a cart by link
+"""
+
+
+def test_build_issues():
+    """Test that sections become issues with stable idempotency keys."""
+    import jira_push
+
+    print("Testing issue payloads...")
+    issues = jira_push.build_issues(OUTLINE, 'abc123', 'CART')
+    summaries = [update['fields']['summary'] for _, update in issues]
+    assert summaries == ['Project Overview', 'Key Features: Save for Later', 'Key Features: Shared Carts']
+
+    fields = issues[1][1]['fields']
+    assert fields['description'] == '* Move an item out of the cart\n** Keeps its price\n* *Restore* it with one click'
+    assert fields['project'] == {'key': 'CART'} and issues[1][0] in fields['labels']
+    assert [key for key, _ in jira_push.build_issues(OUTLINE, 'abc123', 'CART')] == [key for key, _ in issues]
+    assert jira_push.build_issues(OUTLINE, 'other', 'CART')[0][0] != issues[0][0]
+    print("✓ Sections map to issues with stable keys")
+
+
+def test_push_batches_and_retries():
+    """Test batching, bounded concurrency, retries and lost responses."""
+    import jira_push
+    from fake_jira import FakeJira
+
+    print("Testing batched pushes against the fake Jira...")
+    jira = FakeJira(project_keys=['CART'], delay=0.05).start()
+    try:
+        client = jira_push.JiraClient(jira.url, pool_size=3)
+        content = '\n'.join(f'## Ticket {i}\n\nDo thing {i}.\n' for i in range(120))
+        issues = jira_push.build_issues(content, 'batch', 'CART')
+
+        with mock.patch.object(jira_push, '_backoff', lambda attempt, retry_after=None: 0):
+            jira.fail_next(1, status=429, retry_after=0)
+            jira.lose_next(1)
+            batches = []
+            result = jira_push.push_issues(client, issues, batch_size=25, concurrency=3,
+                                           on_batch=lambda created, failed: batches.append(len(created)))
+
+        assert len(result['created']) == 120 and not result['failed']
+        assert len(jira.issues) == 120, "A lost response must not create duplicates"
+        assert sorted(batches) == [20, 25, 25, 25, 25], "Progress is reported per batch"
+        assert jira.max_in_flight <= 3, f"At most 3 batches at once, saw {jira.max_in_flight}"
+        assert all(len(call['body']['issueUpdates']) <= 25 for call in jira.bulk_create_calls())
+        print(f"✓ 120 issues in batches of 25 after a 429 and a lost response ({len(jira.bulk_create_calls())} calls)")
+
+        again = jira_push.push_issues(client, issues, already_created=result['created'])
+        assert not again['created'] and len(again['skipped']) == 120
+        print("✓ Issues already created are skipped")
+
+        bad = jira_push.build_issues('## One\n\n## Two\n', 'bad', 'CART')
+        bad[1][1]['fields']['project'] = {'key': 'NOPE'}
+        result = jira_push.push_issues(client, bad)
+        assert len(result['created']) == 1 and 'project' in result['failed'][0]['error']
+        print("✓ Rejected issues are reported without failing the batch")
+
+        slow = jira_push.build_issues('## Slow\n', 'slow', 'CART')
+        jira.fail_next(1, status=429, retry_after=3600)
+        result = jira_push.push_issues(client, slow, max_retry_after=5)
+        assert not result['created'] and 'retry after 3600s' in result['failed'][0]['error']
+        jira.fail_next(1, status=503)
+        result = jira_push.push_issues(client, slow, timeout=0.2)
+        assert not result['created'] and 'timed out' in result['failed'][0]['error']
+        jira.delay = 1.0
+        started = time.monotonic()
+        result = jira_push.push_issues(client, jira_push.build_issues('## Stuck\n', 'stuck', 'CART'), timeout=0.3)
+        jira.delay = 0.05
+        assert time.monotonic() - started < 0.8 and 'timed out' in result['failed'][0]['error']
+        assert jira_push.JiraClient('http://jira.invalid').timeout <= jira_push.PUSH_TIMEOUT
+        print("✓ Long Retry-After waits and slow pushes fail instead of holding the request")
+
+        short = jira_push.build_issues('## Short One\n\n## Short Two\n', 'short', 'CART')
+        _, body, _ = jira.bulk_create({'issueUpdates': [short[0][1]]})
+        lookups = []
+
+        class ShortClient:
+            def bulk_create(self, updates, deadline=None):
+                return {'issues': [{'key': 'CART-999'}], 'errors': []}
+
+            def find_by_labels(self, labels, deadline=None):
+                lookups.append(labels)
+                return client.find_by_labels(labels, deadline)
+
+        created_keys, failed = jira_push.push_batch(ShortClient(), short)
+        assert lookups and list(created_keys) == [short[0][0]], created_keys
+        assert created_keys[short[0][0]] == body['issues'][0]['key']
+        assert [item['key'] for item in failed] == [short[1][0]] and 'issues for 2' in failed[0]['error']
+        print("✓ A reply with fewer issues than elements is matched by label, the rest reported as failed")
+    finally:
+        jira.stop()
+
+
+def test_push_api():
+    """Test /api/v1/items/<id>/jira storing idempotency keys on the export."""
+    from fake_jira import FakeJira
+    from web_app import app, db, Export, ExportRevision, User, get_jira_issues, save_new_chat_export
+
+    print("Testing /api/v1/items/<id>/jira...")
+    jira = FakeJira().start()
+    with app.app_context():
+        user_id = User.query.filter_by(username='demo-dev').first().id
+        export_id = save_new_chat_export(user_id, 'https://github.com/example/jira-push-test', 'Developer', OUTLINE).id
+
+    try:
+        with app.test_client() as client, mock.patch.dict(os.environ, {'JIRA_URL': jira.url, 'JIRA_PROJECT_KEY': 'CART'}):
+            with client.session_transaction() as sess:
+                sess['user_id'] = user_id
+                sess['username'] = 'demo-dev'
+
+            preview = client.post(f'/api/v1/items/{export_id}/jira', json={'dry_run': True}).get_json()
+            assert len(preview['issues']) == 3 and not jira.issues
+
+            data = client.post(f'/api/v1/items/{export_id}/jira', json={}).get_json()
+            assert len(data['created']) == 3 and not data['failed']
+            data = client.post(f'/api/v1/items/{export_id}/jira', json={}).get_json()
+            assert not data['created'] and len(data['skipped']) == 3 and len(jira.issues) == 3
+
+            with app.app_context():
+                assert sorted(get_jira_issues(Export.query.get(export_id)).values()) == sorted(jira.issues)
+
+            with mock.patch.dict(os.environ, {'JIRA_PROJECT_KEY': ''}):
+                assert client.post(f'/api/v1/items/{export_id}/jira', json={}).status_code == 503
+            assert client.post('/api/v1/items/0/jira', json={}).status_code == 404
+        print("✓ Pushing twice creates each issue once")
+    finally:
+        jira.stop()
+        with app.app_context():
+            export = Export.query.get(export_id)
+            Path(export.file_path).unlink(missing_ok=True)
+            ExportRevision.query.filter_by(export_id=export_id).delete()
+            db.session.execute(db.text('DELETE FROM exports_fts WHERE rowid = :id'), {'id': export_id})
+            db.session.delete(export)
+            db.session.commit()
+
+
+if __name__ == '__main__':
+    test_build_issues()
+    test_push_batches_and_retries()
+    test_push_api()
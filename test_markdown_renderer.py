@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Markdown Rendering Tests for Better Jira Generator
+Tests sanitized rendering, the content-hash cache and ETag revalidation.
+"""
+
+import hashlib
+import sys
+import tempfile
+from pathlib import Path
+from unittest import mock
+
+# Add the project root to Python path
+sys.path.insert(0, str(Path(__file__).parent))
+
+
+def test_render_markdown_is_sanitized():
+    """Test that scripts, event handlers and javascript: links are stripped."""
+    from markdown_renderer import render_markdown
+
+    print("Testing markdown sanitization...")
+
+    html = render_markdown('# Title\n\n<script>alert(1)</script>\n\n[x](javascript:alert(1)) <b onclick="x()">ok</b>')
+    assert '<h1>Title</h1>' in html
+    assert '<script' not in html and 'onclick' not in html and 'javascript:' not in html
+    print("✓ Unsafe markup is removed")
+
+
+def test_render_cache_reuses_and_invalidates():
+    """Test that repeat views skip rendering and rewrites are picked up."""
+    import markdown_renderer
+    from markdown_renderer import RenderCache
+
+    print("Testing render cache...")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        file_path = str(Path(tmp_dir) / 'doc.md')
+        Path(file_path).write_text('# First\n')
+        cache = RenderCache(Path(tmp_dir) / 'cache', max_entries=2)
+
+        first_hash, html = cache.get(file_path)
+        assert '<h1>First</h1>' in html
+        assert (Path(tmp_dir) / 'cache' / f'{first_hash}.html').exists(), "Rendering should be stored on disk"
+
+        with mock.patch.object(markdown_renderer, 'render_markdown') as render:
+            assert cache.get(file_path) == (first_hash, html)
+            assert RenderCache(Path(tmp_dir) / 'cache').get(file_path) == (first_hash, html)
+            render.assert_not_called()
+        print("✓ Repeat views are served from memory or disk")
+
+        cache.invalidate(file_path)
+        Path(file_path).write_text('# Second\n')
+        second_hash, html = cache.get(file_path)
+        assert second_hash != first_hash and '<h1>Second</h1>' in html
+        assert not (Path(tmp_dir) / 'cache' / f'{first_hash}.html').exists(), "Stale rendering should be removed"
+        print("✓ Invalidation drops the stale rendering")
+
+        # The file is rewritten right after it is hashed, as update_export or a PATCH might
+        real_sha256 = hashlib.sha256
+
+        def sha256_then_rewrite(data):
+            Path(file_path).write_text('# Third\n')
+            return real_sha256(data)
+
+        cache.invalidate(file_path)
+        with mock.patch.object(markdown_renderer.hashlib, 'sha256', sha256_then_rewrite):
+            raced_hash, html = cache.get(file_path)
+        assert raced_hash == real_sha256(b'# Second\n').hexdigest() and '<h1>Second</h1>' in html
+        third_hash, html = cache.get(file_path)
+        assert third_hash != raced_hash and '<h1>Third</h1>' in html
+        print("✓ HTML is always rendered from the bytes that were hashed")
+
+
+def test_rendered_route_etag():
+    """Test that the rendered view answers If-None-Match with 304."""
+    from web_app import app, db, Export, User
+
+    print("Testing rendered view ETags...")
+
+    with tempfile.TemporaryDirectory() as tmp_dir, app.app_context():
+        user = User.query.filter_by(username='demo-dev').first()
+        assert user is not None, "demo-dev user should exist"
+
+        file_path = Path(tmp_dir) / 'etag_test.md'
+        file_path.write_text('## Acceptance Criteria\n\n- works\n')
+        export = Export(filename='etag_test.md', file_path=str(file_path), user_id=user.id)
+        db.session.add(export)
+        db.session.commit()
+
+        try:
+            with app.test_client() as client:
+                with client.session_transaction() as sess:
+                    sess['user_id'] = user.id
+                    sess['username'] = user.username
+
+                response = client.get(f'/history/rendered/{export.id}')
+                assert response.status_code == 200
+                assert b'<h2>Acceptance Criteria</h2>' in response.data
+                etag = response.headers['ETag']
+
+                response = client.get(f'/history/rendered/{export.id}', headers={'If-None-Match': etag})
+                assert response.status_code == 304, f"Expected 304, got {response.status_code}"
+                print("✓ Unchanged documents revalidate with 304")
+
+                document = ''.join(f'## Ticket {i}\n\n```\ncode {i}\n\n## not a heading\n```\n\n' for i in range(30))
+                file_path.write_text(document)
+                pages, offset = [], 0
+                with mock.patch('web_app.EXPORT_PAGE_SIZE', 200):
+                    while offset is not None:
+                        response = client.get(f'/history/rendered/{export.id}?offset={offset}')
+                        assert response.status_code == 200 and b'<h2>Ticket' in response.data[:20], response.data[:40]
+                        pages.append(response)
+                        offset = response.headers.get('X-Next-Offset')
+                    assert len(pages) > 5 and sum(page.data.count(b'<h2>') for page in pages) == 30
+                    assert all(page.data.count(b'## not a heading') == page.data.count(b'<h2>') for page in pages), \
+                        "Code blocks are never split from their section"
+                    assert len({page.headers['ETag'] for page in pages}) == len(pages)
+                    again = client.get(f'/history/rendered/{export.id}?offset={pages[1].headers["X-Next-Offset"]}',
+                                       headers={'If-None-Match': pages[2].headers['ETag']})
+                    assert again.status_code == 304
+            print(f"✓ Large documents are rendered page by page ({len(pages)} pages) with an ETag each")
+        finally:
+            db.session.delete(export)
+            db.session.commit()
+
+
+if __name__ == '__main__':
+    test_render_markdown_is_sanitized()
+    test_render_cache_reuses_and_invalidates()
+    test_rendered_route_etag()
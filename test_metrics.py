@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""
+Metrics Tests for Better Jira Generator
+Tests the /metrics endpoint and the LLM call hook.
+"""
+
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+from unittest import mock
+
+# Add the project root to Python path
+sys.path.insert(0, str(Path(__file__).parent))
+
+
+def test_metrics_endpoint():
+    """Test that route, database and LLM metrics are exported."""
+    from web_app import app
+    from main import create_chat_completion
+
+    print("Testing /metrics...")
+
+    client = mock.Mock()
+    client.chat.completions.create.return_value = SimpleNamespace(
+        usage=SimpleNamespace(prompt_tokens=12, completion_tokens=34, queue_time=0.01),
+        choices=[SimpleNamespace(message=SimpleNamespace(content='ok'))],
+    )
+    create_chat_completion(client, [{'role': 'user', 'content': 'hi'}], model='test-model')
+
+    with app.test_client() as test_client:
+        test_client.get('/login')
+        response = test_client.get('/metrics')
+
+    assert response.status_code == 200, f"Expected 200, got {response.status_code}"
+    body = response.get_data(as_text=True)
+    assert 'http_requests_total{endpoint="login",method="GET",status="200"}' in body
+    assert 'db_queries_total' in body
+    assert 'llm_requests_total{model="test-model",outcome="success"}' in body
+    assert 'llm_tokens_total{direction="out",model="test-model"}' in body
+    print("✓ Route, database and LLM metrics are exported")
+
+
+if __name__ == '__main__':
+    test_metrics_endpoint()
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Profiling Tests for Better Jira Generator
+Tests the opt-in request profiling hooks.
+"""
+
+import os
+import sys
+import tempfile
+from pathlib import Path
+from unittest import mock
+
+from flask import Flask
+
+# Add the project root to Python path
+sys.path.insert(0, str(Path(__file__).parent))
+
+
+def make_app():
+    app = Flask(__name__)
+    app.secret_key = 'test-secret'
+
+    @app.route('/slow')
+    def slow():
+        return str(sum(range(10000)))
+
+    return app
+
+
+def test_profiling_disabled_installs_nothing():
+    """Test that a disabled profiler adds no request hooks."""
+    import profiling
+
+    with mock.patch.dict(os.environ, {'PROFILING_ENABLED': ''}):
+        app = make_app()
+        profiling.init_app(app)
+        assert not app.before_request_funcs and not app.teardown_request_funcs
+    print("✓ Disabled profiling installs no hooks")
+
+
+def test_signed_header_captures_profile():
+    """Test that only requests with a valid token are profiled, within PROFILE_MAX_FILES."""
+    import profiling
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        env = {'PROFILING_ENABLED': '1', 'PROFILE_DIR': tmp_dir, 'PROFILE_MAX_FILES': '2'}
+        with mock.patch.dict(os.environ, env):
+            app = make_app()
+            profiling.init_app(app)
+            token = profiling.create_profile_token(app, 'admin')
+
+            with app.test_client() as client:
+                client.get('/slow')
+                client.get('/slow', headers={profiling.PROFILE_HEADER: 'forged'})
+                assert profiling.list_profiles() == [], "Unsigned requests must not be profiled"
+
+                for _ in range(3):
+                    client.get('/slow', headers={profiling.PROFILE_HEADER: token})
+
+            profiles = profiling.list_profiles()
+            assert len(profiles) == 2, f"Expected 2 profiles after pruning, got {len(profiles)}"
+            assert profiling.profile_path(profiles[0]['name'], '.txt') is not None
+            assert profiling.profile_path('../secret', '.txt') is None
+    print("✓ Signed requests are profiled and the directory stays bounded")
+
+
+if __name__ == '__main__':
+    test_profiling_disabled_installs_nothing()
+    test_signed_header_captures_profile()
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Purge Tests for Better Jira Generator
+Tests archiving and deleting soft-deleted exports past the retention window.
+"""
+
+import gzip
+import sys
+import tempfile
+from datetime import datetime
+from pathlib import Path
+
+# Add the project root to Python path
+sys.path.insert(0, str(Path(__file__).parent))
+
+REPO = 'https://github.com/example/purge-test'
+
+
+def days_since(date):
+    """Retention window that makes `date` the purge cutoff."""
+    return (datetime.utcnow() - date).total_seconds() / 86400
+
+
+def test_purge_archives_then_deletes():
+    """Test that old soft-deleted exports are archived or deleted along with their files and revisions."""
+    from purge import purge_deleted_exports, reclaimed_bytes
+    from web_app import app, db, ArchivedExport, Export, ExportRevision, LLMCall, User
+
+    print("Testing the purge job...")
+    with tempfile.TemporaryDirectory() as tmp_dir, app.app_context():
+        user_id = User.query.filter_by(username='demo-dev').first().id
+        content = '## Acceptance Criteria\n\n' + '- old requirement\n' * 200
+        exports = {}
+        for name, deleted_at in (('archived', datetime(1999, 1, 1)), ('deleted', datetime(1999, 6, 1)), ('kept', None)):
+            file_path = Path(tmp_dir) / f'purge_{name}.md'
+            file_path.write_text(content)
+            exports[name] = Export(
+                filename=file_path.name, file_path=str(file_path), user_id=user_id, repository=REPO,
+                is_deleted=deleted_at is not None, deleted_at=deleted_at,
+            )
+            db.session.add(exports[name])
+        db.session.commit()
+        ids = {name: export.id for name, export in exports.items()}
+        exports['kept'].linked_export_id = ids['archived']
+        db.session.add(ExportRevision(export_id=ids['archived'], number=1, data=b'x' * 500, content_hash='0' * 64, size=500))
+        db.session.add(LLMCall(user_id=user_id, export_id=ids['archived'], repository=REPO, model='test', latency=1.0, outcome='success'))
+        db.session.commit()
+        archive_dir = Path(tmp_dir) / 'archive'
+
+        try:
+            preview = purge_deleted_exports(days=days_since(datetime(1999, 3, 1)), dry_run=True)
+            assert preview['exports'] == 1 and preview['revisions'] == 1 and preview['revision_bytes'] == 500
+            assert Export.query.get(ids['archived']) is not None
+            print("✓ A dry run reports without changing anything")
+
+            report = purge_deleted_exports(days=days_since(datetime(1999, 3, 1)), mode='archive', archive_dir=archive_dir)
+            db.session.expire_all()
+            assert report['exports'] == 1 and report['files'] == 1 and report['revisions'] == 1
+            assert Export.query.get(ids['archived']) is None and Export.query.get(ids['deleted']) is not None
+            archived = ArchivedExport.query.filter_by(export_id=ids['archived']).one()
+            assert archived.file_size == len(content) and not Path(archived.file_path).exists()
+            assert gzip.decompress(Path(archived.archive_path).read_bytes()).decode() == content
+            assert ExportRevision.query.filter_by(export_id=ids['archived']).count() == 0
+            assert LLMCall.query.filter_by(repository=REPO).one().export_id is None
+            assert Export.query.get(ids['kept']).linked_export_id is None
+            assert report['archive_bytes'] < report['file_bytes'] and reclaimed_bytes(report) > 0
+            print(f"✓ Archived 1 export: {report['file_bytes']} byte file kept as a {report['archive_bytes']} byte archive")
+
+            report = purge_deleted_exports(days=days_since(datetime(1999, 12, 1)), mode='delete', run_vacuum=False)
+            db.session.expire_all()
+            assert report['exports'] == 1 and report['files'] == 1
+            assert Export.query.get(ids['deleted']) is None
+            assert ArchivedExport.query.filter_by(export_id=ids['deleted']).count() == 0
+            assert not Path(tmp_dir, 'purge_deleted.md').exists()
+            assert Export.query.get(ids['kept']) is not None and Path(tmp_dir, 'purge_kept.md').exists()
+            print("✓ Delete mode removes the row and file; live exports are untouched")
+        finally:
+            db.session.rollback()
+            ArchivedExport.query.filter(ArchivedExport.export_id.in_(ids.values())).delete(synchronize_session=False)
+            LLMCall.query.filter_by(repository=REPO).delete()
+            ExportRevision.query.filter(ExportRevision.export_id.in_(ids.values())).delete(synchronize_session=False)
+            Export.query.filter(Export.id.in_(ids.values())).delete(synchronize_session=False)
+            db.session.commit()
+
+
+def test_purge_shared_file_once():
+    """Test that exports in one batch sharing a file count, archive and remove it once."""
+    from purge import purge_deleted_exports
+    from web_app import app, db, ArchivedExport, Export, User
+
+    print("Testing a batch with a shared file...")
+    with tempfile.TemporaryDirectory() as tmp_dir, app.app_context():
+        user_id = User.query.filter_by(username='demo-dev').first().id
+        file_path = Path(tmp_dir) / 'purge_shared.md'
+        file_path.write_text('## Shared\n')
+        exports = [
+            Export(filename=file_path.name, file_path=str(file_path), user_id=user_id, repository=REPO,
+                   is_deleted=True, deleted_at=datetime(1998, 1, 1))
+            for _ in range(2)
+        ]
+        db.session.add_all(exports)
+        db.session.commit()
+        ids = [export.id for export in exports]
+
+        try:
+            report = purge_deleted_exports(
+                days=days_since(datetime(1998, 6, 1)), archive_dir=Path(tmp_dir) / 'archive', run_vacuum=False,
+            )
+            assert report['exports'] == 2 and report['files'] == 1 and report['file_bytes'] == len('## Shared\n')
+            assert not report['failed_files'] and not file_path.exists()
+            archives = {row.archive_path for row in ArchivedExport.query.filter(ArchivedExport.export_id.in_(ids))}
+            assert len(archives) == 1 and len(list(Path(tmp_dir, 'archive').iterdir())) == 1
+            print("✓ A file shared within a batch is counted, archived and removed once")
+        finally:
+            db.session.rollback()
+            ArchivedExport.query.filter(ArchivedExport.export_id.in_(ids)).delete(synchronize_session=False)
+            Export.query.filter(Export.id.in_(ids)).delete(synchronize_session=False)
+            db.session.commit()
+
+
+if __name__ == '__main__':
+    test_purge_archives_then_deletes()
+    test_purge_shared_file_once()
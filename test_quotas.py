@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Quota Tests for Better Jira Generator
+Tests per-user request and token buckets, 429 responses and the quota API.
+"""
+
+import asyncio
+import os
+import sys
+import threading
+from datetime import datetime
+from pathlib import Path
+from unittest import mock
+
+# Add the project root to Python path
+sys.path.insert(0, str(Path(__file__).parent))
+
+REPO = 'https://github.com/example/quota-test'
+
+
+def demo_user_id():
+    from web_app import app, User
+
+    with app.app_context():
+        return User.query.filter_by(username='demo-dev').first().id
+
+
+def reset_quota(user_id):
+    from web_app import app, db, LLMCall, QuotaBucket
+
+    with app.app_context():
+        QuotaBucket.query.filter_by(user_id=user_id).delete()
+        LLMCall.query.filter_by(repository=REPO).delete()
+        db.session.commit()
+
+
+def test_request_bucket_is_shared():
+    """Test that concurrent takes never spend more than the limit, and the bucket refills."""
+    import quotas
+    import web_app
+    from web_app import app, enforce_llm_quota
+
+    print("Testing the request bucket...")
+    user_id = demo_user_id()
+    reset_quota(user_id)
+    allowed, refused = [], []
+
+    def worker():
+        with app.app_context():
+            for _ in range(3):
+                try:
+                    enforce_llm_quota(user_id)
+                    allowed.append(1)
+                except quotas.QuotaExceeded as e:
+                    refused.append(e)
+
+    try:
+        with mock.patch.dict(os.environ, {'QUOTA_REQUESTS': '5', 'QUOTA_WINDOW_SECONDS': '3600'}):
+            threads = [threading.Thread(target=worker) for _ in range(6)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            assert len(allowed) == 5 and len(refused) == 13, f"{len(allowed)} allowed"
+            assert refused[0].kind == 'requests' and 0 < refused[0].retry_after <= 720
+            print("✓ 18 concurrent requests against a limit of 5: 5 allowed")
+
+            now = web_app.time.time()
+            with mock.patch.object(web_app.time, 'time', lambda: now + 720), app.app_context():
+                enforce_llm_quota(user_id)
+                try:
+                    enforce_llm_quota(user_id)
+                    assert False, "Only one request refills in 720s"
+                except quotas.QuotaExceeded:
+                    pass
+            print("✓ The bucket refills at limit / window")
+    finally:
+        reset_quota(user_id)
+
+
+def test_tokens_charged_from_usage():
+    """Test that recorded LLM usage drains the token bucket."""
+    import quotas
+    from web_app import app, enforce_llm_quota, quota_status, write_llm_calls
+
+    print("Testing the token bucket...")
+    user_id = demo_user_id()
+    reset_quota(user_id)
+    try:
+        with mock.patch.dict(os.environ, {'QUOTA_TOKENS': '1000', 'QUOTA_WINDOW_SECONDS': '60'}):
+            write_llm_calls([{
+                'user_id': user_id, 'repository': REPO, 'model': 'test', 'prompt_tokens': 700,
+                'completion_tokens': 500, 'latency': 1.0, 'outcome': 'success', 'created_at': datetime.utcnow(),
+            }])
+            with app.app_context():
+                status = quota_status(user_id)
+                assert status['tokens']['remaining'] <= -199 and status['requests'] == {'limit': None}
+                assert 12 <= status['tokens']['retry_after'] <= 13
+                try:
+                    enforce_llm_quota(user_id)
+                    assert False, "A user in token debt must wait"
+                except quotas.QuotaExceeded as e:
+                    assert e.kind == 'tokens'
+        print("✓ Calls are refused until the token debt refills")
+    finally:
+        reset_quota(user_id)
+
+
+def test_429_responses():
+    """Test 429 + Retry-After from the Flask and ASGI routes and the quota API."""
+    import asgi
+    from test_asgi import call
+    from web_app import app
+
+    print("Testing 429 responses...")
+    user_id = demo_user_id()
+    reset_quota(user_id)
+    form = {'repo_url': REPO, 'project_description': 'Saved carts', 'user_type': 'Developer'}
+    try:
+        with mock.patch.dict(os.environ, {'QUOTA_REQUESTS': '1'}), app.test_client() as client:
+            with client.session_transaction() as sess:
+                sess['user_id'] = user_id
+                sess['username'] = 'demo-dev'
+
+            quota = client.get('/api/v1/quota').get_json()
+            assert quota['requests'] == {'limit': 1, 'remaining': 1, 'retry_after': 0, 'full_in': 0}
+
+            with mock.patch('main.get_groq_client', side_effect=RuntimeError('no client')):
+                assert client.post('/new_chat', data=form).status_code == 302
+            response = client.post('/new_chat', data=form)
+            assert response.status_code == 429 and int(response.headers['Retry-After']) > 3000
+            assert b'Quota Reached' in response.data
+            assert client.get('/api/v1/quota').get_json()['requests']['remaining'] == 0
+            print("✓ Flask routes answer 429 with Retry-After once the quota is used")
+
+            cookie = 'session=' + asgi._serializer().dumps({'user_id': user_id, 'username': 'demo-dev'})
+            body = f'repo_url={REPO}&project_description=Saved+carts&user_type=Developer'.encode()
+            status, headers = asyncio.run(call(asgi.app, 'POST', '/new_chat', body, cookie))
+            assert status == 429 and int(headers['retry-after']) > 3000
+            print("✓ The ASGI routes share the same quota")
+    finally:
+        reset_quota(user_id)
+
+
+if __name__ == '__main__':
+    test_request_bucket_is_shared()
+    test_tokens_charged_from_usage()
+    test_429_responses()
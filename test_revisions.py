@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Revision Tests for Better Jira Generator
+Tests delta encoding and the export revision APIs.
+"""
+
+import hashlib
+import sys
+import tempfile
+from datetime import datetime
+from pathlib import Path
+from unittest import mock
+
+# Add the project root to Python path
+sys.path.insert(0, str(Path(__file__).parent))
+
+
+def test_delta_round_trip():
+    """Test that deltas rebuild the new text exactly."""
+    from revisions import make_delta, apply_delta, pack_delta, unpack_delta
+
+    print("Testing revision deltas...")
+
+    old = '# Title\n\nline a\nline b\nline c'
+    new = '# Title\n\nline a\nline B\nline c\nline d\n'
+    ops = unpack_delta(pack_delta(make_delta(old, new)))
+    assert apply_delta(old, ops) == new
+    assert apply_delta(new, make_delta(new, '')) == ''
+    print("✓ Deltas round-trip, including deletions and missing final newlines")
+
+
+def test_revision_history_api():
+    """Test recording, rebuilding, diffing and restoring revisions."""
+    import web_app
+    from web_app import app, db, Export, ExportRevision, User, record_revision, get_revision_content
+
+    print("Testing revision history...")
+
+    with tempfile.TemporaryDirectory() as tmp_dir, app.app_context():
+        user = User.query.filter_by(username='demo-dev').first()
+        assert user is not None, "demo-dev user should exist"
+
+        file_path = Path(tmp_dir) / 'revision_test.md'
+        versions = [f'# Ticket\n\n' + ''.join(f'- criterion {i}\n' for i in range(n + 1)) for n in range(7)]
+        file_path.write_text(versions[-1])
+        export = Export(filename='revision_test.md', file_path=str(file_path), user_id=user.id)
+        db.session.add(export)
+        db.session.commit()
+
+        try:
+            with mock.patch.object(web_app, 'REVISION_SNAPSHOT_INTERVAL', 3):
+                for version in versions:
+                    record_revision(export, version)
+
+            stored = ExportRevision.query.filter_by(export_id=export.id).order_by(ExportRevision.number).all()
+            assert [revision.is_snapshot for revision in stored] == [True, False, False, True, False, False, True]
+            for number, version in enumerate(versions, 1):
+                assert get_revision_content(export.id, number) == version
+            print("✓ Every revision rebuilds from the nearest snapshot")
+
+            with app.test_client() as client:
+                with client.session_transaction() as sess:
+                    sess['user_id'] = user.id
+                    sess['username'] = user.username
+
+                listing = client.get(f'/api/v1/items/{export.id}/revisions').get_json()
+                assert [row['number'] for row in listing['revisions']] == list(range(7, 0, -1))
+
+                diff = client.get(f'/api/v1/items/{export.id}/revisions/2/diff').get_json()['diff']
+                assert '+- criterion 1' in diff
+
+                response = client.post(f'/api/v1/items/{export.id}/revisions/1/restore')
+                assert response.status_code == 200, f"Expected 200, got {response.status_code}"
+                assert response.get_json()['revision']['number'] == 8
+                assert file_path.read_text() == versions[0]
+            print("✓ Revisions can be listed, diffed and restored")
+
+            # Another worker stores revision 9 between this one reading the latest and committing
+            racing, ours = '# Ticket\n\n- edited elsewhere\n', versions[0] + '- criterion x\n'
+            pack_delta = web_app.revisions.pack_delta
+
+            def pack_delta_after_race(delta):
+                if not ExportRevision.query.filter_by(export_id=export.id, number=9).first():
+                    with db.engine.begin() as connection:
+                        connection.execute(ExportRevision.__table__.insert().values(
+                            export_id=export.id, number=9, is_snapshot=True,
+                            data=web_app.revisions.pack_snapshot(racing),
+                            content_hash=hashlib.sha256(racing.encode('utf-8')).hexdigest(),
+                            size=len(racing), message='Other worker', created_at=datetime.utcnow(),
+                        ))
+                return pack_delta(delta)
+
+            with mock.patch.object(web_app.revisions, 'pack_delta', pack_delta_after_race):
+                revision = record_revision(export, ours, previous_content=versions[0])
+            assert revision.number == 10
+            assert get_revision_content(export.id, 9) == racing and get_revision_content(export.id, 10) == ours
+            print("✓ A revision number taken by another writer is retried as the next one")
+        finally:
+            ExportRevision.query.filter_by(export_id=export.id).delete()
+            db.session.execute(db.text('DELETE FROM exports_fts WHERE rowid = :id'), {'id': export.id})
+            db.session.delete(export)
+            db.session.commit()
+
+
+if __name__ == '__main__':
+    test_delta_round_trip()
+    test_revision_history_api()
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Saved Session Tests for Better Jira Generator
+Tests saved sessions as database rows: import from saved_session.json, cursor pages and resume by id.
+"""
+
+import json
+import sys
+import tempfile
+from datetime import datetime, timedelta
+from pathlib import Path
+from unittest import mock
+
+# Add the project root to Python path
+sys.path.insert(0, str(Path(__file__).parent))
+
+USERNAME = 'saved-sessions-test'
+REPO = 'https://github.com/example/saved-session-test'
+
+
+def create_test_user():
+    from web_app import db, User
+
+    user = User(username=USERNAME, password_hash='x', salt='x')
+    db.session.add(user)
+    db.session.commit()
+    return user.id
+
+
+def delete_test_user(user_id):
+    from web_app import db, Export, SavedSession, User
+
+    SavedSession.query.filter_by(user_id=user_id).delete()
+    Export.query.filter_by(user_id=user_id).delete()
+    User.query.filter_by(id=user_id).delete()
+    db.session.commit()
+
+
+def test_import_and_pages():
+    """Test that saved_session.json is imported once and pages follow the cursor."""
+    import cli_store
+    import web_app
+    from web_app import app, db, SavedSession, get_saved_sessions_page, record_saved_session
+
+    print("Testing saved session import and pages...")
+    with app.app_context():
+        user_id = create_test_user()
+        try:
+            with tempfile.TemporaryDirectory() as tmp_dir:
+                path = Path(tmp_dir) / 'saved_session.json'
+                entry = {'role': 'developer', 'repository': REPO, 'file_info': {'name': 'spec.md', 'path': 'spec.md'},
+                         'timestamp': '2026-01-02T03:04:05'}
+                path.write_text(json.dumps({**entry, 'type': 'saved_session', 'sessions': [entry]}))
+                with mock.patch.object(web_app, 'SAVED_SESSION_PATH', path), \
+                        mock.patch.object(cli_store, 'cli_username', return_value=USERNAME):
+                    web_app.migrate_saved_sessions()
+                    web_app.migrate_saved_sessions()
+            imported = SavedSession.query.filter_by(user_id=user_id).all()
+            assert len(imported) == 1 and imported[0].to_dict()['file_info']['name'] == 'spec.md'
+            print("✓ saved_session.json entries are imported once")
+
+            start = datetime(2026, 2, 1)
+            for i in range(24):
+                saved = record_saved_session(user_id, 'product_manager', f'{REPO}-{i}')
+                saved.last_used_at = start + timedelta(minutes=i // 2)  # pairs share a timestamp
+            db.session.commit()
+
+            seen, before = [], None
+            while True:
+                rows, before = get_saved_sessions_page(user_id, before, limit=10)
+                seen.append([row.id for row in rows])
+                if before is None:
+                    break
+            ids = [session_id for page in seen for session_id in page]
+            expected = [row.id for row in SavedSession.query.filter_by(user_id=user_id).order_by(
+                SavedSession.last_used_at.desc(), SavedSession.id.desc())]
+            assert [len(page) for page in seen] == [10, 10, 5] and ids == expected
+            print("✓ Cursor pages cover every session once, most recently used first")
+
+            if db.engine.dialect.name == 'sqlite':
+                statement = SavedSession.query.filter(SavedSession.user_id == user_id).order_by(
+                    SavedSession.last_used_at.desc(), SavedSession.id.desc()).limit(10).statement
+                compiled = statement.compile(db.engine, compile_kwargs={'literal_binds': True})
+                plan = ' '.join(str(row[-1]) for row in db.session.execute(db.text(f'EXPLAIN QUERY PLAN {compiled}')))
+                assert 'ix_saved_sessions_user_last_used' in plan and 'TEMP B-TREE' not in plan, plan
+                print("✓ A page is an index range scan with no sort")
+        finally:
+            delete_test_user(user_id)
+
+
+def test_resume_by_id():
+    """Test listing, resuming by id and starting a new chat from the sessions page."""
+    from web_app import app, Export, SavedSession, User, record_saved_session
+
+    print("Testing resume by id...")
+    with app.app_context():
+        user_id = create_test_user()
+        older = record_saved_session(user_id, 'developer', f'{REPO}-older', {'filename': 'older.md'}, '2026-01-01T00:00:00')
+        newer = record_saved_session(user_id, 'product_manager', f'{REPO}-newer', None, '2026-01-02T00:00:00')
+        older_id, newer_id = older.id, newer.id
+        demo = User.query.filter_by(username='demo-dev').first()
+        foreign_id = record_saved_session(demo.id, 'developer', f'{REPO}-foreign').id
+
+    try:
+        with app.test_client() as client:
+            with client.session_transaction() as sess:
+                sess['user_id'] = user_id
+                sess['username'] = USERNAME
+
+            page = client.get('/saved_sessions').get_data(as_text=True)
+            assert page.index(f'value="{newer_id}"') < page.index(f'value="{older_id}"')
+            assert 'older.md' in page and 'Older sessions' not in page
+
+            response = client.post('/saved_sessions', data={'selection': str(older_id)})
+            assert response.status_code == 302 and response.headers['Location'].endswith('/chat')
+            chat = client.get('/chat').get_data(as_text=True)
+            assert f'{REPO}-older' in chat and 'Resuming a saved chat session' in chat
+            page = client.get('/saved_sessions').get_data(as_text=True)
+            assert page.index(f'value="{older_id}"') < page.index(f'value="{newer_id}"')
+            print("✓ Resuming by id opens that session and moves it to the top")
+
+            client.post('/saved_sessions', data={'selection': str(foreign_id)})
+            with client.session_transaction() as sess:
+                assert sess['saved_session_id'] == older_id
+                assert any('Invalid session selection' in message for _, message in sess.get('_flashes', []))
+            assert client.post('/saved_sessions', data={'selection': 'x'}).headers['Location'].endswith('/saved_sessions')
+            print("✓ Other users' sessions and bad ids are refused")
+
+            client.post('/saved_sessions', data={'selection': 'new_chat'})
+            assert 'Starting a new chat session' in client.get('/chat').get_data(as_text=True)
+            with app.app_context():
+                actions = sorted(export.action for export in Export.query.filter_by(user_id=user_id))
+            assert actions == ['new_chat', 'resume_saved_session']
+            print("✓ New chats no longer carry a saved session")
+    finally:
+        with app.app_context():
+            SavedSession.query.filter_by(id=foreign_id).delete()
+            delete_test_user(user_id)
+
+
+if __name__ == '__main__':
+    test_import_and_pages()
+    test_resume_by_id()
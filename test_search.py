@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Search Tests for Better Jira Generator
+Tests the FTS5 export index and the /api/v1/search endpoint.
+"""
+
+import sys
+import tempfile
+from pathlib import Path
+
+# Add the project root to Python path
+sys.path.insert(0, str(Path(__file__).parent))
+
+
+def test_search_exports():
+    """Test indexing, ranked search and snippet highlighting."""
+    from web_app import (
+        app, db, Export, User, index_export_content, search_exports,
+        search_index_enabled, build_search_query, highlight_snippet,
+    )
+
+    print("Testing export search...")
+
+    assert build_search_query('login "flow"') == '"login"* "flow"*'
+    assert build_search_query('  ') == ''
+    assert highlight_snippet('<b>\x02hit\x03</b>') == '&lt;b&gt;<mark>hit</mark>&lt;/b&gt;'
+    print("✓ Query building and snippet escaping work")
+
+    with tempfile.TemporaryDirectory() as tmp_dir, app.app_context():
+        if not search_index_enabled():
+            print("⚠ Database is not SQLite, skipping FTS5 tests")
+            return
+
+        user = User.query.filter_by(username='demo-dev').first()
+        assert user is not None, "demo-dev user should exist"
+
+        file_path = Path(tmp_dir) / 'search_test.md'
+        file_path.write_text('# Checkout\n\nThe zanzibarwidget must support refunds.\n')
+        export = Export(
+            filename='search_test.md',
+            original_name='Search test export',
+            repository='https://github.com/example/zanzibar',
+            file_path=str(file_path),
+            user_id=user.id,
+        )
+        db.session.add(export)
+        db.session.commit()
+
+        try:
+            index_export_content(export)
+
+            results = search_exports(user.id, 'zanzibarwidget refund')
+            assert [item.id for item, _, _ in results] == [export.id], "Indexed export should be found"
+            assert '<mark>' in results[0][1], "Snippet should highlight the match"
+            print("✓ Indexed export is found with a highlighted snippet")
+
+            assert search_exports(user.id + 1000, 'zanzibarwidget') == [], "Other users must not see the export"
+            print("✓ Search is scoped to the export owner")
+
+            with app.test_client() as client:
+                with client.session_transaction() as sess:
+                    sess['user_id'] = user.id
+                    sess['username'] = user.username
+
+                response = client.get('/api/v1/search?q=zanzibarwidget')
+                assert response.status_code == 200, f"Expected 200, got {response.status_code}"
+                assert response.get_json()['results'][0]['id'] == export.id
+
+                response = client.get('/api/v1/search')
+                assert response.status_code == 400, f"Expected 400, got {response.status_code}"
+            print("✓ /api/v1/search returns ranked JSON results")
+        finally:
+            db.session.execute(db.text('DELETE FROM exports_fts WHERE rowid = :id'), {'id': export.id})
+            db.session.delete(export)
+            db.session.commit()
+
+    print("\nAll search tests passed! ✓")
+
+
+if __name__ == '__main__':
+    test_search_exports()
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+Section API Tests for Better Jira Generator
+Tests heading-path sections, the cached section index and PATCH with If-Match.
+"""
+
+import sys
+import tempfile
+import threading
+from pathlib import Path
+from unittest import mock
+
+# Add the project root to Python path
+sys.path.insert(0, str(Path(__file__).parent))
+
+DOCUMENT = """# Saved Carts
+
+Intro text.
+
+## Project Overview
+
+Keep carts between visits.
+
+### Acceptance Criteria
+
+- A cart survives a logout
+
+```markdown
+# Not a heading
+```
+
+### Notes
+
+First notes.
+
+## Technical Requirements
+
+- Add a carts table
+
+### Notes
+
+Second notes.
+"""
+
+
+def test_parse_sections():
+    """Test heading paths, nesting, code fences and body replacement."""
+    import sections
+
+    print("Testing section parsing...")
+    data = DOCUMENT.encode()
+    parsed = sections.parse_sections(data)
+    assert [section['path'] for section in parsed] == [
+        'saved-carts',
+        'saved-carts/project-overview',
+        'saved-carts/project-overview/acceptance-criteria',
+        'saved-carts/project-overview/notes',
+        'saved-carts/technical-requirements',
+        'saved-carts/technical-requirements/notes',
+    ]
+    criteria = sections.find_section(parsed, 'saved-carts/project-overview/acceptance-criteria')
+    body = data[criteria['body_start']:criteria['end']].decode()
+    assert '# Not a heading' in body and 'First notes' not in body
+    overview = sections.find_section(parsed, 'saved-carts/project-overview')
+    assert sections.subsections(parsed, overview) == [
+        'saved-carts/project-overview/acceptance-criteria', 'saved-carts/project-overview/notes'
+    ]
+    print("✓ Sections nest by heading level and skip fenced code")
+
+    updated = sections.replace_body(data, criteria, '\n- A cart survives a logout\n- Carts expire after 30 days')
+    assert b'- Carts expire after 30 days\n\n### Notes' in updated
+    assert updated.count(b'First notes') == 1 and updated.startswith(data[:criteria['body_start']])
+    try:
+        sections.replace_body(data, criteria, '## Sneaky new section\n')
+        assert False, "A shallower heading must be refused"
+    except sections.SectionError:
+        pass
+    print("✓ Bodies are replaced in place; shallower headings are refused")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        file_path = Path(tmp_dir) / 'doc.md'
+        file_path.write_bytes(data)
+        index = sections.SectionIndex()
+        with mock.patch.object(sections, 'parse_sections', wraps=sections.parse_sections) as parse:
+            index.get(str(file_path))
+            section, body, _ = index.read(str(file_path), 'saved-carts/technical-requirements/notes')
+            assert body == '\nSecond notes.\n' and parse.call_count == 1
+            file_path.write_bytes(data + b'\n## Risks\n\nNone.\n')
+            assert index.read(str(file_path), 'saved-carts/risks')[1] == '\nNone.\n' and parse.call_count == 2
+        print("✓ The index is reused until the file changes")
+
+
+def test_section_api():
+    """Test GET/PATCH of one section with ETags, 304, 412 and 428."""
+    import sections
+    from web_app import (
+        app, db, Export, ExportChangedError, ExportRevision, User, append_chat_turns, save_updated_export,
+    )
+
+    print("Testing the section API...")
+    with tempfile.TemporaryDirectory() as tmp_dir, app.app_context():
+        user = User.query.filter_by(username='demo-dev').first()
+        file_path = Path(tmp_dir) / 'sections_test.md'
+        file_path.write_text(DOCUMENT)
+        export = Export(filename=file_path.name, file_path=str(file_path), user_id=user.id)
+        db.session.add(export)
+        db.session.commit()
+        base = f'/api/v1/items/{export.id}/sections'
+
+        try:
+            with app.test_client() as client:
+                with client.session_transaction() as sess:
+                    sess['user_id'] = user.id
+                    sess['username'] = user.username
+
+                listing = client.get(base).get_json()['sections']
+                assert len(listing) == 6 and listing[2]['path'] == 'saved-carts/project-overview/acceptance-criteria'
+
+                path = f'{base}/saved-carts/project-overview/acceptance-criteria'
+                response = client.get(path)
+                etag = response.headers['ETag']
+                assert response.get_json()['content'].strip().startswith('- A cart survives a logout')
+                assert client.get(path, headers={'If-None-Match': etag}).status_code == 304
+                assert client.get(f'{base}/saved-carts/missing').status_code == 404
+                print("✓ GET returns one section with an ETag and revalidates with 304")
+
+                notes_etag = client.get(f'{base}/saved-carts/technical-requirements/notes').headers['ETag']
+                patch = {'content': '\n- A cart survives a logout\n- Carts expire after 30 days\n'}
+                assert client.patch(path, json=patch).status_code == 428
+                response = client.patch(path, json=patch, headers={'If-Match': etag})
+                assert response.status_code == 200, response.get_json()
+                assert response.headers['ETag'] != etag
+                assert '- Carts expire after 30 days' in file_path.read_text()
+
+                stale = client.patch(path, json={'content': 'lost update'}, headers={'If-Match': etag})
+                assert stale.status_code == 412 and stale.get_json()['etag'] == response.headers['ETag'].strip('"')
+                other = client.patch(
+                    f'{base}/saved-carts/technical-requirements/notes',
+                    json={'content': '\nUpdated notes.\n'}, headers={'If-Match': notes_etag},
+                )
+                assert other.status_code == 200, "Edits to other sections do not conflict"
+                assert client.patch(path, json={'content': '# Title'}, headers={'If-Match': '*'}).status_code == 400
+                text = file_path.read_text()
+                assert 'lost update' not in text and 'Updated notes.' in text and text.count('Intro text.') == 1
+                assert ExportRevision.query.filter_by(export_id=export.id).count() == 3
+                print("✓ PATCH needs If-Match, rejects stale ETags with 412 and keeps revisions")
+
+                results = []
+
+                def racer(text):
+                    with app.test_client() as racing:
+                        with racing.session_transaction() as sess:
+                            sess['user_id'] = user.id
+                            sess['username'] = user.username
+                        response = racing.patch(path, json={'content': text}, headers={'If-Match': current})
+                        results.append(response.status_code)
+
+                current = client.get(path).headers['ETag']
+                threads = [threading.Thread(target=racer, args=(f'\nEdit {i}\n',)) for i in range(4)]
+                for thread in threads:
+                    thread.start()
+                for thread in threads:
+                    thread.join()
+                assert sorted(results) == [200, 412, 412, 412], results
+                print("✓ Concurrent PATCHes with the same ETag: exactly one wins")
+
+                before = file_path.read_text()
+                try:
+                    save_updated_export(export, before.replace('Intro text.', 'Older intro.'), 'lost update', 'AI update')
+                    assert False, "An update made from stale content should be refused"
+                except ExportChangedError:
+                    pass
+                assert file_path.read_text() == before
+                print("✓ Whole-file updates made from stale content are refused")
+
+                appender = threading.Thread(target=append_chat_turns, args=(str(file_path), '\n**You:** Hi\n'))
+                with sections.locked(str(file_path)):
+                    appender.start()
+                    appender.join(0.2)
+                    assert appender.is_alive() and file_path.read_text() == before
+                appender.join()
+                assert file_path.read_text() == before + '\n**You:** Hi\n'
+                print("✓ Live chat turns wait for the export file lock")
+        finally:
+            ExportRevision.query.filter_by(export_id=export.id).delete()
+            db.session.execute(db.text('DELETE FROM exports_fts WHERE rowid = :id'), {'id': export.id})
+            db.session.delete(export)
+            db.session.commit()
+
+
+if __name__ == '__main__':
+    test_parse_sections()
+    test_section_api()
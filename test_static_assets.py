@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Static Asset and Compression Tests for Better Jira Generator
+Tests fingerprinted asset URLs, precompressed assets and response compression.
+"""
+
+import gzip
+import sys
+import tempfile
+from pathlib import Path
+
+# Add the project root to Python path
+sys.path.insert(0, str(Path(__file__).parent))
+
+
+def decompress(data, encoding):
+    if encoding == 'br':
+        import brotli
+
+        return brotli.decompress(data)
+    return gzip.decompress(data)
+
+
+def logged_in_client(app, user):
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess['user_id'] = user.id
+        sess['username'] = user.username
+    return client
+
+
+def test_fingerprinted_assets():
+    """Test that pages link hashed asset URLs served with long-lived caching and precompression."""
+    import compression
+    from static_assets import StaticAssets, fingerprint
+    from web_app import app, static_assets, User
+
+    print("Testing fingerprinted assets...")
+    css = (Path(__file__).parent / 'static' / 'css' / 'app.css').read_bytes()
+    hashed = fingerprint('css/app.css', css)
+    assert hashed.startswith('css/app.') and hashed.endswith('.css') and hashed != 'css/app.css'
+
+    with app.app_context():
+        user = User.query.filter_by(username='demo-dev').first()
+    with logged_in_client(app, user) as client:
+        page = client.get('/items')
+        assert f'/assets/{hashed}'.encode() in page.data and b'<style>' not in page.data
+        print("✓ Pages link the shared stylesheet by its content hash")
+
+        for encoding in compression.available_encodings():
+            response = client.get(f'/assets/{hashed}', headers={'Accept-Encoding': encoding})
+            assert response.status_code == 200 and response.headers['Content-Encoding'] == encoding
+            assert response.headers['Cache-Control'] == 'public, max-age=31536000, immutable'
+            assert 'Accept-Encoding' in response.headers['Vary']
+            assert decompress(response.data, encoding) == css
+        plain = client.get(f'/assets/{hashed}', headers={'Accept-Encoding': 'identity'})
+        assert 'Content-Encoding' not in plain.headers and plain.data == css
+        print(f"✓ Assets are served precompressed ({', '.join(compression.available_encodings())}) and immutable")
+
+        assert client.get('/assets/css/app.0000000000.css').status_code == 404
+        print("✓ Stale fingerprints are not found")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        folder = Path(tmp_dir) / 'static'
+        (folder / 'js').mkdir(parents=True)
+        (folder / 'js' / 'page.js').write_text('console.log("hi");\n' * 50)
+        assets = StaticAssets(folder=folder, build_dir=Path(tmp_dir) / 'build')
+        assets.scan()
+        assert assets.build() == len(compression.available_encodings())
+        assert assets.build() == 0, "Existing copies are not rebuilt"
+        assert static_assets.url('missing.css') == '/static/missing.css'
+        print("✓ Builds write each compressed copy once")
+
+
+def test_response_compression():
+    """Test that large HTML/JSON responses are compressed and small ones and files are not."""
+    import compression
+    from web_app import app, db, Export, User
+
+    print("Testing response compression...")
+    with tempfile.TemporaryDirectory() as tmp_dir, app.app_context():
+        user = User.query.filter_by(username='demo-dev').first()
+        file_path = Path(tmp_dir) / 'compress_test.md'
+        file_path.write_text('## Acceptance Criteria\n\n' + '- the cart keeps its items\n' * 400)
+        export = Export(filename='compress_test.md', file_path=str(file_path), user_id=user.id)
+        db.session.add(export)
+        db.session.commit()
+
+        try:
+            with logged_in_client(app, user) as client:
+                response = client.get(f'/history/rendered/{export.id}', headers={'Accept-Encoding': 'gzip'})
+                assert response.status_code == 200 and response.headers['Content-Encoding'] == 'gzip'
+                assert 'Accept-Encoding' in response.headers['Vary']
+                compressed_size, html = len(response.data), gzip.decompress(response.data)
+                assert html.count(b'the cart keeps its items') == 400
+                etag = response.headers['ETag']
+                assert etag.startswith('W/'), "Compressed responses carry a weak ETag"
+
+                response = client.get(f'/history/rendered/{export.id}', headers={'If-None-Match': etag, 'Accept-Encoding': 'gzip'})
+                assert response.status_code == 304
+                print(f"✓ Rendered HTML compressed {len(html)} -> {compressed_size} bytes and still revalidates")
+
+                if 'br' in compression.available_encodings():
+                    response = client.get(f'/api/v1/items/{export.id}/content', headers={'Accept-Encoding': 'gzip, br'})
+                    assert response.headers['Content-Encoding'] == 'br'
+                    assert b'the cart keeps its items' in decompress(response.data, 'br')
+                    print("✓ JSON prefers brotli when accepted")
+
+                response = client.get('/api/v1/quota', headers={'Accept-Encoding': 'gzip'})
+                assert response.status_code == 200 and 'Content-Encoding' not in response.headers
+                print("✓ Small responses are sent uncompressed")
+
+                response = client.get(f'/history/raw/{export.id}', headers={'Accept-Encoding': 'gzip'})
+                assert response.status_code == 200 and 'Content-Encoding' not in response.headers
+                response.close()
+                print("✓ Files sent with send_file are left alone")
+        finally:
+            db.session.delete(export)
+            db.session.commit()
+
+
+if __name__ == '__main__':
+    test_fingerprinted_assets()
+    test_response_compression()
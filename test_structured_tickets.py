@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Structured Ticket Tests for Better Jira Generator
+Tests JSON-mode ticket validation, markdown rendering and the ticket rows and API.
+"""
+
+import json
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+from unittest import mock
+
+# Add the project root to Python path
+sys.path.insert(0, str(Path(__file__).parent))
+
+REPO = 'https://github.com/example/structured-test'
+DOCUMENT = {
+    'title': 'Saved Carts',
+    'overview': 'Let shoppers keep carts between visits.',
+    'tickets': [
+        {
+            'summary': 'Persist carts per user',
+            'description': 'Store the cart server-side when a shopper signs in.',
+            'acceptance_criteria': ['A cart survives a logout', 'Guest carts merge on login'],
+            'technical_requirements': ['Add a carts table'],
+            'labels': ['Backend', 'carts', 'backend'],
+            'story_points': 5,
+        },
+        {
+            'summary': 'Show the saved cart badge',
+            'description': 'The header shows how many items are waiting.',
+            'acceptance_criteria': ['The badge updates without a reload'],
+            'technical_requirements': [],
+            'labels': ['Front End'],
+            'story_points': None,
+        },
+    ],
+}
+
+
+class JsonClient:
+    """Groq stand-in that answers with a JSON reply and remembers the request."""
+
+    def __init__(self, reply):
+        self.reply = reply
+        self.requests = []
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, **kwargs):
+        self.requests.append(kwargs)
+        return SimpleNamespace(usage=None, choices=[SimpleNamespace(message=SimpleNamespace(content=self.reply))])
+
+
+def test_validation_and_markdown():
+    """Test that replies are validated and the rendered markdown parses back to the same tickets."""
+    import jira_push
+    from structured_tickets import TicketValidationError, parse_document, parse_markdown, render_markdown
+
+    print("Testing ticket validation and rendering...")
+    document = parse_document('```json\n' + json.dumps(DOCUMENT) + '\n```')
+    assert document['tickets'][0]['labels'] == ['backend', 'carts']
+    assert document['tickets'][1]['labels'] == ['front-end']
+
+    bad_replies = {
+        'not json': 'not valid JSON',
+        json.dumps({'title': 'x', 'tickets': []}): 'tickets must be a non-empty list',
+        json.dumps({'title': 'x', 'tickets': [{'summary': ' ', 'description': ''}]}): 'tickets[0].summary',
+        json.dumps({'title': 'x', 'tickets': [{'summary': 'a', 'story_points': 'five'}]}): 'tickets[0].story_points',
+        json.dumps({'title': 'x', 'tickets': [{'summary': 'a', 'labels': 'api'}]}): 'tickets[0].labels',
+    }
+    for reply, message in bad_replies.items():
+        try:
+            parse_document(reply)
+            assert False, f"Should reject {reply}"
+        except TicketValidationError as e:
+            assert message in str(e), str(e)
+    print("✓ Invalid replies are rejected with the failing field")
+
+    markdown = render_markdown(document)
+    assert parse_markdown(markdown) == document
+    sections = jira_push.split_sections(markdown)
+    assert [summary for summary, _ in sections] == ['Persist carts per user', 'Show the saved cart badge']
+    print("✓ Rendered markdown parses back and has one Jira section per ticket")
+
+
+def test_structured_new_chat_and_api():
+    """Test that a structured new chat stores ticket rows that the API filters with SQL."""
+    import main
+    from web_app import app, db, Export, ExportRevision, ExportTicket, User, save_updated_export
+
+    print("Testing structured generation...")
+    with app.app_context():
+        user = User.query.filter_by(username='demo-dev').first()
+        user_id, username = user.id, user.username
+
+    client_stub = JsonClient(json.dumps(DOCUMENT))
+    form = {'repo_url': REPO, 'project_description': 'Saved carts', 'user_type': 'Developer', 'structured': '1'}
+    try:
+        with app.test_client() as client, mock.patch.object(main, 'get_groq_client', return_value=client_stub):
+            with client.session_transaction() as sess:
+                sess['user_id'] = user_id
+                sess['username'] = username
+
+            response = client.post('/new_chat', data=form)
+            assert response.status_code == 302
+            assert client_stub.requests[0]['response_format'] == {'type': 'json_object'}
+
+            with app.app_context():
+                export = Export.query.filter_by(repository=REPO).one()
+                export_id = export.id
+                assert Path(export.file_path).read_text().startswith('# Saved Carts\n')
+            print("✓ JSON mode was requested and the export holds the rendered markdown")
+
+            tickets = client.get(f'/api/v1/items/{export_id}/tickets').get_json()['tickets']
+            assert [ticket['summary'] for ticket in tickets] == ['Persist carts per user', 'Show the saved cart badge']
+            assert tickets[0]['acceptance_criteria'] == DOCUMENT['tickets'][0]['acceptance_criteria']
+
+            found = client.get('/api/v1/tickets?label=Backend&repository=' + REPO).get_json()['tickets']
+            assert [ticket['summary'] for ticket in found] == ['Persist carts per user']
+            found = client.get(f'/api/v1/tickets?q=badge&repository={REPO}').get_json()['tickets']
+            assert [ticket['story_points'] for ticket in found] == [None]
+            assert client.get(f'/api/v1/tickets?max_points=3&repository={REPO}').get_json()['tickets'] == []
+            assert client.get('/api/v1/tickets?max_points=x').status_code == 400
+            print("✓ Tickets are filtered by label, summary and points in SQL")
+
+            with app.app_context():
+                export = Export.query.get(export_id)
+                current = Path(export.file_path).read_text()
+                revised = current.replace('**Labels:** front-end', '**Labels:** front-end, ui')
+                save_updated_export(export, current, revised, 'Add a ui label')
+            found = client.get(f'/api/v1/tickets?label=ui&repository={REPO}').get_json()['tickets']
+            assert [ticket['summary'] for ticket in found] == ['Show the saved cart badge']
+            print("✓ Revising the document refreshes its ticket rows")
+
+            with app.app_context():
+                export = Export.query.get(export_id)
+                assert export.is_structured
+                save_updated_export(export, revised, 'Just notes now.\n', 'Drop the tickets')
+                assert ExportTicket.query.filter_by(export_id=export_id).count() == 0
+                save_updated_export(export, 'Just notes now.\n', revised, 'Bring the tickets back')
+            tickets = client.get(f'/api/v1/items/{export_id}/tickets').get_json()['tickets']
+            assert len(tickets) == 2 and 'ui' in tickets[1]['labels']
+            print("✓ A revision without tickets does not stop later revisions from rebuilding them")
+
+            client_stub.reply = '{"title": "Nothing useful"}'
+            response = client.post('/new_chat', data=form)
+            with client.session_transaction() as sess:
+                flashes = sess.get('_flashes', [])
+            assert any('not a valid ticket list' in message for _, message in flashes)
+            with app.app_context():
+                assert Export.query.filter_by(repository=REPO).count() == 1
+            print("✓ An invalid reply is reported and nothing is saved")
+    finally:
+        with app.app_context():
+            for export in Export.query.filter_by(repository=REPO).all():
+                Path(export.file_path).unlink(missing_ok=True)
+                # The delete-orphan cascade removes each ticket's labels
+                for ticket in ExportTicket.query.filter_by(export_id=export.id):
+                    db.session.delete(ticket)
+                ExportRevision.query.filter_by(export_id=export.id).delete()
+                db.session.execute(db.text('DELETE FROM exports_fts WHERE rowid = :id'), {'id': export.id})
+                db.session.delete(export)
+            db.session.commit()
+
+
+if __name__ == '__main__':
+    test_validation_and_markdown()
+    test_structured_new_chat_and_api()
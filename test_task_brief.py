@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Task Brief Tests for Better Jira Generator
+Tests compacting task documents and the brief cache shared by sessions.
+"""
+
+import os
+import sys
+import tempfile
+from pathlib import Path
+from unittest import mock
+
+# Add the project root to Python path
+sys.path.insert(0, str(Path(__file__).parent))
+
+PARAGRAPH = 'Shoppers   must be able to  keep their cart between visits.'
+DOCUMENT = f"""# Saved Carts   \r
+<!-- template: feature-request v2 -->
+[![build](https://ci.example.com/badge.svg)](https://ci.example.com)
+
+## Table of Contents
+
+- [Overview](#overview)
+- [Notes](#notes)
+
+## Overview
+
+{PARAGRAPH}
+
+---
+
+{PARAGRAPH}
+
+![diagram](docs/cart.png)
+
+```python
+cart  =  load_cart(user)   # keep   spacing
+
+```
+
+### Notes
+
+- First   note
+
+### Notes
+
+- Second note
+"""
+
+
+def test_compact():
+    """Test that briefs drop boilerplate and repetition but keep code and structure."""
+    import token_budget
+    from task_brief import compact
+
+    print("Testing task brief compaction...")
+    brief = compact(DOCUMENT)
+    assert brief.startswith('# Saved Carts\n\n## Overview\n')
+    for removed in ('template:', 'badge.svg', 'Table of Contents', '(#notes)', 'diagram', '---', '\r'):
+        assert removed not in brief, removed
+    assert brief.count('keep their cart') == 1 and 'Shoppers must be able to keep' in brief
+    assert 'cart  =  load_cart(user)   # keep   spacing\n\n```' in brief
+    assert brief.count('### Notes') == 2 and '- First note' in brief
+    assert compact(brief) == brief
+    assert token_budget.count_tokens(brief) < token_budget.count_tokens(DOCUMENT)
+    print("✓ Boilerplate, repeated paragraphs and extra whitespace are removed; code is kept")
+
+
+def test_brief_cache():
+    """Test that briefs are made once per document, shared through the cache folder and summarized once."""
+    import task_brief
+
+    print("Testing the brief cache...")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        cache = task_brief.BriefCache(tmp_dir)
+        with mock.patch.object(task_brief, 'compact', wraps=task_brief.compact) as compact:
+            document_hash, brief = cache.get(DOCUMENT)
+            assert cache.get(DOCUMENT) == (document_hash, brief)
+            assert task_brief.BriefCache(tmp_dir).get(DOCUMENT) == (document_hash, brief)
+            assert compact.call_count == 1
+        assert cache.original(document_hash) == DOCUMENT and cache.original('../etc/passwd') is None
+        print("✓ A document is compacted once and its original kept by hash")
+
+        summaries = []
+
+        def summarize(text):
+            summaries.append(text)
+            if len(summaries) == 1:
+                raise RuntimeError('service unavailable')
+            return '# Saved Carts\n\n- Keep carts between visits\n'
+
+        settings = {'TASK_BRIEF_SUMMARIZE': '1', 'TASK_BRIEF_SUMMARY_TOKENS': '10'}
+        other = DOCUMENT + '\nOne more requirement.\n'
+        with mock.patch.dict(os.environ, settings):
+            assert cache.get(other)[1] == task_brief.compact(other), "Without a summarizer the brief is used"
+            assert cache.get(other, summarize=summarize)[1] == task_brief.compact(other)
+            assert cache.get(other, summarize=summarize)[1] == '# Saved Carts\n\n- Keep carts between visits\n'
+            assert task_brief.BriefCache(tmp_dir).get(other)[1].startswith('# Saved Carts\n\n- Keep')
+        assert len(summaries) == 2
+        print("✓ Long briefs are summarized once; a failed summary is retried next time")
+
+
+def test_prompt_and_api():
+    """Test that the system prompt carries the brief and the API returns it with the original."""
+    import main
+    import task_brief
+    from web_app import app, User
+
+    print("Testing briefs in prompts and the API...")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        with mock.patch.object(main, 'task_briefs', task_brief.BriefCache(tmp_dir)):
+            prompt = main.get_system_prompt('developer', 'https://github.com/example/briefs', DOCUMENT)
+            document_hash, brief = main.get_task_brief(DOCUMENT)
+            assert brief in prompt and 'badge.svg' not in prompt
+            print("✓ The system prompt carries the brief instead of the raw file")
+
+            with app.app_context():
+                user = User.query.filter_by(username='demo-dev').first()
+                user_id, username = user.id, user.username
+            with app.test_client() as client:
+                with client.session_transaction() as sess:
+                    sess['user_id'] = user_id
+                    sess['username'] = username
+
+                with mock.patch.dict(os.environ, {'ADMIN_USERNAMES': ''}):
+                    assert client.get(f'/api/v1/briefs/{document_hash}').status_code == 403
+                with mock.patch.dict(os.environ, {'ADMIN_USERNAMES': username}):
+                    payload = client.get(f'/api/v1/briefs/{document_hash}').get_json()
+                    assert payload['brief'] == brief and 'original' not in payload
+                    assert payload['original_chars'] == len(DOCUMENT) > payload['brief_chars']
+                    assert client.get(f'/api/v1/briefs/{document_hash}?full=1').get_json()['original'] == DOCUMENT
+                    assert client.get('/api/v1/briefs/' + '0' * 64).status_code == 404
+            print("✓ The API serves administrators the brief and, on request, the original")
+
+
+if __name__ == '__main__':
+    test_compact()
+    test_brief_cache()
+    test_prompt_and_api()
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Token Budget Tests for Better Jira Generator
+Tests pre-flight token counts, budget checks and latency estimates.
+"""
+
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+from types import SimpleNamespace
+from unittest import mock
+
+# Add the project root to Python path
+sys.path.insert(0, str(Path(__file__).parent))
+
+
+def test_counts_and_budget():
+    """Test approximate counting, max_tokens selection and refusals."""
+    import token_budget
+
+    print("Testing token counts and budget checks...")
+
+    text = 'Add a saved-cart table, keyed by user id. ' * 100
+    approx = token_budget.count_tokens(text, mode='approx')
+    assert 900 < approx < 1500, f"About 12 tokens per sentence expected, got {approx}"
+    messages = [{'role': 'system', 'content': text}, {'role': 'user', 'content': 'Hi'}]
+    assert token_budget.count_message_tokens(messages, mode='approx') > approx
+
+    with mock.patch.dict(os.environ, {'LLM_CONTEXT_TOKENS': str(approx + 600), 'TOKEN_COUNT_MODE': 'approx'}):
+        result = token_budget.estimate(messages, 'llama-3.1-8b-instant', max_tokens=1024)
+        assert result['allowed'] and result['max_tokens'] < 1024
+        assert result['max_tokens'] >= token_budget.MIN_COMPLETION_TOKENS
+        assert any('lowered' in warning for warning in result['warnings'])
+        print(f"✓ max_tokens lowered to {result['max_tokens']} to fit the context")
+
+        huge = [{'role': 'system', 'content': text * 2}]
+        try:
+            token_budget.check(huge, 'llama-3.1-8b-instant')
+            assert False, "An oversized prompt should be refused"
+        except token_budget.TokenBudgetError as e:
+            assert 'too large' in str(e)
+        print("✓ Prompts larger than the context are refused before sending")
+
+    with mock.patch.dict(os.environ, {'LLM_TOKEN_BUDGET': str(approx + 100), 'TOKEN_COUNT_MODE': 'approx'}):
+        result = token_budget.estimate(messages, 'llama-3.1-8b-instant', max_tokens=1024)
+        assert result['allowed'] and result['warnings'], "Budget overruns warn by default"
+        with mock.patch.dict(os.environ, {'LLM_BUDGET_ACTION': 'refuse'}):
+            result = token_budget.estimate(messages, 'llama-3.1-8b-instant', max_tokens=1024)
+            assert not result['allowed']
+        print("✓ LLM_TOKEN_BUDGET warns or refuses per LLM_BUDGET_ACTION")
+
+
+def test_latency_model_from_history():
+    """Test that recorded calls drive the latency and cost prediction."""
+    import token_budget
+
+    print("Testing latency estimates...")
+
+    history = [
+        ('test-model', p, c, 0.2 + 0.0001 * p + 0.01 * c)
+        for p in (100, 500, 2000, 4000) for c in (50, 200, 400)
+    ]
+    a, b, c = token_budget.fit_latency_model([row[1:] for row in history])
+    assert abs(a - 0.2) < 1e-6 and abs(b - 0.0001) < 1e-9 and abs(c - 0.01) < 1e-9
+    assert token_budget.fit_latency_model([row[1:] for row in history[:3]]) is None
+
+    loaded_in = []
+
+    def history_source():
+        loaded_in.append(threading.current_thread())
+        return history
+
+    with mock.patch.object(token_budget, 'history_source', history_source), \
+            mock.patch.object(token_budget, '_latency_models', {}), \
+            mock.patch.object(token_budget, '_latency_refreshed', None), \
+            mock.patch.dict(os.environ, {'LLM_PRICE_INPUT': '1', 'LLM_PRICE_OUTPUT': '2'}):
+        first = token_budget.estimate([{'role': 'user', 'content': 'hello'}], 'test-model', max_tokens=1000)
+        assert first['latency_seconds'] > 0, "Defaults are used until the history is loaded"
+        for _ in range(100):
+            if token_budget._latency_models:
+                break
+            time.sleep(0.01)
+        assert loaded_in and loaded_in[0] is not threading.main_thread(), "History loads off the request path"
+        result = token_budget.estimate([{'role': 'user', 'content': 'hello'}], 'test-model', max_tokens=1000)
+    assert result['expected_completion_tokens'] == 200, "Typical reply length comes from history"
+    expected = 0.2 + 0.0001 * result['prompt_tokens'] + 0.01 * 200
+    assert abs(result['latency_seconds'] - expected) < 1e-6
+    assert result['max_latency_seconds'] > result['latency_seconds']
+    assert abs(result['cost_usd'] - (result['prompt_tokens'] + 400) / 1e6) < 1e-12
+    print(f"✓ Predicted {result['latency_seconds']:.2f}s typical, {result['max_latency_seconds']:.2f}s worst case")
+
+
+def test_completion_uses_checked_max_tokens():
+    """Test that create_chat_completion sends the budgeted max_tokens and refuses oversized prompts."""
+    import main
+    import token_budget
+
+    print("Testing pre-flight checks in create_chat_completion...")
+
+    sent = []
+    client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(
+        create=lambda **kwargs: sent.append(kwargs) or SimpleNamespace(usage=None, choices=[])
+    )))
+    with mock.patch.dict(os.environ, {'LLM_CONTEXT_TOKENS': '1500', 'TOKEN_COUNT_MODE': 'approx'}):
+        main.create_chat_completion(client, [{'role': 'user', 'content': 'word ' * 800}], max_tokens=1024)
+        assert sent[0]['max_tokens'] < 1024
+
+        try:
+            main.create_chat_completion(client, [{'role': 'user', 'content': 'word ' * 2000}])
+            assert False, "Oversized prompt should raise"
+        except token_budget.TokenBudgetError:
+            pass
+        assert len(sent) == 1, "A refused request is never sent"
+    print("✓ Requests are trimmed or refused before reaching the API")
+
+
+def test_estimate_api():
+    """Test the /api/v1/estimate endpoint."""
+    from web_app import app, User
+
+    print("Testing /api/v1/estimate...")
+
+    with app.app_context():
+        user = User.query.filter_by(username='demo-dev').first()
+
+    with app.test_client() as client:
+        with client.session_transaction() as sess:
+            sess['user_id'] = user.id
+            sess['username'] = user.username
+
+        response = client.post('/api/v1/estimate', json={
+            'messages': [{'role': 'user', 'content': 'Outline a saved-cart feature.'}],
+            'mode': 'approx',
+        })
+        assert response.status_code == 200
+        data = response.get_json()
+        assert data['allowed'] and data['prompt_tokens'] > 0 and data['max_tokens'] == 1024
+
+        assert client.post('/api/v1/estimate', json={'messages': 'hi'}).status_code == 400
+        assert client.post('/api/v1/estimate', json={'item_id': 0}).status_code == 404
+    print("✓ Estimates are served as JSON")
+
+
+if __name__ == '__main__':
+    test_counts_and_budget()
+    test_latency_model_from_history()
+    test_completion_uses_checked_max_tokens()
+    test_estimate_api()
@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+Tracing Tests for Better Jira Generator
+Tests request correlation ids, spans for SQL, file I/O and LLM calls, the OTLP trace file and the viewer.
+"""
+
+import json
+import multiprocessing
+import os
+import secrets
+import sys
+import tempfile
+from pathlib import Path
+from types import SimpleNamespace
+from unittest import mock
+
+from flask import Flask
+from flask_sqlalchemy import SQLAlchemy
+
+# Add the project root to Python path
+sys.path.insert(0, str(Path(__file__).parent))
+
+
+class StubClient:
+    """Groq stand-in with a fixed reply and usage."""
+
+    def __init__(self):
+        usage = SimpleNamespace(prompt_tokens=12, completion_tokens=3, queue_time=None)
+        reply = SimpleNamespace(usage=usage, choices=[SimpleNamespace(message=SimpleNamespace(content='ok'))])
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=lambda **kwargs: reply))
+
+
+def make_app(work_file):
+    import main
+    import metrics
+
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    db = SQLAlchemy(app)
+
+    class Note(db.Model):
+        id = db.Column(db.Integer, primary_key=True)
+        text = db.Column(db.String(100))
+
+    with app.app_context():
+        db.create_all()
+
+    @app.route('/work')
+    def work():
+        db.session.execute(db.text('SELECT 1'))
+        db.session.add(Note(text='traced'))
+        db.session.commit()
+        with metrics.time_file_io('read'), open(work_file) as f:
+            f.read()
+        main.create_chat_completion(StubClient(), [{'role': 'user', 'content': 'hi'}], max_tokens=16)
+        return 'done'
+
+    return app
+
+
+def read_lines(path):
+    return [json.loads(line) for line in Path(path).read_text().splitlines()] if Path(path).exists() else []
+
+
+def test_tracing_disabled_installs_nothing():
+    """Test that disabled tracing adds no request hooks."""
+    import tracing
+
+    with mock.patch.dict(os.environ, {'TRACING_ENABLED': ''}):
+        app = Flask(__name__)
+        tracing.init_app(app)
+        assert not app.before_request_funcs and not app.teardown_request_funcs
+    print("✓ Disabled tracing installs no hooks")
+
+
+def test_request_spans():
+    """Test that a sampled request records its SQL, commit, file and LLM spans as one OTLP line."""
+    import tracing
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        trace_file = Path(tmp_dir) / 'traces.jsonl'
+        work_file = Path(tmp_dir) / 'export.md'
+        work_file.write_text('# Export\n')
+        env = {'TRACING_ENABLED': '1', 'TRACE_SAMPLE_RATE': '1', 'TRACE_FILE': str(trace_file)}
+        with mock.patch.dict(os.environ, env):
+            app = make_app(work_file)
+            tracing.init_app(app)
+            with app.test_client() as client:
+                response = client.get('/work')
+
+            lines = read_lines(trace_file)
+            assert len(lines) == 1
+            resource = lines[0]['resourceSpans'][0]
+            assert {'key': 'service.name', 'value': {'stringValue': tracing.SERVICE_NAME}} in resource['resource']['attributes']
+            spans = resource['scopeSpans'][0]['spans']
+            root = spans[0]
+            assert response.headers[tracing.REQUEST_ID_HEADER] == root['traceId']
+            assert root['name'] == 'GET /work' and root['kind'] == tracing.KIND_SERVER and 'parentSpanId' not in root
+            assert {'key': 'http.status_code', 'value': {'intValue': '200'}} in root['attributes']
+
+            by_name = {span['name']: span for span in spans}
+            for name in ('SELECT', 'db commit', 'INSERT', 'file read', 'chat llama-3.1-8b-instant'):
+                assert name in by_name, f"Missing span {name}: {sorted(by_name)}"
+            assert by_name['INSERT']['parentSpanId'] == by_name['db commit']['spanId']
+            assert by_name['file read']['parentSpanId'] == root['spanId']
+            assert {'key': 'gen_ai.usage.input_tokens', 'value': {'intValue': '12'}} in by_name['chat llama-3.1-8b-instant']['attributes']
+            assert all(span['traceId'] == root['traceId'] for span in spans)
+            assert all(int(span['startTimeUnixNano']) <= int(span['endTimeUnixNano']) for span in spans)
+            print("✓ SQL, commit, file and LLM spans are children of the request span")
+
+            parent = 'ab' * 16
+            with app.test_client() as client:
+                response = client.get('/work', headers={
+                    'traceparent': f'00-{parent}-{"cd" * 8}-01', tracing.REQUEST_ID_HEADER: 'deploy-check-1',
+                })
+            root = read_lines(trace_file)[-1]['resourceSpans'][0]['scopeSpans'][0]['spans'][0]
+            assert root['traceId'] == parent and root['parentSpanId'] == 'cd' * 8
+            assert response.headers[tracing.REQUEST_ID_HEADER] == 'deploy-check-1'
+            print("✓ An incoming traceparent and X-Request-ID are honoured")
+
+        with mock.patch.dict(os.environ, {**env, 'TRACE_SAMPLE_RATE': '0'}):
+            with app.test_client() as client:
+                response = client.get('/work')
+            assert len(read_lines(trace_file)) == 2 and len(response.headers[tracing.REQUEST_ID_HEADER]) == 32
+            print("✓ Unsampled requests get a correlation id and write nothing")
+
+
+def write_large_traces(worker, count):
+    import tracing
+
+    for number in range(count):
+        trace = tracing.Trace(secrets.token_hex(16), f'worker-{worker}-{number}', True)
+        root = tracing.Span('GET /work', kind=tracing.KIND_SERVER, start=1_000_000_000)
+        root.end = 1_100_000_000
+        # Far over the 8 KiB a buffered text write flushes at once
+        root.attributes['payload'] = str(worker) * 100_000
+        trace.spans = [root]
+        tracing.write_trace(trace)
+
+
+def test_write_trace_across_processes():
+    """Test that large traces from several processes stay whole lines, including across rotation."""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        trace_file = Path(tmp_dir) / 'traces.jsonl'
+        env = {'TRACE_FILE': str(trace_file), 'TRACE_MAX_BYTES': str(1_000_000)}
+        with mock.patch.dict(os.environ, env):
+            context = multiprocessing.get_context('fork')
+            workers = [context.Process(target=write_large_traces, args=(worker, 10)) for worker in range(4)]
+            for worker in workers:
+                worker.start()
+            for worker in workers:
+                worker.join()
+                assert worker.exitcode == 0
+
+        lines = read_lines(trace_file) + read_lines(str(trace_file) + '.1')
+        assert lines, "Traces should have been written"
+        for line in lines:
+            attributes = line['resourceSpans'][0]['scopeSpans'][0]['spans'][0]['attributes']
+            payload = next(item['value']['stringValue'] for item in attributes if item['key'] == 'payload')
+            assert len(set(payload)) == 1 and len(payload) == 100_000
+        assert trace_file.stat().st_size <= 1_000_000 + 2 * 100_200
+        print(f"✓ {len(lines)} large traces from 4 processes are whole lines across rotations")
+
+
+def test_trace_viewer():
+    """Test that administrators see recent traces and a waterfall of one trace."""
+    import tracing
+    from web_app import app, User
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        trace_file = Path(tmp_dir) / 'traces.jsonl'
+        trace = tracing.Trace('ef' * 16, 'viewer-test', True)
+        root = tracing.Span('POST /history/update/<int:export_id>', kind=tracing.KIND_SERVER, start=1_000_000_000)
+        root.end = 1_400_000_000
+        root.attributes.update({'request.id': 'viewer-test', 'http.status_code': 302})
+        llm = tracing.Span('chat llama-3.1-8b-instant', root.span_id, tracing.KIND_CLIENT, start=1_050_000_000)
+        llm.end = 1_350_000_000
+        trace.spans = [root, llm]
+
+        with mock.patch.dict(os.environ, {'TRACE_FILE': str(trace_file), 'ADMIN_USERNAMES': 'demo-dev'}):
+            tracing.write_trace(trace)
+            summary = tracing.read_traces()[0]
+            assert summary['request_id'] == 'viewer-test' and summary['duration_ms'] == 400
+            assert [(span['depth'], span['offset_ms'], span['width_pct']) for span in summary['spans']] == [(0, 0, 100), (1, 50, 75)]
+
+            with app.app_context():
+                user = User.query.filter_by(username='demo-dev').first()
+                user_id, username = user.id, user.username
+            with app.test_client() as client:
+                with client.session_transaction() as sess:
+                    sess['user_id'] = user_id
+                    sess['username'] = username
+                listing = client.get('/admin/traces').get_data(as_text=True)
+                assert 'viewer-test' in listing and '400.0 ms' in listing
+                detail = client.get(f'/admin/traces/{"ef" * 16}').get_data(as_text=True)
+                assert 'chat llama-3.1-8b-instant' in detail and 'width: 75.00%' in detail
+                assert client.get('/admin/traces/nope').status_code == 302
+        print("✓ The trace viewer lists traces and shows a span waterfall")
+
+
+if __name__ == '__main__':
+    test_tracing_disabled_installs_nothing()
+    test_request_spans()
+    test_write_trace_across_processes()
+    test_trace_viewer()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Usage Ledger Tests for Better Jira Generator
+Tests that LLM calls are recorded in llm_calls and aggregated per repository.
+"""
+
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+from unittest import mock
+
+# Add the project root to Python path
+sys.path.insert(0, str(Path(__file__).parent))
+
+
+def test_percentile():
+    """Test the nearest-rank percentile helper."""
+    from web_app import percentile
+
+    values = list(range(1, 101))
+    assert percentile(values, 50) == 50
+    assert percentile(values, 99) == 99
+    assert percentile([], 50) is None
+    print("✓ Percentiles use the nearest rank")
+
+
+def test_llm_calls_are_recorded():
+    """Test that create_chat_completion calls land in the ledger and the usage API."""
+    from web_app import app, db, LLMCall, User, flush_llm_calls, get_usage_report, llm_call_queue, percentile
+    from main import create_chat_completion
+
+    print("Testing LLM usage ledger...")
+
+    client = mock.Mock()
+    client.chat.completions.create.return_value = SimpleNamespace(
+        usage=SimpleNamespace(prompt_tokens=100, completion_tokens=50, queue_time=0.02),
+        choices=[SimpleNamespace(message=SimpleNamespace(content='ok'))],
+    )
+
+    with app.app_context():
+        user = User.query.filter_by(username='demo-dev').first()
+        assert user is not None, "demo-dev user should exist"
+        repository = 'https://github.com/example/ledger-test'
+
+        try:
+            # Queue directly and flush, so the test doesn't race the background writer
+            with mock.patch('web_app.threading.Thread'):
+                create_chat_completion(
+                    client,
+                    [{'role': 'user', 'content': 'hi'}],
+                    context={'user_id': user.id, 'repository': repository},
+                )
+            assert llm_call_queue.qsize() == 1
+            assert flush_llm_calls() == 1
+
+            call = LLMCall.query.filter_by(repository=repository).one()
+            assert (call.prompt_tokens, call.completion_tokens, call.outcome) == (100, 50, 'success')
+            print("✓ LLM call was written to llm_calls")
+
+            with app.test_client() as test_client:
+                with test_client.session_transaction() as sess:
+                    sess['user_id'] = user.id
+                    sess['username'] = user.username
+
+                report = test_client.get('/api/v1/usage?days=1').get_json()
+                repositories = {row['key']: row for row in report['by_repository']}
+                assert repositories[repository]['prompt_tokens'] == 100
+                assert 'by_user' not in report, "Only administrators see other users"
+
+                response = test_client.get('/api/v1/usage?scope=all')
+                assert response.status_code == 403, f"Expected 403, got {response.status_code}"
+            print("✓ Usage API aggregates by repository and hides other users")
+
+            latencies = [float(n) for n in range(20, 0, -1)]
+            db.session.add_all(
+                LLMCall(user_id=user.id, repository=repository, model='ledger-model', prompt_tokens=10,
+                        completion_tokens=None if n == 1 else 5, latency=n, outcome='error' if n == 1 else 'success')
+                for n in latencies
+            )
+            db.session.commit()
+            row = next(row for row in get_usage_report(1, user_id=user.id)['by_repository'] if row['key'] == repository)
+            expected = sorted(latencies + [call.latency])
+            assert (row['calls'], row['errors'], row['prompt_tokens'], row['completion_tokens']) == (21, 1, 300, 145)
+            assert [row[f'latency_p{pct}'] for pct in (50, 95, 99)] == [percentile(expected, pct) for pct in (50, 95, 99)]
+            print("✓ Totals and latency percentiles are computed per group in SQL")
+        finally:
+            LLMCall.query.filter_by(repository=repository).delete()
+            db.session.commit()
+
+
+if __name__ == '__main__':
+    test_percentile()
+    test_llm_calls_are_recorded()
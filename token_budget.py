@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+"""
+Better Jira Generator - Token Budget
+Pre-flight token counts, latency/cost estimates and budget checks for LLM calls.
+
+Prompt size is counted before a request is sent, so a task file or export
+too large for the model fails immediately with a clear message instead of
+after a multi-second round trip, and max_tokens is lowered to whatever
+room the prompt leaves.
+
+Counting uses tiktoken's cl100k_base encoding when tiktoken is installed
+and its encoding file is available (it is close to the Llama 3 tokenizer),
+and otherwise a fast approximation from words and punctuation.
+TOKEN_COUNT_MODE forces either one.
+"""
+
+import logging
+import os
+import re
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+# Context window per model; LLM_CONTEXT_TOKENS overrides it for every model
+MODEL_CONTEXT_TOKENS = {
+    'llama-3.1-8b-instant': 131072,
+    'llama-3.3-70b-versatile': 131072,
+    'llama3-8b-8192': 8192,
+}
+DEFAULT_CONTEXT_TOKENS = 8192
+
+# USD per million tokens (input, output); LLM_PRICE_INPUT/LLM_PRICE_OUTPUT override them
+MODEL_PRICES = {
+    'llama-3.1-8b-instant': (0.05, 0.08),
+    'llama-3.3-70b-versatile': (0.59, 0.79),
+    'llama3-8b-8192': (0.05, 0.08),
+}
+
+# Chat formatting adds a few tokens per message and to prime the reply
+TOKENS_PER_MESSAGE = 4
+TOKENS_PER_REPLY = 3
+
+# Below this much room for the reply a call is refused rather than sent
+MIN_COMPLETION_TOKENS = 256
+
+# Used until enough calls are recorded: seconds overhead, per prompt token, per completion token
+DEFAULT_LATENCY_MODEL = (0.3, 0.00001, 0.0015)
+MIN_HISTORY_CALLS = 10
+HISTORY_REFRESH_SECONDS = 300
+
+# Callable returning [(model, prompt_tokens, completion_tokens, latency)] for recent calls, set by web_app
+history_source = None
+
+_WORD_PATTERN = re.compile(r"\w+|[^\w\s]", re.UNICODE)
+_encoding = None
+_encoding_failed = False
+_latency_models = {}
+_latency_refreshed = None  # time.monotonic() of the last refresh
+_latency_refreshing = False
+_latency_lock = threading.Lock()
+
+
+class TokenBudgetError(ValueError):
+    """Raised when a request is too large to send."""
+
+
+def _get_encoding():
+    global _encoding, _encoding_failed
+    if _encoding is None and not _encoding_failed and tiktoken is not None:
+        try:
+            _encoding = tiktoken.get_encoding(os.environ.get('TOKENIZER_ENCODING', 'cl100k_base'))
+        except Exception:
+            # The encoding file is downloaded on first use, which fails offline
+            _encoding_failed = True
+            logger.warning('tiktoken encoding unavailable, using approximate token counts')
+    return _encoding
+
+
+def count_mode():
+    """'exact', 'approx' or 'auto' (exact when a tokenizer is available)."""
+    return os.environ.get('TOKEN_COUNT_MODE', 'auto').lower()
+
+
+def approximate_tokens(text):
+    """Fast estimate: words average about 1.3 tokens and punctuation marks one each."""
+    words = punctuation = 0
+    for piece in _WORD_PATTERN.findall(text):
+        if piece[0].isalnum() or piece[0] == '_':
+            words += 1 + len(piece) // 12
+        else:
+            punctuation += 1
+    return int(words * 1.3) + punctuation
+
+
+def count_tokens(text, mode=None):
+    """Number of tokens in `text`."""
+    if not text:
+        return 0
+    mode = mode or count_mode()
+    encoding = _get_encoding() if mode != 'approx' else None
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    return approximate_tokens(text)
+
+
+def count_message_tokens(messages, mode=None):
+    """Prompt tokens for a chat message list, including per-message formatting."""
+    return sum(count_tokens(message.get('content') or '', mode) + TOKENS_PER_MESSAGE for message in messages) + TOKENS_PER_REPLY
+
+
+def context_limit(model):
+    if os.environ.get('LLM_CONTEXT_TOKENS'):
+        return int(os.environ['LLM_CONTEXT_TOKENS'])
+    return MODEL_CONTEXT_TOKENS.get(model, DEFAULT_CONTEXT_TOKENS)
+
+
+def token_budget():
+    """Optional cap on prompt + reply tokens per request (LLM_TOKEN_BUDGET)."""
+    value = os.environ.get('LLM_TOKEN_BUDGET')
+    return int(value) if value else None
+
+
+def budget_action():
+    """What to do when a request exceeds LLM_TOKEN_BUDGET: 'warn' (default) or 'refuse'."""
+    return os.environ.get('LLM_BUDGET_ACTION', 'warn').lower()
+
+
+def prices(model):
+    input_price, output_price = MODEL_PRICES.get(model, (0.0, 0.0))
+    return (
+        float(os.environ.get('LLM_PRICE_INPUT', input_price)),
+        float(os.environ.get('LLM_PRICE_OUTPUT', output_price)),
+    )
+
+
+def fit_latency_model(calls):
+    """
+    Least-squares fit of latency = a + b * prompt_tokens + c * completion_tokens
+    over (prompt_tokens, completion_tokens, latency) tuples. Returns (a, b, c),
+    or None when there are too few calls or they cannot separate the terms.
+    """
+    rows = [(1.0, float(p), float(c), float(latency)) for p, c, latency in calls if p and c and latency]
+    if len(rows) < MIN_HISTORY_CALLS:
+        return None
+
+    # Normal equations (X^T X) beta = X^T y, solved by Gaussian elimination
+    matrix = [[sum(row[i] * row[j] for row in rows) for j in range(3)] + [sum(row[i] * row[3] for row in rows)] for i in range(3)]
+    for col in range(3):
+        pivot = max(range(col, 3), key=lambda r: abs(matrix[r][col]))
+        if abs(matrix[pivot][col]) < 1e-9:
+            return None
+        matrix[col], matrix[pivot] = matrix[pivot], matrix[col]
+        for r in range(3):
+            if r != col:
+                factor = matrix[r][col] / matrix[col][col]
+                matrix[r] = [a - factor * b for a, b in zip(matrix[r], matrix[col])]
+    a, b, c = (matrix[i][3] / matrix[i][i] for i in range(3))
+    if b < 0 or c <= 0:
+        # A noisy history can fit negative rates; fall back rather than predict nonsense
+        return None
+    return max(a, 0.0), b, c
+
+
+def refresh_latency_models():
+    """
+    Fit a latency model for every model in the recorded call history. Runs
+    in a background thread started by latency_model, so no request waits on
+    the history query.
+    """
+    global _latency_models, _latency_refreshed, _latency_refreshing
+    models = None
+    try:
+        by_model = {}
+        for m, p, c, latency in history_source() if history_source is not None else []:
+            by_model.setdefault(m, []).append((p, c, latency))
+        models = {}
+        for m, calls in by_model.items():
+            completions = sorted(c for _, c, _ in calls if c)
+            models[m] = (
+                fit_latency_model(calls) or DEFAULT_LATENCY_MODEL,
+                completions[len(completions) // 2] if completions else None,
+            )
+    except Exception:
+        logger.exception('Could not load LLM call history for latency estimates')
+
+    with _latency_lock:
+        if models is not None:
+            _latency_models = models
+        _latency_refreshed = time.monotonic()
+        _latency_refreshing = False
+
+
+def latency_model(model):
+    """
+    (latency model, typical completion tokens) for a model, fitted from
+    recorded calls. The fit is refreshed in the background every few
+    minutes; until the first refresh finishes the defaults are used.
+    """
+    global _latency_refreshing
+    with _latency_lock:
+        cached = _latency_models.get(model)
+        stale = _latency_refreshed is None or time.monotonic() - _latency_refreshed >= HISTORY_REFRESH_SECONDS
+        start = stale and not _latency_refreshing and history_source is not None
+        if start:
+            _latency_refreshing = True
+    if start:
+        threading.Thread(target=refresh_latency_models, name='latency-models', daemon=True).start()
+    return cached or (DEFAULT_LATENCY_MODEL, None)
+
+
+def estimate(messages, model, max_tokens=1024, mode=None):
+    """
+    Pre-flight estimate for a request. Returns a dict with prompt_tokens,
+    the max_tokens to send, predicted latency and cost (typical and worst
+    case), warnings, and `allowed`/`reason` for requests that must not be sent.
+    """
+    prompt_tokens = count_message_tokens(messages, mode)
+    limit = context_limit(model)
+    budget = token_budget()
+    warnings = []
+    allowed, reason = True, None
+
+    room = limit - prompt_tokens
+    chosen = min(max_tokens, room)
+    if budget is not None and prompt_tokens + chosen > budget:
+        message = f'Request needs about {prompt_tokens + chosen:,} tokens, over the {budget:,}-token budget'
+        if budget_action() == 'refuse':
+            chosen = min(chosen, budget - prompt_tokens)
+            if chosen < MIN_COMPLETION_TOKENS:
+                allowed, reason = False, message
+        else:
+            warnings.append(message)
+
+    if room < MIN_COMPLETION_TOKENS:
+        allowed = False
+        reason = (f'Prompt is about {prompt_tokens:,} tokens, too large for the {limit:,}-token '
+                  f'context of {model}. Shorten the task file or document.')
+    elif chosen < max_tokens:
+        warnings.append(f'max_tokens lowered from {max_tokens:,} to {chosen:,} to fit the prompt')
+
+    chosen = max(chosen, 0)
+    (overhead, per_prompt, per_completion), typical_completion = latency_model(model)
+    typical = min(typical_completion or chosen // 2, chosen)
+    input_price, output_price = prices(model)
+
+    return {
+        'model': model,
+        'prompt_tokens': prompt_tokens,
+        'context_tokens': limit,
+        'max_tokens': chosen,
+        'requested_max_tokens': max_tokens,
+        'expected_completion_tokens': typical,
+        'latency_seconds': overhead + per_prompt * prompt_tokens + per_completion * typical,
+        'max_latency_seconds': overhead + per_prompt * prompt_tokens + per_completion * chosen,
+        'cost_usd': (prompt_tokens * input_price + typical * output_price) / 1e6,
+        'max_cost_usd': (prompt_tokens * input_price + chosen * output_price) / 1e6,
+        'warnings': warnings,
+        'allowed': allowed,
+        'reason': reason,
+    }
+
+
+def check(messages, model, max_tokens=1024):
+    """
+    Estimate a request before it is sent. Logs warnings, raises
+    TokenBudgetError if it must not be sent, and returns the estimate;
+    send estimate['max_tokens'] as the request's max_tokens.
+    """
+    result = estimate(messages, model, max_tokens)
+    for warning in result['warnings']:
+        logger.warning('%s (%s)', warning, model)
+    if not result['allowed']:
+        raise TokenBudgetError(result['reason'])
+    return result
@@ -0,0 +1,472 @@
+#!/usr/bin/env python3
+"""
+Better Jira Generator - Request Tracing
+Spans for requests, SQL statements, export file I/O and LLM calls.
+
+Nothing is installed unless TRACING_ENABLED is set. When enabled, every
+request gets a correlation id, returned in the X-Request-ID header (an
+incoming X-Request-ID or W3C traceparent is honoured), and
+TRACE_SAMPLE_RATE of requests are recorded. A recorded request becomes
+one line of TRACE_FILE in the OTLP/JSON format of the OpenTelemetry
+collector's file exporter, so the file can be replayed into Jaeger, Tempo
+or any other OTLP backend. /admin/traces shows the recent ones.
+
+The current trace and span live in context variables, so spans started
+in threads run by asyncio.to_thread are attached to the request that
+started them.
+"""
+
+import contextvars
+import json
+import os
+import random
+import re
+import secrets
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+from flask import g, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+SERVICE_NAME = 'better-jira-generator'
+REQUEST_ID_HEADER = 'X-Request-ID'
+
+# OTLP span kinds and status codes
+KIND_INTERNAL = 1
+KIND_SERVER = 2
+KIND_CLIENT = 3
+STATUS_OK = 1
+STATUS_ERROR = 2
+
+MAX_STATEMENT_LENGTH = 1000
+
+_TRACEPARENT = re.compile(r'^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$')
+_REQUEST_ID = re.compile(r'^[A-Za-z0-9._-]{1,64}$')
+
+# (trace, span) of the innermost open span, or None outside a recorded request
+_current = contextvars.ContextVar('tracing_current', default=None)
+_write_lock = threading.Lock()
+_installed = False
+
+
+def tracing_enabled():
+    return os.environ.get('TRACING_ENABLED', '').lower() in ('1', 'true', 'yes')
+
+
+def trace_settings():
+    return {
+        'sample_rate': float(os.environ.get('TRACE_SAMPLE_RATE', 0.1)),
+        'file': Path(os.environ.get('TRACE_FILE', 'traces/traces.jsonl')),
+        'max_bytes': int(os.environ.get('TRACE_MAX_BYTES', 10 * 1024 * 1024)),
+    }
+
+
+class Span:
+    __slots__ = ('span_id', 'parent_id', 'name', 'kind', 'start', 'end', 'attributes', 'status', 'message')
+
+    def __init__(self, name, parent_id=None, kind=KIND_INTERNAL, attributes=None, start=None):
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.name = name
+        self.kind = kind
+        self.start = start or time.time_ns()
+        self.end = None
+        self.attributes = dict(attributes or {})
+        self.status = STATUS_OK
+        self.message = None
+
+    def set_error(self, error):
+        self.status = STATUS_ERROR
+        self.message = str(error)[:500]
+
+
+class Trace:
+    """The spans recorded for one request."""
+
+    def __init__(self, trace_id, request_id, sampled):
+        self.trace_id = trace_id
+        self.request_id = request_id
+        self.sampled = sampled
+        self.spans = []
+        self._lock = threading.Lock()
+
+    def add(self, span):
+        with self._lock:
+            self.spans.append(span)
+
+
+def _attribute(key, value):
+    if isinstance(value, bool):
+        typed = {'boolValue': value}
+    elif isinstance(value, int):
+        # OTLP/JSON encodes 64-bit integers as strings
+        typed = {'intValue': str(value)}
+    elif isinstance(value, float):
+        typed = {'doubleValue': value}
+    else:
+        typed = {'stringValue': str(value)}
+    return {'key': key, 'value': typed}
+
+
+def span_to_otlp(trace, span):
+    otlp = {
+        'traceId': trace.trace_id,
+        'spanId': span.span_id,
+        'name': span.name,
+        'kind': span.kind,
+        'startTimeUnixNano': str(span.start),
+        'endTimeUnixNano': str(span.end or span.start),
+        'attributes': [_attribute(key, value) for key, value in span.attributes.items() if value is not None],
+        'status': {'code': span.status, **({'message': span.message} if span.message else {})},
+    }
+    if span.parent_id:
+        otlp['parentSpanId'] = span.parent_id
+    return otlp
+
+
+def trace_to_otlp(trace):
+    """One OTLP/JSON ExportTraceServiceRequest holding every span of a trace."""
+    return {
+        'resourceSpans': [{
+            'resource': {'attributes': [_attribute('service.name', SERVICE_NAME), _attribute('process.pid', os.getpid())]},
+            'scopeSpans': [{
+                'scope': {'name': 'tracing'},
+                'spans': [span_to_otlp(trace, span) for span in trace.spans],
+            }],
+        }],
+    }
+
+
+def write_trace(trace):
+    """Append a finished trace to TRACE_FILE, rotating it to .1 when it is over TRACE_MAX_BYTES."""
+    settings = trace_settings()
+    path = settings['file']
+    data = (json.dumps(trace_to_otlp(trace), separators=(',', ':')) + '\n').encode('utf-8')
+    with _write_lock:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Workers take a lock on a file beside the trace file, which is never rotated itself
+        lock_fd = os.open(path.with_name(path.name + '.lock'), os.O_WRONLY | os.O_CREAT, 0o644)
+        try:
+            if fcntl is not None:
+                fcntl.flock(lock_fd, fcntl.LOCK_EX)
+            try:
+                if path.stat().st_size > settings['max_bytes']:
+                    os.replace(path, path.with_name(path.name + '.1'))
+            except FileNotFoundError:
+                pass
+            # The whole line in one unbuffered write on an O_APPEND descriptor
+            fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                while data:
+                    data = data[os.write(fd, data):]
+            finally:
+                os.close(fd)
+        finally:
+            os.close(lock_fd)
+
+
+def current_trace():
+    current = _current.get()
+    return current[0] if current else None
+
+
+def start_span(name, kind=KIND_INTERNAL, attributes=None, start=None):
+    """Open a span under the current one, or return None outside a recorded trace. Close it with end_span."""
+    current = _current.get()
+    if current is None:
+        return None
+    trace, parent = current
+    span = Span(name, parent.span_id, kind, attributes, start)
+    trace.add(span)
+    return span
+
+
+def end_span(span, error=None, end=None):
+    if span is None:
+        return
+    span.end = end or time.time_ns()
+    if error is not None:
+        span.set_error(error)
+
+
+@contextmanager
+def span(name, kind=KIND_INTERNAL, **attributes):
+    """Record the enclosed block as a child of the current span; spans opened inside it become its children."""
+    opened = start_span(name, kind, attributes)
+    if opened is None:
+        yield None
+        return
+    token = _current.set((_current.get()[0], opened))
+    try:
+        yield opened
+    except BaseException as e:
+        end_span(opened, error=e)
+        raise
+    else:
+        end_span(opened)
+    finally:
+        _current.reset(token)
+
+
+def _parse_traceparent(header):
+    match = _TRACEPARENT.match((header or '').strip().lower())
+    if not match or match.group(1) == '0' * 32:
+        return None
+    return match.group(1), match.group(2), bool(int(match.group(3), 16) & 1)
+
+
+def start_trace(name, headers, attributes=None):
+    """
+    Begin the trace of a request. Returns (trace, token) to pass to
+    finish_trace; the trace carries the correlation id even when it is
+    not sampled, in which case no spans are recorded.
+    """
+    parent = _parse_traceparent(headers.get('traceparent'))
+    if parent:
+        trace_id, parent_id, sampled = parent
+    else:
+        trace_id, parent_id = secrets.token_hex(16), None
+        sampled = random.random() < trace_settings()['sample_rate']
+
+    incoming_id = headers.get(REQUEST_ID_HEADER) or ''
+    request_id = incoming_id if _REQUEST_ID.match(incoming_id) else trace_id
+    trace = Trace(trace_id, request_id, sampled)
+    if not sampled:
+        return trace, None
+
+    root = Span(name, parent_id, KIND_SERVER, {**(attributes or {}), 'request.id': request_id})
+    trace.add(root)
+    return trace, _current.set((trace, root))
+
+
+def finish_trace(trace, token, status_code=None, error=None):
+    """Close the request span and write the trace if it was sampled."""
+    if token is None:
+        return
+    root = trace.spans[0]
+    root.attributes['http.status_code'] = status_code
+    end_span(root, error=error or (f'HTTP {status_code}' if status_code and status_code >= 500 else None))
+    try:
+        _current.reset(token)
+    except ValueError:
+        # A streamed response finishes in a different context than it started in
+        _current.set(None)
+    write_trace(trace)
+
+
+def record_llm_call(record):
+    """LLM_CALL_HOOKS callback from main.create_chat_completion: the call as a span that has just ended."""
+    end = time.time_ns()
+    span = start_span(
+        f"chat {record['model']}",
+        KIND_CLIENT,
+        {
+            'gen_ai.system': 'groq',
+            'gen_ai.request.model': record['model'],
+            'gen_ai.usage.input_tokens': record.get('prompt_tokens'),
+            'gen_ai.usage.output_tokens': record.get('completion_tokens'),
+            'llm.outcome': record['outcome'],
+        },
+        start=end - int(record['duration'] * 1e9),
+    )
+    end_span(span, error=record.get('error'), end=end)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    words = statement.split(None, 1)
+    span = start_span(words[0].upper() if words else 'SQL', KIND_CLIENT, {
+        'db.system': conn.dialect.name,
+        'db.statement': statement[:MAX_STATEMENT_LENGTH],
+    })
+    conn.info.setdefault('tracing_spans', []).append(span)
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    spans = conn.info.get('tracing_spans')
+    if spans:
+        end_span(spans.pop())
+
+
+def _handle_error(exception_context):
+    conn = exception_context.connection
+    spans = conn.info.get('tracing_spans') if conn is not None else None
+    if spans:
+        end_span(spans.pop(), error=exception_context.original_exception)
+
+
+def _before_commit(session):
+    # Flushed statements run inside this span, so it covers flush and COMMIT together
+    span = start_span('db commit')
+    if span is not None:
+        session.info['tracing_commit'] = (span, _current.set((_current.get()[0], span)))
+
+
+def _end_commit(session, error=None):
+    opened = session.info.pop('tracing_commit', None)
+    if opened is None:
+        return
+    span, token = opened
+    end_span(span, error=error)
+    try:
+        _current.reset(token)
+    except ValueError:
+        pass
+
+
+def _after_commit(session):
+    _end_commit(session)
+
+
+def _after_rollback(session):
+    _end_commit(session, error='rolled back')
+
+
+def install_hooks():
+    """Trace SQL statements, commits and LLM calls. Safe to call more than once."""
+    global _installed
+    if _installed:
+        return
+    _installed = True
+    event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+    event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+    event.listen(Engine, 'handle_error', _handle_error)
+    event.listen(Session, 'before_commit', _before_commit)
+    event.listen(Session, 'after_commit', _after_commit)
+    event.listen(Session, 'after_rollback', _after_rollback)
+
+    try:
+        from main import LLM_CALL_HOOKS
+    except ImportError:
+        return
+    if record_llm_call not in LLM_CALL_HOOKS:
+        LLM_CALL_HOOKS.append(record_llm_call)
+
+
+def read_traces(limit=100, max_bytes=4 * 1024 * 1024):
+    """
+    The most recent traces in TRACE_FILE, newest first, as dicts with the
+    trace id, request id, root span name, start time, duration, status and
+    spans. Only the last max_bytes of the file are read.
+    """
+    path = trace_settings()['file']
+    try:
+        with open(path, 'rb') as f:
+            size = f.seek(0, os.SEEK_END)
+            f.seek(max(size - max_bytes, 0))
+            data = f.read()
+    except FileNotFoundError:
+        return []
+    lines = data.split(b'\n')
+    if size > max_bytes:
+        lines = lines[1:]  # the first line is cut off
+
+    traces = []
+    for line in reversed(lines):
+        if len(traces) >= limit:
+            break
+        try:
+            spans = json.loads(line)['resourceSpans'][0]['scopeSpans'][0]['spans']
+        except (ValueError, KeyError, IndexError):
+            continue
+        if spans:
+            traces.append(summarize_trace(spans))
+    return traces
+
+
+def _value(attribute):
+    value = next(iter(attribute['value'].values()))
+    return int(value) if 'intValue' in attribute['value'] else value
+
+
+def summarize_trace(spans):
+    """A trace from its OTLP spans, with each span's depth and offset for the waterfall view."""
+    by_id = {span['spanId']: span for span in spans}
+    root = spans[0]
+    start = int(root['startTimeUnixNano'])
+    duration = max(int(root['endTimeUnixNano']) - start, 1)
+
+    def depth(span):
+        level = 0
+        while span.get('parentSpanId') in by_id:
+            span = by_id[span['parentSpanId']]
+            level += 1
+        return level
+
+    rows = []
+    for span in sorted(spans, key=lambda span: int(span['startTimeUnixNano'])):
+        span_start = int(span['startTimeUnixNano']) - start
+        span_duration = int(span['endTimeUnixNano']) - int(span['startTimeUnixNano'])
+        rows.append({
+            'name': span['name'],
+            'depth': depth(span),
+            'offset_ms': span_start / 1e6,
+            'duration_ms': span_duration / 1e6,
+            'left_pct': min(max(span_start / duration * 100, 0), 100),
+            'width_pct': min(max(span_duration / duration * 100, 0.5), 100),
+            'error': span['status'].get('code') == STATUS_ERROR,
+            'message': span['status'].get('message'),
+            'attributes': {attribute['key']: _value(attribute) for attribute in span.get('attributes', [])},
+        })
+
+    attributes = {attribute['key']: _value(attribute) for attribute in root.get('attributes', [])}
+    return {
+        'trace_id': root['traceId'],
+        'request_id': attributes.get('request.id', root['traceId']),
+        'name': root['name'],
+        'start': datetime.utcfromtimestamp(start / 1e9),
+        'duration_ms': duration / 1e6,
+        'status_code': attributes.get('http.status_code'),
+        'error': any(row['error'] for row in rows),
+        'spans': rows,
+    }
+
+
+def find_trace(trace_id):
+    if not re.fullmatch(r'[0-9a-f]{32}', trace_id or ''):
+        return None
+    return next((trace for trace in read_traces(limit=10000) if trace['trace_id'] == trace_id), None)
+
+
+def init_app(app):
+    """Install the tracing hooks when TRACING_ENABLED is set."""
+    if not tracing_enabled():
+        return
+    install_hooks()
+
+    @app.before_request
+    def start_request_trace():
+        name = f'{request.method} {request.url_rule.rule if request.url_rule else request.path}'
+        g.trace = start_trace(name, request.headers, {
+            'http.method': request.method,
+            'http.route': request.url_rule.rule if request.url_rule else None,
+            'http.target': request.full_path.rstrip('?'),
+            'flask.endpoint': request.endpoint,
+        })
+
+    @app.after_request
+    def add_request_id(response):
+        trace = g.get('trace')
+        if trace:
+            response.headers[REQUEST_ID_HEADER] = trace[0].request_id
+            g.trace_status = response.status_code
+        return response
+
+    @app.teardown_request
+    def finish_request_trace(exc):
+        trace = g.pop('trace', None)
+        if trace is None:
+            return
+        try:
+            finish_trace(*trace, status_code=g.pop('trace_status', 500), error=exc)
+        except Exception:
+            app.logger.exception('Could not write request trace')
@@ -4,11 +4,19 @@ Better Jira Generator - Web Application
 A web interface for the Better Jira Generator chatbot.
 """
 
+import atexit
+import codecs
 import json
+import math
 import os
+import queue
+import re
 import hashlib
 import secrets
-from datetime import datetime
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
 from pathlib import Path
 from flask import (
     Flask,
@@ -20,27 +28,80 @@ from flask import (
     get_flashed_messages,
     session,
     jsonify,
+    send_file,
+    stream_with_context,
 )
 from flask_sqlalchemy import SQLAlchemy
 from functools import wraps
 from dotenv import load_dotenv
+from werkzeug.utils import secure_filename
+from markupsafe import escape
+from sqlalchemy import text
+from sqlalchemy.exc import IntegrityError
+
+import bulk_export
+import cli_store
+import compression
+import db_config
+import jira_push
+import metrics
+import profiling
+import quotas
+import revisions
+import sections
+import structured_tickets
+import token_budget
+import tracing
+from markdown_renderer import RenderCache
+from metrics import time_file_io
+from static_assets import StaticAssets
 
 # Load environment variables
 load_dotenv()
 
 app = Flask(__name__)
 app.secret_key = os.environ.get('FLASK_SECRET_KEY', 'change-this-for-local-testing')
-app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL', 'sqlite:///app.db')
+db_config.configure(app)
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 
 # Set Flask environment
 app.config['ENV'] = os.environ.get('FLASK_ENV', 'development')
 
 db = SQLAlchemy(app)
+# WAL, busy_timeout and friends on SQLite so concurrent workers do not fail with "database is locked"
+db_config.init_app(app, db)
+metrics.init_app(app)
+profiling.init_app(app)
+tracing.init_app(app)
+compression.init_app(app)
+
+# Fingerprinted /assets URLs for static/, linked from templates with asset_url()
+static_assets = StaticAssets()
+static_assets.init_app(app)
 
 DATA_EXPORTS_PATH = Path('data_exports.json')
 SAVED_SESSION_PATH = Path('saved_session.json')
 
+# Saved sessions shown per page on /saved_sessions
+SAVED_SESSIONS_PAGE_SIZE = int(os.environ.get('SAVED_SESSIONS_PAGE_SIZE', 20))
+
+# Rendered markdown for history_detail, keyed by the export file's content hash
+render_cache = RenderCache(
+    os.environ.get('RENDER_CACHE_DIR', 'render_cache'),
+    max_entries=int(os.environ.get('RENDER_CACHE_SIZE', 128)),
+)
+
+# Heading paths and byte ranges of export sections, reparsed only when a file changes
+section_index = sections.SectionIndex(max_entries=int(os.environ.get('SECTION_INDEX_SIZE', 256)))
+
+# Every Nth export revision is stored in full, the rest as deltas against the previous one
+REVISION_SNAPSHOT_INTERVAL = int(os.environ.get('REVISION_SNAPSHOT_INTERVAL', 10))
+# Times a revision is renumbered when concurrent writers take its number first
+REVISION_NUMBER_RETRIES = 5
+
+# history_detail and the content API serve export files in pages of roughly this many bytes
+EXPORT_PAGE_SIZE = int(os.environ.get('EXPORT_PAGE_SIZE', 64 * 1024))
+
 
 class User(db.Model):
     __tablename__ = 'users'
@@ -75,6 +136,16 @@ class Export(db.Model):
     deleted_at = db.Column(db.DateTime, nullable=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     user = db.relationship('User', backref='exports')
+    # The other role's document when both were generated together
+    linked_export_id = db.Column(db.Integer, db.ForeignKey('exports.id'), nullable=True)
+    # Prefix of the idempotency keys of this export's Jira issues, and JSON {idempotency key: issue key}
+    jira_push_key = db.Column(db.String(32), nullable=True)
+    jira_issues = db.Column(db.Text, nullable=True)
+    # Generated in structured mode, so revisions keep its export_tickets rows in sync
+    is_structured = db.Column(db.Boolean, nullable=True, default=False)
+
+    # History listings (web and CLI) filter by owner and deletion and sort by date
+    __table_args__ = (db.Index('ix_exports_user_deleted_date', 'user_id', 'is_deleted', 'date'),)
 
     def to_dict(self):
         return {
@@ -87,6 +158,169 @@ class Export(db.Model):
             'file_path': self.file_path,
             'action': self.action,
             'created_at': self.created_at.isoformat() if self.created_at else None,
+            'linked_export_id': self.linked_export_id,
+        }
+
+
+class LLMCall(db.Model):
+    __tablename__ = 'llm_calls'
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True, index=True)
+    export_id = db.Column(db.Integer, db.ForeignKey('exports.id'), nullable=True)
+    repository = db.Column(db.String(500), index=True)
+    model = db.Column(db.String(100), nullable=False)
+    prompt_tokens = db.Column(db.Integer)
+    completion_tokens = db.Column(db.Integer)
+    queue_time = db.Column(db.Float)
+    time_to_first_token = db.Column(db.Float)
+    latency = db.Column(db.Float, nullable=False)
+    outcome = db.Column(db.String(20), nullable=False)
+    error = db.Column(db.String(255))
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'user_id': self.user_id,
+            'export_id': self.export_id,
+            'repository': self.repository,
+            'model': self.model,
+            'prompt_tokens': self.prompt_tokens,
+            'completion_tokens': self.completion_tokens,
+            'queue_time': self.queue_time,
+            'time_to_first_token': self.time_to_first_token,
+            'latency': self.latency,
+            'outcome': self.outcome,
+            'error': self.error,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+        }
+
+
+class QuotaBucket(db.Model):
+    __tablename__ = 'quota_buckets'
+
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    kind = db.Column(db.String(20), primary_key=True)
+    level = db.Column(db.Float, nullable=False)
+    # Unix time of the last update; the bucket refills from here
+    updated_at = db.Column(db.Float, nullable=False)
+
+
+class ExportRevision(db.Model):
+    __tablename__ = 'export_revisions'
+    __table_args__ = (db.UniqueConstraint('export_id', 'number', name='uq_export_revision_number'),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    export_id = db.Column(db.Integer, db.ForeignKey('exports.id'), nullable=False, index=True)
+    number = db.Column(db.Integer, nullable=False)
+    is_snapshot = db.Column(db.Boolean, nullable=False, default=False)
+    data = db.Column(db.LargeBinary, nullable=False)
+    content_hash = db.Column(db.String(64), nullable=False)
+    size = db.Column(db.Integer, nullable=False)
+    message = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            'number': self.number,
+            'is_snapshot': self.is_snapshot,
+            'content_hash': self.content_hash,
+            'size': self.size,
+            'stored_bytes': len(self.data),
+            'message': self.message,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+        }
+
+
+class ExportTicket(db.Model):
+    """One Jira ticket of an export generated in structured (JSON) mode."""
+    __tablename__ = 'export_tickets'
+    __table_args__ = (db.UniqueConstraint('export_id', 'position', name='uq_export_ticket_position'),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    export_id = db.Column(db.Integer, db.ForeignKey('exports.id'), nullable=False, index=True)
+    position = db.Column(db.Integer, nullable=False)
+    summary = db.Column(db.String(255), nullable=False, index=True)
+    description = db.Column(db.Text)
+    # JSON lists of strings
+    acceptance_criteria = db.Column(db.Text, nullable=False, default='[]')
+    technical_requirements = db.Column(db.Text, nullable=False, default='[]')
+    story_points = db.Column(db.Integer, nullable=True, index=True)
+    labels = db.relationship('TicketLabel', cascade='all, delete-orphan', lazy='selectin')
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'export_id': self.export_id,
+            'position': self.position,
+            'summary': self.summary,
+            'description': self.description,
+            'acceptance_criteria': json.loads(self.acceptance_criteria or '[]'),
+            'technical_requirements': json.loads(self.technical_requirements or '[]'),
+            'labels': sorted(label.label for label in self.labels),
+            'story_points': self.story_points,
+        }
+
+
+class TicketLabel(db.Model):
+    __tablename__ = 'ticket_labels'
+
+    ticket_id = db.Column(db.Integer, db.ForeignKey('export_tickets.id'), primary_key=True)
+    # Filtering tickets by label is an index lookup
+    label = db.Column(db.String(100), primary_key=True, index=True)
+
+
+class ArchivedExport(db.Model):
+    """Soft-deleted exports moved out of `exports` by purge.py."""
+    __tablename__ = 'archived_exports'
+
+    id = db.Column(db.Integer, primary_key=True)
+    # The id the export had; SQLite may hand it to a new export once the row is gone
+    export_id = db.Column(db.Integer, nullable=False, index=True)
+    filename = db.Column(db.String(255), nullable=False)
+    original_name = db.Column(db.String(255))
+    date = db.Column(db.DateTime, nullable=False)
+    user_type = db.Column(db.String(100))
+    repository = db.Column(db.String(500))
+    action = db.Column(db.String(100))
+    created_at = db.Column(db.DateTime, nullable=False)
+    deleted_at = db.Column(db.DateTime, nullable=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
+    linked_export_id = db.Column(db.Integer, nullable=True)
+    jira_issues = db.Column(db.Text, nullable=True)
+    # Where the export file was, and its gzipped copy under ARCHIVE_FOLDER_PATH (None when it was missing)
+    file_path = db.Column(db.String(1024))
+    archive_path = db.Column(db.String(1024))
+    file_size = db.Column(db.Integer)
+    archived_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+
+class SavedSession(db.Model):
+    """A chat setup (role, repository, task file) that can be resumed from /saved_sessions."""
+    __tablename__ = 'saved_sessions'
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    role = db.Column(db.String(100))
+    repository = db.Column(db.String(500), index=True)
+    # JSON task file info as the CLI stores it: name, filename, path, ...
+    file_info = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    last_used_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    # The sessions page lists a user's sessions, most recently used first, one page at a time
+    __table_args__ = (db.Index('ix_saved_sessions_user_last_used', 'user_id', 'last_used_at', 'id'),)
+
+    def to_dict(self):
+        file_info = json.loads(self.file_info) if self.file_info else None
+        return {
+            'id': self.id,
+            'role': self.role,
+            'repository': self.repository,
+            'file_info': file_info if isinstance(file_info, dict) else None,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'timestamp': self.last_used_at.isoformat() if self.last_used_at else None,
         }
 
 
@@ -116,10 +350,190 @@ def login_required(f):
     return decorated_function
 
 
+def admin_usernames():
+    """Usernames listed in the comma-separated ADMIN_USERNAMES environment variable."""
+    return {name.strip() for name in os.environ.get('ADMIN_USERNAMES', '').split(',') if name.strip()}
+
+
+def is_admin():
+    """Whether the logged-in user is an administrator."""
+    return session.get('username') in admin_usernames()
+
+
+def admin_required(f):
+    """Decorator to require an administrator for routes."""
+    @wraps(f)
+    @login_required
+    def decorated_function(*args, **kwargs):
+        if not is_admin():
+            flash('You do not have access to that page.', 'error')
+            return redirect(url_for('items'))
+        return f(*args, **kwargs)
+    return decorated_function
+
+
+def add_missing_columns():
+    """
+    create_all does not alter existing tables, so add any model columns
+    introduced since a table was created. New columns must be nullable.
+    """
+    inspector = db.inspect(db.engine)
+    for table in db.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {column['name'] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name not in existing:
+                column_type = column.type.compile(dialect=db.engine.dialect)
+                db.session.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'))
+    db.session.commit()
+
+
 def init_db():
     """Initialize database tables."""
     with app.app_context():
         db.create_all()
+        add_missing_columns()
+        # create_all skips tables that already exist, so add indexes introduced since
+        for index in Export.__table__.indexes:
+            index.create(db.engine, checkfirst=True)
+        # Exports structured before is_structured existed are the ones with ticket rows
+        db.session.execute(text(
+            'UPDATE exports SET is_structured = :flag WHERE is_structured IS NULL '
+            'AND id IN (SELECT export_id FROM export_tickets)'
+        ), {'flag': True})
+        db.session.commit()
+        init_search_index()
+
+
+def search_index_enabled():
+    """Full-text search uses SQLite FTS5, so it is only available on SQLite databases."""
+    return db.engine.dialect.name == 'sqlite'
+
+
+def init_search_index():
+    """Create the FTS5 table holding export titles, repositories and file contents."""
+    if not search_index_enabled():
+        return
+    db.session.execute(text(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS exports_fts USING fts5("
+        "title, repository, body, user_id UNINDEXED, tokenize='porter unicode61')"
+    ))
+    db.session.commit()
+
+
+def index_export_content(export, content=None):
+    """Add or replace an export in the search index. Reads the file if no content is given."""
+    if not search_index_enabled() or not export.id:
+        return
+
+    if content is None:
+        file_path = export.file_path or ''
+        if not file_path or not Path(file_path).exists():
+            return
+        try:
+            with time_file_io('read'), open(file_path, 'r', encoding='utf-8') as f:
+                content = f.read()
+        except Exception:
+            return
+
+    # The FTS rowid is the export id, so replacing an entry is a primary key lookup
+    db.session.execute(text('DELETE FROM exports_fts WHERE rowid = :id'), {'id': export.id})
+    db.session.execute(
+        text(
+            'INSERT INTO exports_fts (rowid, title, repository, body, user_id) '
+            'VALUES (:id, :title, :repository, :body, :user_id)'
+        ),
+        {
+            'id': export.id,
+            'title': export.original_name or export.filename,
+            'repository': export.repository or '',
+            'body': content,
+            'user_id': export.user_id,
+        },
+    )
+    db.session.commit()
+
+
+def remove_export_from_index(export_id):
+    """Drop an export from the search index."""
+    if not search_index_enabled():
+        return
+    db.session.execute(text('DELETE FROM exports_fts WHERE rowid = :id'), {'id': export_id})
+    db.session.commit()
+
+
+def sync_search_index():
+    """Index exports that are not in the search index yet (e.g. records migrated from the CLI)."""
+    with app.app_context():
+        if not search_index_enabled():
+            return
+        indexed_ids = {row[0] for row in db.session.execute(text('SELECT rowid FROM exports_fts'))}
+        for export in Export.query.filter_by(is_deleted=False).all():
+            if export.id not in indexed_ids:
+                index_export_content(export)
+
+
+def build_search_query(query):
+    """Turn free text into an FTS5 query: every word must match, as a prefix."""
+    terms = re.findall(r'\w+', query or '')
+    return ' '.join(f'"{term}"*' for term in terms)
+
+
+SNIPPET_START = '\x02'
+SNIPPET_END = '\x03'
+
+
+def highlight_snippet(snippet):
+    """Escape a raw FTS5 snippet and turn its match markers into <mark> tags."""
+    html = str(escape(snippet or ''))
+    return html.replace(SNIPPET_START, '<mark>').replace(SNIPPET_END, '</mark>')
+
+
+def search_exports(user_id, query, limit=20):
+    """Search a user's exports, best matches first. Returns (export, snippet_html, score) tuples."""
+    match = build_search_query(query)
+    if not match:
+        return []
+
+    if not search_index_enabled():
+        # Without FTS5 fall back to matching the title and repository only
+        pattern = f'%{query.strip()}%'
+        exports = Export.query.filter(
+            Export.user_id == user_id,
+            Export.is_deleted == False,  # noqa: E712
+            db.or_(
+                Export.original_name.ilike(pattern),
+                Export.filename.ilike(pattern),
+                Export.repository.ilike(pattern),
+            ),
+        ).order_by(Export.created_at.desc()).limit(limit).all()
+        return [(export, '', None) for export in exports]
+
+    rows = db.session.execute(
+        text(
+            'SELECT exports_fts.rowid, '
+            "snippet(exports_fts, 2, :start, :end, '…', 16) AS snippet, "
+            'bm25(exports_fts, 10.0, 5.0, 1.0) AS score '
+            'FROM exports_fts JOIN exports ON exports.id = exports_fts.rowid '
+            'WHERE exports_fts MATCH :match AND exports.user_id = :user_id AND exports.is_deleted = 0 '
+            'ORDER BY score LIMIT :limit'
+        ),
+        {
+            'start': SNIPPET_START,
+            'end': SNIPPET_END,
+            'match': match,
+            'user_id': user_id,
+            'limit': limit,
+        },
+    ).all()
+
+    exports = {export.id: export for export in Export.query.filter(Export.id.in_([row[0] for row in rows])).all()}
+    return [
+        (exports[row[0]], highlight_snippet(row[1]), row[2])
+        for row in rows
+        if row[0] in exports
+    ]
 
 
 def migrate_json_to_db():
@@ -156,6 +570,9 @@ def migrate_json_to_db():
             if not demo_pm:
                 return
 
+            # data_exports.json is written by the CLI when offline, so its entries belong to the CLI's user
+            owner = User.query.filter_by(username=cli_store.cli_username()).first() or demo_pm
+
             # Migrate existing exports if data_exports.json exists
             if DATA_EXPORTS_PATH.exists():
                 try:
@@ -183,7 +600,7 @@ def migrate_json_to_db():
                             action=item.get('action'),
                             is_deleted=False,
                             deleted_at=None,
-                            user_id=demo_pm.id,  # Assign to demo-pm user
+                            user_id=owner.id,
                         )
                         db.session.add(export_record)
                     except Exception as e:
@@ -200,6 +617,7 @@ def migrate_json_to_db():
 # Initialize database and migrate data when module is imported
 init_db()
 migrate_json_to_db()
+sync_search_index()
 
 
 def load_json_file(path, default):
@@ -213,28 +631,486 @@ def load_json_file(path, default):
         return default
 
 
-def save_json_file(path, data):
-    with open(path, 'w') as f:
-        json.dump(data, f, indent=2)
+def saved_session_entries(session_data):
+    """The sessions of a saved_session.json document: its `sessions` list, or the document itself."""
+    sessions = session_data.get('sessions')
+    if isinstance(sessions, list) and sessions:
+        return [entry for entry in sessions if isinstance(entry, dict)]
 
+    if session_data.get('role'):
+        return [session_data]
 
-def load_session_data():
-    return load_json_file(SAVED_SESSION_PATH, {})
+    return []
 
 
-def save_session_data(data):
-    save_json_file(SAVED_SESSION_PATH, data)
+def parse_timestamp(value):
+    try:
+        return datetime.fromisoformat(value) if value else None
+    except (TypeError, ValueError):
+        return None
+
+
+def record_saved_session(user_id, role, repository, file_info=None, timestamp=None):
+    """
+    Add a resumable session for a user. A session with the same role,
+    repository and timestamp is only recorded once, so the CLI's
+    saved_session.json can be imported again without duplicating it.
+    """
+    created_at = parse_timestamp(timestamp) or datetime.utcnow()
+    existing = SavedSession.query.filter_by(
+        user_id=user_id, role=role, repository=repository, created_at=created_at
+    ).first()
+    if existing:
+        return existing
+
+    saved = SavedSession(
+        user_id=user_id,
+        role=role,
+        repository=repository,
+        file_info=json.dumps(file_info) if isinstance(file_info, dict) else None,
+        created_at=created_at,
+        last_used_at=created_at,
+    )
+    db.session.add(saved)
+    db.session.commit()
+    return saved
 
 
-def get_saved_sessions(session_data):
-    sessions = session_data.get('sessions')
-    if isinstance(sessions, list) and sessions:
-        return sessions
+def migrate_saved_sessions():
+    """Import the sessions in saved_session.json, which the CLI writes, for the CLI's user."""
+    session_data = load_json_file(SAVED_SESSION_PATH, {})
+    entries = saved_session_entries(session_data) if isinstance(session_data, dict) else []
+    if not entries:
+        return
 
-    if session_data.get('role'):
-        return [session_data]
+    with app.app_context():
+        try:
+            owner = User.query.filter_by(username=cli_store.cli_username()).first()
+            if not owner:
+                return
+            for entry in entries:
+                if entry.get('role'):
+                    record_saved_session(
+                        owner.id, entry.get('role'), entry.get('repository'), entry.get('file_info'), entry.get('timestamp')
+                    )
+        except Exception:
+            db.session.rollback()
 
-    return []
+
+def get_saved_sessions_page(user_id, before=None, limit=SAVED_SESSIONS_PAGE_SIZE):
+    """
+    One page of a user's saved sessions, most recently used first, and the
+    (last_used_at, id) cursor of the next page (None on the last page).
+    Pages continue from the cursor instead of an offset, so later pages
+    cost the same index range scan as the first.
+    """
+    query = SavedSession.query.filter(SavedSession.user_id == user_id)
+    if before:
+        last_used_at, session_id = before
+        query = query.filter(db.or_(
+            SavedSession.last_used_at < last_used_at,
+            db.and_(SavedSession.last_used_at == last_used_at, SavedSession.id < session_id),
+        ))
+
+    rows = query.order_by(SavedSession.last_used_at.desc(), SavedSession.id.desc()).limit(limit + 1).all()
+    next_cursor = (rows[limit - 1].last_used_at, rows[limit - 1].id) if len(rows) > limit else None
+    return rows[:limit], next_cursor
+
+
+def get_current_saved_session(user_id, session_id):
+    """The saved session a user chose on /saved_sessions, as a dict, or None."""
+    if not session_id:
+        return None
+    saved = SavedSession.query.filter_by(id=session_id, user_id=user_id).first()
+    return saved.to_dict() if saved else None
+
+
+# The CLI keeps writing saved_session.json, so pick up its sessions whenever the app starts
+migrate_saved_sessions()
+
+
+def read_export_page(file_path, offset=0, limit=EXPORT_PAGE_SIZE):
+    """
+    Read one page of an export file without loading the rest of it.
+
+    Pages are extended to the end of the current line, by at most another
+    `limit` bytes; a longer line is continued on the next page. Pages never
+    split a multi-byte character. Returns (text, next_offset, total_size),
+    where next_offset is None on the last page.
+    """
+    total_size = os.path.getsize(file_path)
+    offset = min(max(offset, 0), total_size)
+    # Room for a whole UTF-8 character, so a page always moves forward
+    limit = max(limit, 4)
+
+    with time_file_io('read'), open(file_path, 'rb') as f:
+        f.seek(offset)
+        chunk = f.read(limit)
+        if chunk and not chunk.endswith(b'\n'):
+            chunk += f.readline(limit)
+            if not chunk.endswith(b'\n') and f.tell() < total_size:
+                decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+                decoder.decode(chunk)
+                pending = len(decoder.getstate()[0])
+                if pending:
+                    chunk = chunk[:-pending]
+
+    next_offset = offset + len(chunk)
+    if next_offset >= total_size:
+        next_offset = None
+    return chunk.decode('utf-8', errors='replace'), next_offset, total_size
+
+
+# LLM calls are written to llm_calls by a background thread so requests never wait on the insert
+llm_call_queue = queue.Queue()
+llm_call_writer = None
+llm_call_writer_lock = threading.Lock()
+LLM_CALL_BATCH_SIZE = 50
+
+
+def record_llm_usage(record):
+    """LLM_CALL_HOOKS callback: queue a call for the usage ledger."""
+    global llm_call_writer
+
+    context = record.get('context') or {}
+    llm_call_queue.put({
+        'user_id': context.get('user_id'),
+        'export_id': context.get('export_id'),
+        'repository': context.get('repository'),
+        'model': record['model'],
+        'prompt_tokens': record.get('prompt_tokens'),
+        'completion_tokens': record.get('completion_tokens'),
+        'queue_time': record.get('queue_time'),
+        'time_to_first_token': record.get('time_to_first_token'),
+        'latency': record['duration'],
+        'outcome': record['outcome'],
+        'error': record.get('error'),
+        'created_at': datetime.utcnow(),
+    })
+
+    # Started on first use so each gunicorn worker gets its own thread after forking
+    if llm_call_writer is None or not llm_call_writer.is_alive():
+        with llm_call_writer_lock:
+            if llm_call_writer is None or not llm_call_writer.is_alive():
+                llm_call_writer = threading.Thread(target=write_llm_calls_forever, daemon=True)
+                llm_call_writer.start()
+
+
+def write_llm_calls(rows):
+    """Insert a batch of queued LLM calls into llm_calls and charge their tokens to user quotas."""
+    with app.app_context():
+        try:
+            db.session.bulk_insert_mappings(LLMCall, rows)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+
+        tokens_by_user = {}
+        for row in rows:
+            tokens = (row.get('prompt_tokens') or 0) + (row.get('completion_tokens') or 0)
+            if row.get('user_id') and tokens:
+                tokens_by_user[row['user_id']] = tokens_by_user.get(row['user_id'], 0) + tokens
+        try:
+            for user_id, tokens in tokens_by_user.items():
+                take_quota(user_id, 'tokens', cost=tokens)
+        except Exception:
+            db.session.rollback()
+
+
+def flush_llm_calls():
+    """Write every queued LLM call now. Returns the number of calls written."""
+    rows = []
+    while True:
+        try:
+            rows.append(llm_call_queue.get_nowait())
+        except queue.Empty:
+            break
+    if rows:
+        write_llm_calls(rows)
+    return len(rows)
+
+
+def write_llm_calls_forever():
+    """Background thread: wait for queued calls and insert them in batches."""
+    while True:
+        rows = [llm_call_queue.get()]
+        while len(rows) < LLM_CALL_BATCH_SIZE:
+            try:
+                rows.append(llm_call_queue.get_nowait())
+            except queue.Empty:
+                break
+        write_llm_calls(rows)
+
+
+atexit.register(flush_llm_calls)
+
+# Record every LLM call made by the web app in the usage ledger
+try:
+    from main import LLM_CALL_HOOKS
+    if record_llm_usage not in LLM_CALL_HOOKS:
+        LLM_CALL_HOOKS.append(record_llm_usage)
+except ImportError:
+    pass
+
+
+def load_llm_call_history(limit=500):
+    """Recent successful calls as (model, prompt_tokens, completion_tokens, latency), for latency estimates."""
+    with app.app_context():
+        return db.session.query(
+            LLMCall.model, LLMCall.prompt_tokens, LLMCall.completion_tokens, LLMCall.latency
+        ).filter(
+            LLMCall.outcome == 'success',
+            LLMCall.completion_tokens.isnot(None),
+        ).order_by(LLMCall.id.desc()).limit(limit).all()
+
+
+token_budget.history_source = load_llm_call_history
+
+
+# Bucket level after refilling since updated_at, capped at the limit, in SQL
+QUOTA_LEVEL_SQL = (
+    'CASE WHEN level + (:now - updated_at) * :rate > :limit THEN :limit '
+    'ELSE level + (:now - updated_at) * :rate END'
+)
+
+
+def take_quota(user_id, kind, cost=1, needed=None):
+    """
+    Take `cost` units from a user's quota bucket. When `needed` is given the
+    bucket must hold at least that much first, otherwise QuotaExceeded is
+    raised; without it the charge always applies and may leave a debt.
+    The check and the charge are one UPDATE, so concurrent workers cannot
+    both spend the last unit.
+    """
+    limit = quotas.quota_limits()[kind]
+    if limit is None:
+        return
+
+    now = time.time()
+    params = {'user_id': user_id, 'kind': kind, 'now': now, 'limit': float(limit),
+              'rate': quotas.refill_rate(limit), 'cost': cost, 'needed': needed}
+    db.session.execute(text(
+        'INSERT INTO quota_buckets (user_id, kind, level, updated_at) '
+        'VALUES (:user_id, :kind, :limit, :now) ON CONFLICT DO NOTHING'
+    ), params)
+    condition = f' AND {QUOTA_LEVEL_SQL} >= :needed' if needed is not None else ''
+    result = db.session.execute(text(
+        f'UPDATE quota_buckets SET level = {QUOTA_LEVEL_SQL} - :cost, updated_at = :now '
+        f'WHERE user_id = :user_id AND kind = :kind{condition}'
+    ), params)
+    db.session.commit()
+    if result.rowcount:
+        return
+
+    bucket = db.session.get(QuotaBucket, (user_id, kind))
+    level = quotas.current_level(bucket.level, bucket.updated_at, now, limit)
+    raise quotas.QuotaExceeded(kind, quotas.seconds_until(level, needed, limit), limit)
+
+
+def enforce_llm_quota(user_id, calls=1):
+    """Take `calls` LLM requests from a user's quota, or raise QuotaExceeded."""
+    # Tokens are charged after each call, so only check that none are owed
+    take_quota(user_id, 'tokens', cost=0, needed=quotas.REQUIRED_LEVEL['tokens'])
+    take_quota(user_id, 'requests', cost=calls, needed=calls)
+
+
+def quota_status(user_id):
+    """Limit, remaining units and seconds until usable/full for each of a user's quotas."""
+    now = time.time()
+    limits = quotas.quota_limits()
+    buckets = {bucket.kind: bucket for bucket in QuotaBucket.query.filter_by(user_id=user_id).all()}
+    status = {'window_seconds': quotas.window_seconds(), 'window': quotas.describe_window(quotas.window_seconds())}
+    for kind in quotas.QUOTA_KINDS:
+        limit = limits[kind]
+        if limit is None:
+            status[kind] = {'limit': None}
+            continue
+        bucket = buckets.get(kind)
+        level = quotas.current_level(bucket.level, bucket.updated_at, now, limit) if bucket else float(limit)
+        status[kind] = {
+            'limit': limit,
+            'remaining': math.floor(level),
+            'retry_after': math.ceil(quotas.seconds_until(level, quotas.REQUIRED_LEVEL[kind], limit)),
+            'full_in': math.ceil(quotas.seconds_until(level, limit, limit)),
+        }
+    return status
+
+
+def quota_exceeded_response(error, api=False):
+    """429 response for a QuotaExceeded error: JSON for the API, a page otherwise."""
+    if api:
+        response = jsonify({'error': str(error), 'quota': error.kind, 'retry_after': math.ceil(error.retry_after)})
+    else:
+        response = app.response_class(render_template(
+            'quota_exceeded.html', message=str(error), back_url=request.referrer or url_for('items')
+        ))
+    response.status_code = 429
+    response.headers['Retry-After'] = quotas.retry_after_header(error.retry_after)
+    return response
+
+
+@app.errorhandler(quotas.QuotaExceeded)
+def handle_quota_exceeded(error):
+    return quota_exceeded_response(error, api=request.path.startswith('/api/'))
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    rank = math.ceil(pct / 100 * len(sorted_values))
+    return sorted_values[min(max(rank, 1), len(sorted_values)) - 1]
+
+
+def summarize_llm_calls(filters, key=None):
+    """
+    Counts, token totals and latency percentiles of the LLM calls matching
+    `filters`, as {group key: summary} for a `key` column, or {None: summary}
+    without one. Totals are SUM/COUNT in SQL and the percentiles are picked
+    by rank within each group, so only a few rows per group are read.
+    """
+    group = key if key is not None else db.literal(None)
+    totals = db.session.query(
+        group.label('key'),
+        db.func.count(LLMCall.id),
+        db.func.coalesce(db.func.sum(db.case((LLMCall.outcome != 'success', 1), else_=0)), 0),
+        db.func.coalesce(db.func.sum(LLMCall.prompt_tokens), 0),
+        db.func.coalesce(db.func.sum(LLMCall.completion_tokens), 0),
+    ).filter(*filters)
+    if key is not None:
+        totals = totals.group_by(key)
+
+    summaries = {
+        name: {
+            'calls': calls,
+            'errors': errors,
+            'prompt_tokens': prompt_tokens,
+            'completion_tokens': completion_tokens,
+            'latency_p50': None,
+            'latency_p95': None,
+            'latency_p99': None,
+        }
+        for name, calls, errors, prompt_tokens, completion_tokens in totals.all()
+    }
+
+    partition = {'partition_by': key} if key is not None else {}
+    ranked = db.session.query(
+        group.label('key'),
+        LLMCall.latency.label('latency'),
+        db.func.row_number().over(order_by=LLMCall.latency, **partition).label('rank'),
+        db.func.count().over(**partition).label('total'),
+    ).filter(*filters).subquery()
+    # Nearest rank, ceil(pct / 100 * total), in integer arithmetic
+    ranks = {pct: (pct * ranked.c.total + 99) // 100 for pct in (50, 95, 99)}
+    picked = db.session.query(ranked.c.key, ranked.c.latency, ranked.c.rank, ranked.c.total).filter(
+        db.or_(*(ranked.c.rank == rank for rank in ranks.values()))
+    )
+    for name, latency, rank, total in picked.all():
+        for pct in ranks:
+            if rank == (pct * total + 99) // 100:
+                summaries[name][f'latency_p{pct}'] = latency
+    return summaries
+
+
+def get_usage_report(days=30, user_id=None):
+    """
+    Summarize LLM usage over the last `days` days, overall and grouped by repository and model.
+    Without a user_id the report covers every user and is also grouped by user.
+    """
+    since = datetime.utcnow() - timedelta(days=days)
+    filters = [LLMCall.created_at >= since]
+    if user_id is not None:
+        filters.append(LLMCall.user_id == user_id)
+
+    def grouped(key):
+        rows = [{'key': name, **summary} for name, summary in summarize_llm_calls(filters, key).items()]
+        return sorted(rows, key=lambda row: row['prompt_tokens'] + row['completion_tokens'], reverse=True)
+
+    report = {
+        'days': days,
+        'overall': summarize_llm_calls(filters)[None],
+        'by_repository': grouped(db.func.coalesce(LLMCall.repository, '')),
+        'by_model': grouped(LLMCall.model),
+    }
+    if user_id is None:
+        usernames = dict(db.session.query(User.id, User.username).all())
+        report['by_user'] = [
+            {**row, 'key': usernames.get(row['key'], 'CLI / unknown')}
+            for row in grouped(LLMCall.user_id)
+        ]
+    return report
+
+
+def get_revision_content(export_id, number):
+    """Rebuild the text of one export revision from the nearest snapshot at or before it."""
+    snapshot_number = db.session.query(db.func.max(ExportRevision.number)).filter(
+        ExportRevision.export_id == export_id,
+        ExportRevision.is_snapshot == True,  # noqa: E712
+        ExportRevision.number <= number,
+    ).scalar()
+    if snapshot_number is None:
+        return None
+
+    chain = ExportRevision.query.filter(
+        ExportRevision.export_id == export_id,
+        ExportRevision.number >= snapshot_number,
+        ExportRevision.number <= number,
+    ).order_by(ExportRevision.number).all()
+    if not chain or chain[-1].number != number:
+        return None
+    return revisions.rebuild(chain)
+
+
+def record_revision(export, content, previous_content=None, message=None):
+    """
+    Store `content` as the next revision of an export. Pass the previous
+    revision's text when known to avoid rebuilding it. Unchanged content
+    is not stored again. When another worker takes the same revision
+    number first, the unique constraint rejects this one and it is
+    renumbered after theirs.
+    """
+    export_id = export.id
+    content_hash = hashlib.sha256(content.encode('utf-8')).hexdigest()
+    for attempt in range(REVISION_NUMBER_RETRIES):
+        latest = ExportRevision.query.filter_by(export_id=export_id).order_by(ExportRevision.number.desc()).first()
+        if latest and latest.content_hash == content_hash:
+            return latest
+
+        number = latest.number + 1 if latest else 1
+        if latest is None or (number - 1) % REVISION_SNAPSHOT_INTERVAL == 0:
+            is_snapshot, data = True, revisions.pack_snapshot(content)
+        else:
+            if previous_content is None or hashlib.sha256(previous_content.encode('utf-8')).hexdigest() != latest.content_hash:
+                previous_content = get_revision_content(export_id, latest.number)
+            is_snapshot, data = False, revisions.pack_delta(revisions.make_delta(previous_content, content))
+
+        revision = ExportRevision(
+            export_id=export_id,
+            number=number,
+            is_snapshot=is_snapshot,
+            data=data,
+            content_hash=content_hash,
+            size=len(content.encode('utf-8')),
+            message=message,
+        )
+        db.session.add(revision)
+        try:
+            db.session.commit()
+            return revision
+        except IntegrityError:
+            db.session.rollback()
+            if attempt == REVISION_NUMBER_RETRIES - 1:
+                raise
+
+
+def record_current_revision(export, content):
+    """
+    Make sure the file's current content is the latest revision before it is
+    overwritten. Covers exports created before revisions existed and files
+    edited outside the app.
+    """
+    has_revisions = ExportRevision.query.filter_by(export_id=export.id).first() is not None
+    record_revision(export, content, message='Changed outside the app' if has_revisions else 'Original version')
 
 
 def get_history_entries():
@@ -349,23 +1225,46 @@ def items():
     with app.app_context():
         exports = Export.query.filter_by(user_id=session['user_id'], is_deleted=False).all()
         history_count = len(get_history_entries())
-        return render_template('items.html', exports=exports, history_count=history_count)
+        query = request.args.get('q', '').strip()
+        results = search_exports(session['user_id'], query) if query else []
+        return render_template(
+            'items.html',
+            exports=exports,
+            history_count=history_count,
+            query=query,
+            results=results,
+        )
 
 
 @app.route('/saved_sessions', methods=['GET'])
 @login_required
 def saved_sessions():
-    session_data = load_session_data()
-    sessions = get_saved_sessions(session_data)
+    before = None
+    if request.args.get('before') and request.args.get('before_id'):
+        try:
+            before = (datetime.fromisoformat(request.args['before']), int(request.args['before_id']))
+        except ValueError:
+            flash('Invalid page. Showing your most recent sessions.', 'error')
+            return redirect(url_for('saved_sessions'))
+
+    rows, next_cursor = get_saved_sessions_page(session['user_id'], before)
+    sessions = [saved.to_dict() for saved in rows]
+    next_page = url_for(
+        'saved_sessions', before=next_cursor[0].isoformat(), before_id=next_cursor[1]
+    ) if next_cursor else None
     messages = get_flashed_messages(with_categories=True)
-    return render_template('saved_sessions.html', sessions=sessions, messages=messages)
+    return render_template(
+        'saved_sessions.html',
+        sessions=sessions,
+        next_page=next_page,
+        first_page=before is None,
+        messages=messages,
+    )
 
 
 @app.route('/saved_sessions', methods=['POST'])
 @login_required
 def choose_saved_session():
-    session_data = load_session_data()
-    sessions = get_saved_sessions(session_data)
     choice = request.form.get('selection', 'new_chat')
 
     if choice == 'new_chat':
@@ -373,28 +1272,24 @@ def choose_saved_session():
             'role': '',
             'repository': '',
             'file_info': None,
-            'timestamp': datetime.utcnow().isoformat(),
-            'type': 'new_chat',
         }
+        session.pop('saved_session_id', None)
+        session['chat_type'] = 'new_chat'
         action = 'new_chat'
     else:
         try:
-            index = int(choice)
-            selected = sessions[index]
-            selected = {**selected}
-            selected['timestamp'] = datetime.utcnow().isoformat()
-            selected['type'] = 'saved_session'
-            action = 'resume_saved_session'
-        except (ValueError, IndexError):
+            saved = SavedSession.query.filter_by(id=int(choice), user_id=session['user_id']).first()
+        except ValueError:
+            saved = None
+        if not saved:
             flash('Invalid session selection. Please try again.', 'error')
             return redirect(url_for('saved_sessions'))
 
-    updated_session = {
-        **selected,
-        'sessions': sessions,
-    }
-
-    save_session_data(updated_session)
+        saved.last_used_at = datetime.utcnow()
+        selected = saved.to_dict()
+        session['saved_session_id'] = saved.id
+        session['chat_type'] = 'saved_session'
+        action = 'resume_saved_session'
 
     filename = f'session-{action}-{datetime.utcnow().strftime("%Y%m%d%H%M%S")}.json'
     new_export = Export(
@@ -406,10 +1301,8 @@ def choose_saved_session():
         action=action,
         user_id=session['user_id'],
     )
-
-    with app.app_context():
-        db.session.add(new_export)
-        db.session.commit()
+    db.session.add(new_export)
+    db.session.commit()
 
     flash('Session choice saved. Redirecting to chat.', 'success')
     return redirect(url_for('chat'))
@@ -418,12 +1311,16 @@ def choose_saved_session():
 @app.route('/chat', methods=['GET'])
 @login_required
 def chat():
-    session_data = load_session_data()
-    if not session_data or (not session_data.get('role') and session_data.get('type') != 'new_chat'):
-        flash('No saved session found. Please choose a saved session or start a new chat.', 'error')
-        return redirect(url_for('saved_sessions'))
+    if session.get('chat_type') == 'new_chat':
+        session_data = {'role': '', 'repository': '', 'file_info': None, 'timestamp': None}
+        session_type = 'new'
+    else:
+        session_data = get_current_saved_session(session['user_id'], session.get('saved_session_id'))
+        session_type = 'resume'
+        if not session_data:
+            flash('No saved session found. Please choose a saved session or start a new chat.', 'error')
+            return redirect(url_for('saved_sessions'))
 
-    session_type = 'new' if session_data.get('type') == 'new_chat' else 'resume'
     messages = get_flashed_messages(with_categories=True)
     return render_template('chat.html', session=session_data, session_type=session_type, messages=messages)
 
@@ -471,13 +1368,82 @@ def history_detail(entry_id):
             return redirect(url_for('history'))
 
         try:
-            with open(file_path, 'r') as f:
-                contents = f.read()
+            contents, next_offset, total_size = read_export_page(file_path)
         except Exception as e:
             flash(f'Unable to read file: {e}', 'error')
             return redirect(url_for('history'))
 
-        return render_template('history_detail.html', entry=export, contents=contents)
+        return render_template(
+            'history_detail.html',
+            entry=export,
+            contents=contents,
+            next_offset=next_offset,
+            total_size=total_size,
+            jira_issues=get_jira_issues(export),
+        )
+
+
+@app.route('/history/rendered/<int:entry_id>', methods=['GET'])
+@login_required
+def history_rendered(entry_id):
+    """
+    Serve one page of the export as sanitized HTML, starting at ?offset=
+    (the X-Next-Offset of the page before). Pages end at headings and each
+    has an ETag derived from its own bytes.
+    """
+    try:
+        offset = int(request.args.get('offset', 0))
+    except ValueError:
+        return jsonify({'error': 'offset must be an integer'}), 400
+
+    with app.app_context():
+        export = Export.query.get(entry_id)
+        if not export or export.is_deleted or export.user_id != session['user_id']:
+            return jsonify({'error': 'Item not found'}), 404
+
+        file_path = export.file_path or ''
+        if not file_path or not Path(file_path).exists():
+            return jsonify({'error': 'File not found'}), 404
+
+        with time_file_io('read'):
+            data, next_offset = section_index.read_page(file_path, offset, EXPORT_PAGE_SIZE)
+        page_hash = hashlib.sha256(data).hexdigest()
+        # Compressed responses carry a weak ETag, so compare weakly as If-None-Match requires
+        if request.if_none_match.contains_weak(page_hash):
+            response = app.response_class(status=304)
+        else:
+            response = app.response_class(render_cache.render(data, page_hash), mimetype='text/html')
+
+        response.set_etag(page_hash)
+        if next_offset is not None:
+            response.headers['X-Next-Offset'] = str(next_offset)
+        # Browsers keep the copy but revalidate it, which is a cheap 304 while the page is unchanged
+        response.headers['Cache-Control'] = 'private, no-cache'
+        return response
+
+
+@app.route('/history/raw/<int:entry_id>', methods=['GET'])
+@login_required
+def history_raw(entry_id):
+    """Serve the raw export file, with support for HTTP Range and conditional requests."""
+    with app.app_context():
+        export = Export.query.get(entry_id)
+        if not export or export.is_deleted or export.user_id != session['user_id']:
+            flash('History item not found.', 'error')
+            return redirect(url_for('history'))
+
+        file_path = export.file_path or ''
+        if not file_path or not Path(file_path).exists():
+            flash('The selected history file is missing or unavailable.', 'error')
+            return redirect(url_for('history'))
+
+        # send_file hands the open file to the server's wsgi.file_wrapper (sendfile under gunicorn)
+        return send_file(
+            os.path.abspath(file_path),
+            mimetype='text/markdown',
+            conditional=True,
+            download_name=export.filename,
+        )
 
 
 @app.route('/items/delete/<int:export_id>', methods=['POST'])
@@ -498,11 +1464,272 @@ def delete_export(export_id):
         export.is_deleted = True
         export.deleted_at = datetime.utcnow()
         db.session.commit()
+        remove_export_from_index(export.id)
 
         flash(f'Successfully deleted: {export.filename}', 'success')
         return redirect(url_for('items'))
 
 
+def build_new_chat_messages(repo_url, user_type, project_description):
+    """Build the messages asking the model for a project outline."""
+    system_prompt = f"""You are an AI assistant helping create Jira task descriptions.
+
+The codebase is at: {repo_url}
+User role: {user_type}
+
+Your task:
+1. Review the project description provided by the user
+2. Create a comprehensive, well-structured markdown document outlining the project
+3. Include sections for:
+   - Project Overview
+   - Goals and Objectives
+   - Key Features
+   - Technical Requirements
+   - Success Criteria
+4. Format the document professionally with proper markdown syntax
+5. Return ONLY the markdown content (no explanations or extra text)
+
+Be thorough, professional, and focus on clarity and completeness."""
+    
+    return [
+        {"role": "system", "content": system_prompt},
+        {
+            "role": "user",
+            "content": f"""Based on this project description, please create a comprehensive markdown document outlining the project:
+
+---PROJECT DESCRIPTION---
+{project_description}
+
+Please return the formatted markdown document."""
+        }
+    ]
+
+
+# Choosing this user type generates both roles' documents at once
+DUAL_ROLE_USER_TYPE = 'Product Manager + Developer'
+DUAL_ROLES = (('product_manager', 'Product Manager'), ('developer', 'Developer'))
+
+
+def build_role_outline_messages(role, repo_url, project_description):
+    """Project outline request that uses the CLI's role prompt from get_system_prompt."""
+    from main import get_system_prompt
+
+    messages = build_new_chat_messages(repo_url, role.replace('_', ' ').title(), project_description)
+    messages[0] = {
+        "role": "system",
+        "content": get_system_prompt(role, repo_url) + """
+
+Write a comprehensive markdown document outlining the project from this perspective, with sections for
+the Project Overview, Goals and Objectives, Key Features, Technical Requirements and Success Criteria.
+Return ONLY the markdown content (no explanations or extra text).""",
+    }
+    return messages
+
+
+def save_dual_role_exports(user_id, repo_url, contents):
+    """
+    Save one export per role from DUAL_ROLES, in the same order as `contents`,
+    and link each to the other. Both rows and their links are committed
+    together; if that fails, the files already written are removed.
+    Returns the exports.
+    """
+    exports = []
+    try:
+        for (_, user_type), content in zip(DUAL_ROLES, contents):
+            exports.append(add_new_chat_export(user_id, repo_url, user_type, content))
+        db.session.flush()
+        exports[0].linked_export_id = exports[1].id
+        exports[1].linked_export_id = exports[0].id
+        db.session.commit()
+    except Exception:
+        written = [export.file_path for export in exports]
+        db.session.rollback()
+        for file_path in written:
+            Path(file_path).unlink(missing_ok=True)
+        raise
+    for export, content in zip(exports, contents):
+        record_revision(export, content, message='Generated by new chat')
+        index_export_content(export, content)
+    return exports
+
+
+def save_new_chat_export(user_id, repo_url, user_type, content, tickets=None):
+    """Write a generated project outline to a new export file and register it, with its tickets if structured."""
+    export = add_new_chat_export(user_id, repo_url, user_type, content, is_structured=tickets is not None)
+    if tickets is not None:
+        # The export and its tickets are committed together
+        db.session.flush()
+        save_export_tickets(export, tickets)
+    db.session.commit()
+    record_revision(export, content, message='Generated by new chat')
+    index_export_content(export, content)
+    return export
+
+
+def add_new_chat_export(user_id, repo_url, user_type, content, is_structured=False):
+    """Write a generated project outline to a new export file and add its row to the session. The caller commits."""
+    # Microseconds keep names unique when several outlines finish in the same second
+    filename = f"project_{datetime.utcnow().strftime('%Y%m%d_%H%M%S_%f')}.md"
+    file_path = str(Path('exports') / filename)
+
+    Path('exports').mkdir(exist_ok=True)
+
+    with time_file_io('write'), open(file_path, 'w') as f:
+        f.write(content)
+
+    export = Export(
+        filename=filename,
+        original_name=f"Project for {repo_url.split('/')[-1]}",
+        user_type=user_type,
+        repository=repo_url,
+        file_path=file_path,
+        action='new_chat',
+        user_id=user_id,
+        is_deleted=False,
+        is_structured=is_structured,
+    )
+    db.session.add(export)
+    return export
+
+
+def save_export_tickets(export, tickets):
+    """Replace an export's ticket rows with validated structured_tickets tickets. The caller commits."""
+    for ticket in ExportTicket.query.filter_by(export_id=export.id):
+        db.session.delete(ticket)
+    db.session.flush()
+    for position, ticket in enumerate(tickets):
+        db.session.add(ExportTicket(
+            export_id=export.id,
+            position=position,
+            summary=ticket['summary'],
+            description=ticket['description'],
+            acceptance_criteria=json.dumps(ticket['acceptance_criteria']),
+            technical_requirements=json.dumps(ticket['technical_requirements']),
+            story_points=ticket['story_points'],
+            labels=[TicketLabel(label=label) for label in ticket['labels']],
+        ))
+
+
+def refresh_export_tickets(export, content):
+    """Re-read a structured export's tickets from its revised markdown; unstructured exports are left alone."""
+    if not export.is_structured:
+        return
+    try:
+        tickets = structured_tickets.parse_markdown(content)['tickets']
+    except structured_tickets.TicketValidationError:
+        # The revision has no ticket sections; a later revision or a restore brings them back
+        tickets = []
+    save_export_tickets(export, tickets)
+    db.session.commit()
+
+
+class ExportChangedError(Exception):
+    """The export file changed after the content an update was made from was read."""
+
+
+def save_updated_export(export, current_content, updated_content, user_message):
+    """
+    Overwrite an export file with updated content, keeping its revision
+    history. The file is locked like a section PATCH and must still hold
+    `current_content`, or ExportChangedError is raised and nothing is written.
+    Returns the new revision.
+    """
+    with sections.locked(export.file_path):
+        with time_file_io('read'), open(export.file_path, 'r') as f:
+            if f.read() != current_content:
+                raise ExportChangedError('The export was changed while the update was being made; please try again.')
+        return write_updated_export(export, current_content, updated_content, user_message)
+
+
+def write_updated_export(export, current_content, updated_content, user_message):
+    """save_updated_export for callers that already hold sections.locked and have checked the file."""
+    record_current_revision(export, current_content)
+    render_cache.invalidate(export.file_path)
+    with time_file_io('write'), open(export.file_path, 'w') as f:
+        f.write(updated_content)
+    revision = record_revision(export, updated_content, previous_content=current_content, message=user_message)
+    index_export_content(export, updated_content)
+    refresh_export_tickets(export, updated_content)
+    return revision
+
+
+def create_chat_export(user_id, role, repo_url, header, turns):
+    """Start the export file of a live web chat with its header and first turns."""
+    filename = f"chat_{datetime.utcnow().strftime('%Y%m%d_%H%M%S_%f')}.md"
+    file_path = str(Path('exports') / filename)
+
+    Path('exports').mkdir(exist_ok=True)
+
+    with time_file_io('write'), open(file_path, 'w', encoding='utf-8') as f:
+        f.write(header + turns)
+
+    export = Export(
+        filename=filename,
+        original_name=f"Chat for {repo_url.split('/')[-1]}" if repo_url else 'Chat',
+        user_type=role.replace('_', ' ').title(),
+        repository=repo_url,
+        file_path=file_path,
+        action='web_chat',
+        user_id=user_id,
+        is_deleted=False
+    )
+
+    db.session.add(export)
+    db.session.commit()
+    return export
+
+
+def append_chat_turns(file_path, turns):
+    """
+    Append finished turns to a live chat's export file, under the same lock
+    as whole-file updates so a turn is never lost to a rewrite in progress.
+    """
+    with sections.locked(file_path), time_file_io('write'), open(file_path, 'a', encoding='utf-8') as f:
+        f.write(turns)
+
+
+def finish_chat_export(export_id, name=None):
+    """
+    Record a live chat's export file as a revision and refresh its search
+    entry. Done on SAVE and when the chat closes rather than on every turn.
+    """
+    export = Export.query.get(export_id)
+    if not export or export.is_deleted:
+        return None
+
+    if name:
+        export.original_name = name
+        db.session.commit()
+
+    with time_file_io('read'), open(export.file_path, 'r', encoding='utf-8') as f:
+        content = f.read()
+    record_revision(export, content, message='Live chat')
+    index_export_content(export, content)
+    return export
+
+
+def get_chat_exports(user_id, limit=20):
+    """The user's most recent exports, newest first, for the live chat's HISTORY command."""
+    exports = Export.query.filter_by(user_id=user_id, is_deleted=False).order_by(
+        Export.date.desc(), Export.id.desc()
+    ).limit(limit).all()
+    return [export.to_dict() for export in exports]
+
+
+def open_chat_export(user_id, export_id):
+    """Return (export dict, file content) for the live chat's OPEN command, or (None, error)."""
+    export = Export.query.get(export_id)
+    if not export or export.is_deleted or export.user_id != user_id:
+        return None, 'Export item not found.'
+
+    file_path = export.file_path or ''
+    if not file_path or not Path(file_path).exists():
+        return None, 'The associated file is missing or unavailable.'
+
+    with time_file_io('read'), open(file_path, 'r', encoding='utf-8') as f:
+        return export.to_dict(), f.read()
+
+
 @app.route('/history/update/<int:export_id>', methods=['POST'])
 @login_required
 def update_export(export_id):
@@ -526,27 +1753,30 @@ def update_export(export_id):
 
         # Read current file content
         try:
-            with open(file_path, 'r') as f:
+            with time_file_io('read'), open(file_path, 'r') as f:
                 current_content = f.read()
         except Exception as e:
             flash(f'Could not read file: {e}', 'error')
             return redirect(url_for('history_detail', entry_id=export_id))
 
+        enforce_llm_quota(export.user_id)
+
         # Call AI helper to update content
         try:
-            from main import get_groq_client, update_markdown_with_ai
+            with tracing.span('import main'):
+                from main import get_groq_client, update_markdown_with_ai
             client = get_groq_client()
             updated_content = update_markdown_with_ai(
                 client,
                 current_content,
                 user_message,
                 export.user_type or 'Developer',
-                export.repository or ''
+                export.repository or '',
+                context={'user_id': export.user_id, 'export_id': export.id, 'repository': export.repository},
             )
 
             # Save updated content back to file
-            with open(file_path, 'w') as f:
-                f.write(updated_content)
+            save_updated_export(export, current_content, updated_content, user_message)
 
             flash('Successfully updated the file with AI response!', 'success')
             return redirect(url_for('history_detail', entry_id=export_id))
@@ -559,6 +1789,90 @@ def update_export(export_id):
             return redirect(url_for('history_detail', entry_id=export_id))
 
 
+def get_jira_issues(export):
+    """{idempotency key: Jira issue key} for the issues already created from an export."""
+    return json.loads(export.jira_issues) if export.jira_issues else {}
+
+
+def push_export_to_jira(export, content, client=None, project_key=None, issue_type=None, dry_run=False):
+    """
+    Create a Jira issue for each section of an export, skipping the ones
+    created by earlier pushes. Progress is saved on the export after every
+    batch, so an interrupted push resumes where it stopped.
+    Raises ValueError when Jira is not configured.
+    """
+    settings = jira_push.jira_settings()
+    project_key = project_key or settings['project_key']
+    if not project_key:
+        raise ValueError('JIRA_PROJECT_KEY not found in environment variables')
+
+    if not export.jira_push_key:
+        export.jira_push_key = secrets.token_hex(6)
+        db.session.commit()
+
+    issues = jira_push.build_issues(
+        content, export.jira_push_key, project_key, issue_type or settings['issue_type']
+    )
+    pushed = get_jira_issues(export)
+    if dry_run:
+        return {
+            'issues': [dict(update, idempotency_key=key) for key, update in issues if key not in pushed],
+            'skipped': {key: pushed[key] for key, _ in issues if key in pushed},
+        }
+
+    def save_progress(created, failed):
+        if created:
+            pushed.update(created)
+            export.jira_issues = json.dumps(pushed)
+            db.session.commit()
+
+    client = client or jira_push.JiraClient.from_env()
+    return jira_push.push_issues(
+        client,
+        issues,
+        already_created=pushed,
+        batch_size=settings['batch_size'],
+        concurrency=settings['concurrency'],
+        max_retries=settings['max_retries'],
+        on_batch=save_progress,
+        timeout=settings['push_timeout'],
+        max_retry_after=settings['max_retry_after'],
+    )
+
+
+@app.route('/history/jira/<int:export_id>', methods=['POST'])
+@login_required
+def push_to_jira(export_id):
+    """Create Jira issues from an export's sections."""
+    with app.app_context():
+        export = Export.query.get(export_id)
+        if not export or export.is_deleted or export.user_id != session['user_id']:
+            flash('Export item not found.', 'error')
+            return redirect(url_for('history'))
+
+        file_path = export.file_path or ''
+        if not file_path or not Path(file_path).exists():
+            flash('The associated file is missing or unavailable.', 'error')
+            return redirect(url_for('history'))
+
+        try:
+            with time_file_io('read'), open(file_path, 'r') as f:
+                result = push_export_to_jira(export, f.read(), project_key=request.form.get('project_key') or None)
+        except ValueError as e:
+            flash(f'Jira is not configured: {e}', 'error')
+            return redirect(url_for('history_detail', entry_id=export_id))
+        except Exception as e:
+            flash(f'Error pushing to Jira: {e}', 'error')
+            return redirect(url_for('history_detail', entry_id=export_id))
+
+        message = f"Created {len(result['created'])} Jira issues ({len(result['skipped'])} already pushed)."
+        if result['failed']:
+            flash(f"{message} {len(result['failed'])} failed: {result['failed'][0]['error']}", 'warning')
+        else:
+            flash(message, 'success')
+        return redirect(url_for('history_detail', entry_id=export_id))
+
+
 @app.route('/new_chat', methods=['GET'])
 @login_required
 def new_chat():
@@ -574,6 +1888,7 @@ def create_new_chat():
         repo_url = request.form.get('repo_url', '').strip()
         project_description = request.form.get('project_description', '').strip()
         user_type = request.form.get('user_type', 'Developer').strip()
+        structured = request.form.get('structured') == '1'
         
         if not repo_url:
             flash('Please provide a GitHub repository URL.', 'error')
@@ -583,72 +1898,29 @@ def create_new_chat():
             flash('Please provide a project description.', 'error')
             return redirect(url_for('new_chat'))
         
+        enforce_llm_quota(session['user_id'], calls=len(DUAL_ROLES) if user_type == DUAL_ROLE_USER_TYPE else 1)
+
+        if user_type == DUAL_ROLE_USER_TYPE:
+            return create_dual_role_chat(repo_url, project_description)
+        if structured:
+            return create_structured_chat(repo_url, user_type, project_description)
+        
         try:
-            from main import get_groq_client
+            from main import get_groq_client, create_chat_completion
             client = get_groq_client()
             
-            system_prompt = f"""You are an AI assistant helping create Jira task descriptions.
-
-The codebase is at: {repo_url}
-User role: {user_type}
-
-Your task:
-1. Review the project description provided by the user
-2. Create a comprehensive, well-structured markdown document outlining the project
-3. Include sections for:
-   - Project Overview
-   - Goals and Objectives
-   - Key Features
-   - Technical Requirements
-   - Success Criteria
-4. Format the document professionally with proper markdown syntax
-5. Return ONLY the markdown content (no explanations or extra text)
-
-Be thorough, professional, and focus on clarity and completeness."""
-            
-            messages = [
-                {"role": "system", "content": system_prompt},
-                {
-                    "role": "user",
-                    "content": f"""Based on this project description, please create a comprehensive markdown document outlining the project:
-
----PROJECT DESCRIPTION---
-{project_description}
-
-Please return the formatted markdown document."""
-                }
-            ]
+            messages = build_new_chat_messages(repo_url, user_type, project_description)
             
-            response = client.chat.completions.create(
-                model="llama-3.1-8b-instant",
-                messages=messages,
-                temperature=0.7,
+            response = create_chat_completion(
+                client,
+                messages,
                 max_tokens=2048,
+                context={'user_id': session['user_id'], 'repository': repo_url},
             )
             
             ai_generated_content = response.choices[0].message.content
             
-            filename = f"project_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}.md"
-            file_path = str(Path('exports') / filename)
-            
-            Path('exports').mkdir(exist_ok=True)
-            
-            with open(file_path, 'w') as f:
-                f.write(ai_generated_content)
-            
-            export = Export(
-                filename=filename,
-                original_name=f"Project for {repo_url.split('/')[-1]}",
-                user_type=user_type,
-                repository=repo_url,
-                file_path=file_path,
-                action='new_chat',
-                user_id=session['user_id'],
-                is_deleted=False
-            )
-            
-            db.session.add(export)
-            db.session.commit()
+            export = save_new_chat_export(session['user_id'], repo_url, user_type, ai_generated_content)
             
             flash('Successfully created new chat and generated project outline!', 'success')
             return redirect(url_for('history_detail', entry_id=export.id))
@@ -661,6 +1933,73 @@ Please return the formatted markdown document."""
             return redirect(url_for('new_chat'))
 
 
+def create_structured_chat(repo_url, user_type, project_description):
+    """Generate the project's tickets in JSON mode, store them as rows and save their markdown as the export."""
+    try:
+        from main import get_groq_client, create_chat_completion
+        client = get_groq_client()
+
+        response = create_chat_completion(
+            client,
+            structured_tickets.build_messages(repo_url, user_type, project_description),
+            max_tokens=4096,
+            context={'user_id': session['user_id'], 'repository': repo_url},
+            response_format={'type': 'json_object'},
+        )
+        document = structured_tickets.parse_document(response.choices[0].message.content)
+        export = save_new_chat_export(
+            session['user_id'], repo_url, user_type,
+            structured_tickets.render_markdown(document), tickets=document['tickets'],
+        )
+
+        flash(f"Successfully generated {len(document['tickets'])} tickets!", 'success')
+        return redirect(url_for('history_detail', entry_id=export.id))
+
+    except ImportError:
+        flash('AI service not available. Please check your configuration.', 'error')
+        return redirect(url_for('new_chat'))
+    except structured_tickets.TicketValidationError as e:
+        flash(f'The AI reply was not a valid ticket list: {e}', 'error')
+        return redirect(url_for('new_chat'))
+    except Exception as e:
+        flash(f'Error creating new chat: {e}', 'error')
+        return redirect(url_for('new_chat'))
+
+
+def create_dual_role_chat(repo_url, project_description):
+    """Generate the Product Manager and Developer outlines concurrently and save them as linked exports."""
+    try:
+        from main import get_groq_client, create_chat_completion
+        client = get_groq_client()
+        context = {'user_id': session['user_id'], 'repository': repo_url}
+
+        # Both calls wait on the API at the same time, so this takes as long as the slower one
+        with ThreadPoolExecutor(max_workers=len(DUAL_ROLES)) as pool:
+            futures = [
+                pool.submit(
+                    create_chat_completion,
+                    client,
+                    build_role_outline_messages(role, repo_url, project_description),
+                    max_tokens=2048,
+                    context=context,
+                )
+                for role, _ in DUAL_ROLES
+            ]
+            contents = [future.result().choices[0].message.content for future in futures]
+
+        exports = save_dual_role_exports(session['user_id'], repo_url, contents)
+
+        flash('Successfully generated Product Manager and Developer outlines!', 'success')
+        return redirect(url_for('history_detail', entry_id=exports[0].id))
+
+    except ImportError:
+        flash('AI service not available. Please check your configuration.', 'error')
+        return redirect(url_for('new_chat'))
+    except Exception as e:
+        flash(f'Error creating new chat: {e}', 'error')
+        return redirect(url_for('new_chat'))
+
+
 @app.route('/api/v1/items', methods=['GET'])
 @login_required
 def api_items():
@@ -676,6 +2015,58 @@ def api_items():
         })
 
 
+def parse_export_filters(args):
+    """
+    SQLAlchemy filters for the repository, user_type, since and until query
+    parameters. Dates are ISO dates or datetimes; a bare `until` date
+    includes that whole day. Raises ValueError for malformed dates.
+    """
+    filters = []
+    if args.get('repository'):
+        filters.append(Export.repository == args['repository'])
+    if args.get('user_type'):
+        filters.append(db.func.lower(Export.user_type) == args['user_type'].lower())
+    if args.get('since'):
+        filters.append(Export.date >= datetime.fromisoformat(args['since']))
+    if args.get('until'):
+        until = datetime.fromisoformat(args['until'])
+        if len(args['until']) == 10:
+            until += timedelta(days=1)
+        filters.append(Export.date < until)
+    return filters
+
+
+@app.route('/api/v1/items/archive', methods=['GET'])
+@login_required
+def api_items_archive():
+    """Stream the user's export files as a ZIP with an NDJSON manifest, optionally filtered."""
+    try:
+        filters = parse_export_filters(request.args)
+    except ValueError:
+        return jsonify({'error': 'since and until must be ISO dates (YYYY-MM-DD)'}), 400
+
+    query = Export.query.filter(
+        Export.user_id == session['user_id'],
+        Export.is_deleted == False,  # noqa: E712
+        *filters
+    ).order_by(Export.date, Export.id)
+
+    def entries():
+        # yield_per fetches rows in batches instead of loading every export up front
+        for export in query.yield_per(500):
+            yield export.to_dict()
+
+    # Usernames are not restricted at registration; keep only what is safe in a header and a file name
+    name = secure_filename(session['username']) or f"user{session['user_id']}"
+    filename = f"exports_{name}_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}.zip"
+    response = app.response_class(
+        stream_with_context(bulk_export.stream_exports_zip(entries())),
+        mimetype='application/zip',
+    )
+    response.headers.set('Content-Disposition', 'attachment', filename=filename)
+    return response
+
+
 @app.route('/api/v1/items/<int:item_id>', methods=['GET'])
 @login_required
 def api_item_detail(item_id):
@@ -693,5 +2084,511 @@ def api_item_detail(item_id):
         return jsonify(export.to_dict())
 
 
+def get_api_export(item_id):
+    """The authenticated user's non-deleted export with this id, or None."""
+    return Export.query.filter_by(
+        id=item_id,
+        user_id=session['user_id'],
+        is_deleted=False
+    ).first()
+
+
+@app.route('/api/v1/items/<int:item_id>/content', methods=['GET'])
+@login_required
+def api_item_content(item_id):
+    """API endpoint to read an export file one page at a time."""
+    try:
+        offset = int(request.args.get('offset', 0))
+        limit = min(max(int(request.args.get('limit', EXPORT_PAGE_SIZE)), 1), EXPORT_PAGE_SIZE * 4)
+    except ValueError:
+        return jsonify({'error': 'offset and limit must be integers'}), 400
+
+    with app.app_context():
+        export = get_api_export(item_id)
+        if not export:
+            return jsonify({'error': 'Item not found'}), 404
+
+        file_path = export.file_path or ''
+        if not file_path or not Path(file_path).exists():
+            return jsonify({'error': 'File not found'}), 404
+
+        content, next_offset, total_size = read_export_page(file_path, offset, limit)
+        return jsonify({
+            'id': export.id,
+            'offset': offset,
+            'next_offset': next_offset,
+            'size': total_size,
+            'content': content,
+        })
+
+
+@app.route('/usage', methods=['GET'])
+@login_required
+def usage():
+    """LLM usage and latency report. Administrators can switch to all users."""
+    try:
+        days = min(max(int(request.args.get('days', 30)), 1), 365)
+    except ValueError:
+        days = 30
+    all_users = is_admin() and request.args.get('scope') == 'all'
+
+    with app.app_context():
+        report = get_usage_report(days, user_id=None if all_users else session['user_id'])
+        return render_template(
+            'usage.html', report=report, all_users=all_users, is_admin=is_admin(), quota=quota_status(session['user_id'])
+        )
+
+
+@app.route('/admin/profiles', methods=['GET'])
+@admin_required
+def admin_profiles():
+    """List recent request profiles and issue a profiling token."""
+    token = profiling.create_profile_token(app, session['username']) if profiling.profiling_enabled() else None
+    return render_template(
+        'admin_profiles.html',
+        profiles=profiling.list_profiles(),
+        enabled=profiling.profiling_enabled(),
+        token=token,
+        header=profiling.PROFILE_HEADER,
+    )
+
+
+@app.route('/admin/profiles/<name>', methods=['GET'])
+@admin_required
+def admin_profile_detail(name):
+    """Show the text summary of a profile, or download the pstats file with ?download=1."""
+    if request.args.get('download'):
+        path = profiling.profile_path(name, '.prof')
+        if not path:
+            flash('Profile not found.', 'error')
+            return redirect(url_for('admin_profiles'))
+        return send_file(path.resolve(), mimetype='application/octet-stream', as_attachment=True)
+
+    path = profiling.profile_path(name, '.txt')
+    if not path:
+        flash('Profile not found.', 'error')
+        return redirect(url_for('admin_profiles'))
+    return app.response_class(path.read_text(), mimetype='text/plain')
+
+
+@app.route('/admin/traces', methods=['GET'])
+@admin_required
+def admin_traces():
+    """List the most recent request traces."""
+    return render_template(
+        'admin_traces.html',
+        traces=tracing.read_traces(),
+        enabled=tracing.tracing_enabled(),
+        settings=tracing.trace_settings(),
+    )
+
+
+@app.route('/admin/traces/<trace_id>', methods=['GET'])
+@admin_required
+def admin_trace_detail(trace_id):
+    """Show one trace as a waterfall of its spans."""
+    trace = tracing.find_trace(trace_id)
+    if not trace:
+        flash('Trace not found.', 'error')
+        return redirect(url_for('admin_traces'))
+    return render_template('admin_trace_detail.html', trace=trace)
+
+
+@app.route('/api/v1/usage', methods=['GET'])
+@login_required
+def api_usage():
+    """API endpoint for LLM usage. scope=all (administrators only) covers every user."""
+    try:
+        days = min(max(int(request.args.get('days', 30)), 1), 365)
+    except ValueError:
+        return jsonify({'error': 'days must be an integer'}), 400
+
+    all_users = request.args.get('scope') == 'all'
+    if all_users and not is_admin():
+        return jsonify({'error': 'Forbidden'}), 403
+
+    with app.app_context():
+        return jsonify(get_usage_report(days, user_id=None if all_users else session['user_id']))
+
+
+@app.route('/api/v1/quota', methods=['GET'])
+@login_required
+def api_quota():
+    """API endpoint for the authenticated user's LLM request and token quotas."""
+    with app.app_context():
+        return jsonify(quota_status(session['user_id']))
+
+
+@app.route('/api/v1/estimate', methods=['POST'])
+@login_required
+def api_estimate():
+    """
+    API endpoint to estimate an LLM request before sending it: prompt tokens,
+    the max_tokens that fits, predicted latency and cost, and whether it is
+    within budget. Takes `messages`, or `item_id` and `message` to estimate
+    an AI update of that export. Optional: model, max_tokens, mode.
+    """
+    try:
+        from main import DEFAULT_MODEL, build_update_messages
+    except ImportError:
+        return jsonify({'error': 'AI service not available'}), 503
+
+    data = request.get_json(silent=True) or {}
+    model = data.get('model') or DEFAULT_MODEL
+    mode = data.get('mode')
+    if mode not in (None, 'exact', 'approx', 'auto'):
+        return jsonify({'error': 'mode must be exact, approx or auto'}), 400
+    try:
+        max_tokens = int(data.get('max_tokens', 2048 if data.get('item_id') else 1024))
+    except (TypeError, ValueError):
+        return jsonify({'error': 'max_tokens must be an integer'}), 400
+
+    if data.get('item_id') is not None:
+        with app.app_context():
+            export = get_api_export(data['item_id'])
+            if not export:
+                return jsonify({'error': 'Item not found'}), 404
+            file_path = export.file_path or ''
+            if not file_path or not Path(file_path).exists():
+                return jsonify({'error': 'File not found'}), 404
+            with time_file_io('read'), open(file_path, 'r') as f:
+                messages = build_update_messages(
+                    f.read(), data.get('message', ''), export.user_type or 'Developer', export.repository or ''
+                )
+    else:
+        messages = data.get('messages')
+        if not isinstance(messages, list) or not all(isinstance(m, dict) for m in messages):
+            return jsonify({'error': 'messages must be a list of {role, content} objects'}), 400
+
+    return jsonify(token_budget.estimate(messages, model, max_tokens, mode=mode))
+
+
+@app.route('/api/v1/items/<int:item_id>/jira', methods=['POST'])
+@login_required
+def api_item_jira(item_id):
+    """
+    API endpoint to create Jira issues from an export's sections. Sections
+    pushed before are skipped. Optional JSON: project_key, issue_type, and
+    dry_run to return the issue payloads without sending them.
+    """
+    data = request.get_json(silent=True) or {}
+    with app.app_context():
+        export = get_api_export(item_id)
+        if not export:
+            return jsonify({'error': 'Item not found'}), 404
+
+        file_path = export.file_path or ''
+        if not file_path or not Path(file_path).exists():
+            return jsonify({'error': 'File not found'}), 404
+
+        with time_file_io('read'), open(file_path, 'r') as f:
+            content = f.read()
+        try:
+            result = push_export_to_jira(
+                export,
+                content,
+                project_key=data.get('project_key'),
+                issue_type=data.get('issue_type'),
+                dry_run=bool(data.get('dry_run')),
+            )
+        except ValueError as e:
+            return jsonify({'error': f'Jira is not configured: {e}'}), 503
+
+        return jsonify({'id': export.id, **result})
+
+
+@app.route('/api/v1/items/<int:item_id>/revisions', methods=['GET'])
+@login_required
+def api_item_revisions(item_id):
+    """API endpoint to list the stored revisions of an export, newest first."""
+    with app.app_context():
+        export = get_api_export(item_id)
+        if not export:
+            return jsonify({'error': 'Item not found'}), 404
+
+        revision_rows = ExportRevision.query.filter_by(export_id=export.id).order_by(
+            ExportRevision.number.desc()
+        ).all()
+        return jsonify({'id': export.id, 'revisions': [revision.to_dict() for revision in revision_rows]})
+
+
+@app.route('/api/v1/items/<int:item_id>/revisions/<int:number>', methods=['GET'])
+@login_required
+def api_item_revision(item_id, number):
+    """API endpoint to get the full text of one revision."""
+    with app.app_context():
+        export = get_api_export(item_id)
+        if not export:
+            return jsonify({'error': 'Item not found'}), 404
+
+        content = get_revision_content(export.id, number)
+        if content is None:
+            return jsonify({'error': 'Revision not found'}), 404
+        return jsonify({'id': export.id, 'number': number, 'content': content})
+
+
+@app.route('/api/v1/items/<int:item_id>/revisions/<int:number>/diff', methods=['GET'])
+@login_required
+def api_item_revision_diff(item_id, number):
+    """API endpoint for a unified diff of a revision against another (default: the one before it)."""
+    try:
+        against = int(request.args.get('against', number - 1))
+    except ValueError:
+        return jsonify({'error': 'against must be an integer'}), 400
+
+    with app.app_context():
+        export = get_api_export(item_id)
+        if not export:
+            return jsonify({'error': 'Item not found'}), 404
+
+        new = get_revision_content(export.id, number)
+        old = get_revision_content(export.id, against) if against >= 1 else ''
+        if new is None or old is None:
+            return jsonify({'error': 'Revision not found'}), 404
+
+        return jsonify({
+            'id': export.id,
+            'from': against,
+            'to': number,
+            'diff': revisions.unified_diff(old, new, f'revision {against}', f'revision {number}'),
+        })
+
+
+@app.route('/api/v1/items/<int:item_id>/revisions/<int:number>/restore', methods=['POST'])
+@login_required
+def api_item_revision_restore(item_id, number):
+    """API endpoint to write an earlier revision back to the export file as a new revision."""
+    with app.app_context():
+        export = get_api_export(item_id)
+        if not export:
+            return jsonify({'error': 'Item not found'}), 404
+
+        file_path = export.file_path or ''
+        if not file_path or not Path(file_path).exists():
+            return jsonify({'error': 'File not found'}), 404
+
+        content = get_revision_content(export.id, number)
+        if content is None:
+            return jsonify({'error': 'Revision not found'}), 404
+
+        with sections.locked(file_path):
+            with time_file_io('read'), open(file_path, 'r') as f:
+                current_content = f.read()
+            revision = write_updated_export(export, current_content, content, f'Restored revision {number}')
+
+        return jsonify({'id': export.id, 'revision': revision.to_dict()})
+
+
+def section_payload(export, section, body, document_sections):
+    return {
+        'id': export.id,
+        'path': section['path'],
+        'title': section['title'],
+        'level': section['level'],
+        'content': body,
+        'subsections': sections.subsections(document_sections, section),
+    }
+
+
+@app.route('/api/v1/items/<int:item_id>/sections', methods=['GET'])
+@login_required
+def api_item_sections(item_id):
+    """API endpoint to list an export's sections by heading path, with their ETags."""
+    with app.app_context():
+        export = get_api_export(item_id)
+        if not export:
+            return jsonify({'error': 'Item not found'}), 404
+
+        file_path = export.file_path or ''
+        if not file_path or not Path(file_path).exists():
+            return jsonify({'error': 'File not found'}), 404
+
+        return jsonify({
+            'id': export.id,
+            'sections': [
+                {
+                    'path': section['path'],
+                    'title': section['title'],
+                    'level': section['level'],
+                    'size': section['end'] - section['start'],
+                    'etag': section['hash'],
+                }
+                for section in section_index.get(file_path)
+            ],
+        })
+
+
+@app.route('/api/v1/items/<int:item_id>/sections/<path:section_path>', methods=['GET', 'PATCH'])
+@login_required
+def api_item_section(item_id, section_path):
+    """
+    API endpoint to read one section of an export (subsections included),
+    or replace its content with PATCH. The ETag is the section's content
+    hash; PATCH requires it in If-Match and fails with 412 if the section
+    changed since it was read, so edits to other sections do not conflict.
+    """
+    with app.app_context():
+        export = get_api_export(item_id)
+        if not export:
+            return jsonify({'error': 'Item not found'}), 404
+
+        file_path = export.file_path or ''
+        if not file_path or not Path(file_path).exists():
+            return jsonify({'error': 'File not found'}), 404
+
+        if request.method == 'PATCH':
+            return patch_export_section(export, section_path)
+
+        section, body, document_sections = section_index.read(file_path, section_path)
+        if section is None:
+            return jsonify({'error': 'Section not found'}), 404
+
+        if request.if_none_match.contains_weak(section['hash']):
+            response = app.response_class(status=304)
+        else:
+            response = jsonify(section_payload(export, section, body, document_sections))
+        response.set_etag(section['hash'])
+        return response
+
+
+def patch_export_section(export, section_path):
+    """Replace one section's content if its ETag still matches, keeping the export's revision history."""
+    data = request.get_json(silent=True) or {}
+    content = data.get('content')
+    if not isinstance(content, str):
+        return jsonify({'error': 'content must be a string'}), 400
+    if not request.if_match:
+        return jsonify({'error': 'If-Match with the section ETag is required'}), 428
+
+    file_path = export.file_path
+    # Held across workers so two PATCHes of the same file cannot both pass the ETag check
+    with sections.locked(file_path):
+        with time_file_io('read'), open(file_path, 'rb') as f:
+            current = f.read()
+        section = sections.find_section(sections.parse_sections(current), section_path)
+        if section is None:
+            return jsonify({'error': 'Section not found'}), 404
+
+        # Compressed responses carry the ETag as weak; the hash itself is exact
+        if not request.if_match.contains_weak(section['hash']):
+            response = jsonify({'error': 'The section has changed since it was read', 'etag': section['hash']})
+            response.status_code = 412
+            response.set_etag(section['hash'])
+            return response
+
+        try:
+            updated = sections.replace_body(current, section, content)
+        except sections.SectionError as e:
+            return jsonify({'error': str(e)}), 400
+
+        write_updated_export(
+            export,
+            current.decode('utf-8', errors='replace'),
+            updated.decode('utf-8'),
+            data.get('message') or f"Updated section {section['path']}",
+        )
+        # From what was written, not a re-read that could already include a later edit
+        document_sections = sections.parse_sections(updated)
+        section = sections.find_section(document_sections, section['path'])
+        body = updated[section['body_start']:section['end']].decode('utf-8', errors='replace')
+
+    response = jsonify(section_payload(export, section, body, document_sections))
+    response.set_etag(section['hash'])
+    return response
+
+
+@app.route('/api/v1/items/<int:item_id>/tickets', methods=['GET'])
+@login_required
+def api_item_tickets(item_id):
+    """API endpoint to list the tickets of a structured export, in document order."""
+    with app.app_context():
+        export = get_api_export(item_id)
+        if not export:
+            return jsonify({'error': 'Item not found'}), 404
+
+        tickets = ExportTicket.query.filter_by(export_id=export.id).order_by(ExportTicket.position).all()
+        return jsonify({'id': export.id, 'tickets': [ticket.to_dict() for ticket in tickets]})
+
+
+@app.route('/api/v1/tickets', methods=['GET'])
+@login_required
+def api_tickets():
+    """
+    API endpoint to query the authenticated user's structured tickets across
+    exports, filtered by label, summary text, story points and the export filters.
+    """
+    try:
+        filters = parse_export_filters(request.args)
+        limit = min(max(int(request.args.get('limit', 100)), 1), 500)
+        max_points = request.args.get('max_points')
+        max_points = int(max_points) if max_points else None
+    except ValueError:
+        return jsonify({'error': 'since/until must be ISO dates and limit/max_points integers'}), 400
+
+    query = ExportTicket.query.join(Export, Export.id == ExportTicket.export_id).filter(
+        Export.user_id == session['user_id'],
+        Export.is_deleted == False,  # noqa: E712
+        *filters
+    )
+    if request.args.get('label'):
+        label = structured_tickets.normalize_label(request.args['label'])
+        query = query.filter(ExportTicket.labels.any(TicketLabel.label == label))
+    if request.args.get('q'):
+        query = query.filter(ExportTicket.summary.ilike(f"%{request.args['q']}%"))
+    if max_points is not None:
+        query = query.filter(ExportTicket.story_points <= max_points)
+
+    tickets = query.order_by(Export.date.desc(), ExportTicket.export_id, ExportTicket.position).limit(limit).all()
+    return jsonify({'tickets': [ticket.to_dict() for ticket in tickets]})
+
+
+@app.route('/api/v1/briefs/<brief_hash>', methods=['GET'])
+@login_required
+def api_brief(brief_hash):
+    """
+    API endpoint for a cached task brief by document hash; ?full=1 adds the
+    original document. Briefs are shared by every user of a document, so
+    only administrators may read them.
+    """
+    from main import task_briefs
+
+    if not is_admin():
+        return jsonify({'error': 'Administrator access required'}), 403
+
+    original = task_briefs.original(brief_hash)
+    if original is None:
+        return jsonify({'error': 'Brief not found'}), 404
+
+    _, brief = task_briefs.get(original)
+    payload = {'hash': brief_hash, 'brief': brief, 'brief_chars': len(brief), 'original_chars': len(original)}
+    if request.args.get('full') in ('1', 'true'):
+        payload['original'] = original
+    return jsonify(payload)
+
+
+@app.route('/api/v1/search', methods=['GET'])
+@login_required
+def api_search():
+    """API endpoint to full-text search the authenticated user's exports."""
+    query = request.args.get('q', '').strip()
+    if not query:
+        return jsonify({'error': 'Query parameter q is required'}), 400
+
+    try:
+        limit = min(max(int(request.args.get('limit', 20)), 1), 100)
+    except ValueError:
+        return jsonify({'error': 'limit must be an integer'}), 400
+
+    with app.app_context():
+        results = search_exports(session['user_id'], query, limit=limit)
+        return jsonify({
+            'query': query,
+            'results': [
+                {**export.to_dict(), 'snippet': snippet, 'score': score}
+                for export, snippet, score in results
+            ],
+        })
+
+
 if __name__ == '__main__':
     app.run(debug=True, host='127.0.0.1', port=8080)